@@ -0,0 +1,330 @@
+from __future__ import division
+from collections import Counter, defaultdict
+import math
+
+from fuzzywuzzy import fuzz
+
+
+# Tolerance used when rounding the bounds below, so that floating point noise can only make the filters more permissive.
+EPSILON = 1e-9
+
+
+def character_tokens(literal):
+    """
+    Converts an author literal into a set of character tokens. The n-th occurrence of a character is the token
+    (character, n), so that the size of the intersection of two token sets is the size of the multiset intersection of
+    the characters of both literals.
+
+    ``Example``
+        >>> character_tokens(u'ANNA') # set([(u'A', 1), (u'N', 1), (u'N', 2), (u'A', 2)])
+
+    :param literal: (str) author literal
+    :return: set of (character, occurrence) tuples
+    """
+    seen = Counter()
+    tokens = set()
+    for character in literal:
+        seen[character] += 1
+        tokens.add((character, seen[character]))
+    return tokens
+
+
+class LiteralIndex:
+    """LiteralIndex : An inverted index over author literals that proposes only the labels which can reach a
+    `fuzz.ratio` threshold.
+
+    `fuzz.ratio(x, k)` is ``round(100 * 2 * M / (len(x) + len(k)))``, where M is the number of matching characters of
+    the two strings. M can never exceed the number of characters the two literals have in common (counted with
+    multiplicity), so a label can only reach the threshold if
+
+    >>> 400 * overlap(x, k) >= (2 * threshold - 1) * (len(x) + len(k))
+
+    The index uses this bound in three filters, none of which can drop a label that would pass the threshold:
+        1. Length filter : the overlap is at most the length of the shorter literal.
+        2. Prefix filter : tokens are ordered from rare to frequent and a label is only indexed under its rarest tokens.
+                           Two literals with enough overlap always share one of their rarest tokens.
+        3. Count filter : the exact overlap is computed for the remaining candidates.
+
+    Candidates are returned in the order in which the labels were added, so callers can keep a greedy
+    first-match-wins assignment.
+
+    Example:
+        >>> index = LiteralIndex(literals=[u'ALBERTINIDF', u'ALBERTINID', u'BOYERBC'], threshold=70)
+        >>> index.add(u'ALBERTINIDF')
+        >>> index.candidates(u'ALBERTINID') # [u'ALBERTINIDF']
+    """
+
+    def __init__(self, literals, threshold=70):
+        """Initialisation(__init__()) for the class `LiteralIndex`
+
+        Args:
+            literals (iterable) : every literal that will be added or queried. Their characters decide the global
+                                  token order of the prefix filter.
+            threshold (int) : `fuzz.ratio` threshold (0-100) candidates must be able to reach.
+        """
+        self.threshold = threshold
+        self.weight = 2 * threshold - 1
+        frequencies = Counter()
+        for literal in literals:
+            frequencies.update(character_tokens(literal))
+        self.frequencies = frequencies
+        self.labels = []
+        self.lengths = []
+        self.characters = []
+        self.postings = defaultdict(list)
+
+    def minimum_length(self, length):
+        """Returns the shortest literal length which can reach the threshold against a literal of `length`."""
+        if self.weight >= 400:
+            return length
+        return max(int(math.ceil(self.weight * length / (400 - self.weight) - EPSILON)), 0)
+
+    def minimum_overlap(self, length):
+        """Returns the least overlap any literal needs with a literal of `length` to reach the threshold."""
+        shortest = min(self.minimum_length(length), length)
+        return int(math.ceil(self.weight * (length + shortest) / 400 - EPSILON))
+
+    def prefix(self, literal):
+        """Returns the rarest tokens of `literal` under which it is indexed (and with which it is looked up)."""
+        tokens = sorted(character_tokens(literal), key=lambda token: (self.frequencies[token], token))
+        return tokens[:len(tokens) - self.minimum_overlap(len(literal)) + 1]
+
+    def add(self, label):
+        """Adds `label` to the index. Labels are returned by `candidates()` in the order they were added."""
+        label_id = len(self.labels)
+        self.labels.append(label)
+        self.lengths.append(len(label))
+        self.characters.append(Counter(label))
+        for token in self.prefix(label):
+            self.postings[token].append(label_id)
+
+    def candidates(self, literal):
+        """
+        Returns the labels which may reach the threshold against `literal`, in the order they were added. Labels which
+        are not returned can not reach the threshold.
+
+        :param literal: (str) author literal
+        :return: list of labels
+        """
+        length = len(literal)
+        if self.minimum_overlap(length) < 1:
+            return list(self.labels)
+        label_ids = set()
+        for token in self.prefix(literal):
+            label_ids.update(self.postings.get(token, ()))
+
+        characters = Counter(literal)
+        shortest = self.minimum_length(length)
+        candidates = []
+        for label_id in sorted(label_ids):
+            label_length = self.lengths[label_id]
+            if label_length < shortest or length < self.minimum_length(label_length):
+                continue
+            overlap = sum((characters & self.characters[label_id]).values())
+            if 400 * overlap + EPSILON >= self.weight * (length + label_length):
+                candidates.append(self.labels[label_id])
+        return candidates
+
+
+def name_matches(literal, label, threshold=70):
+    """The name-similarity rule of `InitialCluster`: True if `literal` would join the initial cluster `label`."""
+    return literal == label or max(fuzz.ratio(literal, label), fuzz.ratio(label, literal)) >= threshold
+
+
+# Soundex digit of each consonant. Vowels, H, W and Y have no digit.
+soundex_digits = dict((character, digit)
+                      for digit, characters in enumerate(['BFPV', 'CGJKQSXZ', 'DT', 'L', 'MN', 'R'], 1)
+                      for character in characters)
+
+
+def soundex(name):
+    """
+    Returns the American Soundex code of `name`: its first letter followed by 3 digits.
+
+    ``Example``
+        >>> soundex(u'ROBERT'), soundex(u'RUPERT') # (u'R163', u'R163')
+        >>> soundex(u"O'HARA") # u'O600'
+
+    :param name: (str) name. Characters other than the letters A-Z are ignored.
+    :return: (str) Soundex code, or an empty string if `name` has no letter.
+    """
+    letters = [character for character in name.upper() if 'A' <= character <= 'Z']
+    if not letters:
+        return u''
+    code = [letters[0]]
+    previous = soundex_digits.get(letters[0])
+    for character in letters[1:]:
+        digit = soundex_digits.get(character)
+        if digit is not None and digit != previous:
+            code.append(str(digit))
+            if len(code) == 4:
+                break
+        # H and W do not separate two consonants with the same digit, vowels do.
+        if character not in 'HW':
+            previous = digit
+    return u''.join(code).ljust(4, u'0')
+
+
+def first_initial(firstname):
+    """Returns the first letter of `firstname` in upper case, or an empty string."""
+    firstname = firstname.strip()
+    return firstname[:1].upper()
+
+
+class BlockingStrategy:
+    """BlockingStrategy : How the author literals of a corpus are grouped into blocks (initial clusters).
+
+    Only the Author-Paper instances of the same block are compared by `IdentityCluster`, so the strategy decides both
+    the recall of the clustering (instances of one person in different blocks are never merged) and its cost (a block
+    of n instances holds n(n-1)/2 pairs). A strategy implements `blocks()`, which returns the blocks in the format of
+    `InitialCluster.build()`: a dictionary mapping a label, itself one of the literals of the block, to the set of
+    literals of the block.
+
+    Strategies:
+        * `FuzzyLabelBlocking` : greedy `fuzz.ratio` labels, the default of `InitialCluster`
+        * `SortedNeighbourhoodBlocking` : `fuzz.ratio` against the previous literals of a sliding window only
+        * `SurnameInitialBlocking` : same last name and first initial
+        * `PhoneticBlocking` : same Soundex code of the last name and first initial
+
+    Example:
+        >>> strategy = SurnameInitialBlocking()
+        >>> blocks = strategy.blocks(prepared)
+        >>> strategy.statistics(prepared, blocks) # {'blocks': 1612, 'pairs': 40321, 'max_size': 268, ...}
+        >>> IdentityCluster(corpus=prepared, blocking=strategy).build()
+    """
+
+    name = 'blocking'
+
+    def blocks(self, prepared):
+        """
+        Groups the literals of `prepared` into blocks.
+
+        :param prepared: `PreparedCorpus`
+        :return: dictionary mapping each label to the set of literals of its block
+        """
+        raise NotImplementedError
+
+    def statistics(self, prepared, blocks):
+        """
+        Describes the blocks built for `prepared`.
+
+        :param prepared: `PreparedCorpus`
+        :param blocks: blocks returned by `blocks()`
+        :return: dictionary with the name of the strategy, the number of blocks and instances, the number of pairs the
+                 blocks generate, the largest and mean block size (in instances), and ``sizes``, the number of blocks
+                 of each size.
+        """
+        sizes = [sum(len(prepared.literal_positions[literal]) for literal in literals) for literals in blocks.values()]
+        return {'strategy': self.name,
+                'blocks': len(sizes),
+                'instances': sum(sizes),
+                'pairs': sum(size * (size - 1) // 2 for size in sizes),
+                'max_size': max(sizes) if sizes else 0,
+                'mean_size': sum(sizes) / len(sizes) if sizes else 0.0,
+                'sizes': dict(Counter(sizes))}
+
+
+class FuzzyLabelBlocking(BlockingStrategy):
+    """FuzzyLabelBlocking : The greedy labels of `InitialCluster`.
+
+    The literals are visited in sorted order. A literal joins the first label (in order of creation) it matches with
+    `name_matches`, or becomes a new label. With `indexed`, candidate labels come from a `LiteralIndex`, which gives the
+    same blocks as comparing with every label.
+    """
+
+    name = 'fuzzy'
+
+    def __init__(self, threshold=70, indexed=True):
+        self.threshold = threshold
+        self.indexed = indexed
+
+    def blocks(self, prepared):
+        blocks = {}
+        # Labels are compared in the order they were created, and a literal joins the first label it matches.
+        labels = []
+        index = LiteralIndex(literals=prepared.literals, threshold=self.threshold) if self.indexed else None
+        for x in prepared.literals:
+            match = False
+            candidates = index.candidates(x) if index is not None else labels
+            for k in candidates:
+                if name_matches(x, k, self.threshold):
+                    blocks[k].add(x)
+                    match = True
+                    break
+            if not match:
+                blocks[x] = set([x])
+                labels.append(x)
+                if index is not None:
+                    index.add(x)
+        return blocks
+
+
+class SortedNeighbourhoodBlocking(BlockingStrategy):
+    """SortedNeighbourhoodBlocking : `fuzz.ratio` blocking within a sliding window of the sorted literals.
+
+    Each literal is compared with the `window` literals before it in sorted order, nearest first, and joins the block
+    of the first one it matches with `name_matches` (or starts a new block). At most `window` comparisons are made per
+    literal, so the cost is linear in the number of literals, and literals far apart in sorted order (for example
+    spelling variants of the first letter) are never grouped.
+    """
+
+    name = 'sorted-neighbourhood'
+
+    def __init__(self, window=10, threshold=70):
+        self.window = window
+        self.threshold = threshold
+
+    def blocks(self, prepared):
+        literals = list(prepared.literals)
+        labels = []
+        blocks = {}
+        for i, x in enumerate(literals):
+            label = None
+            for j in range(i - 1, max(i - self.window, 0) - 1, -1):
+                if name_matches(x, literals[j], self.threshold):
+                    label = labels[j]
+                    break
+            if label is None:
+                label = x
+                blocks[x] = set()
+            blocks[label].add(x)
+            labels.append(label)
+        return blocks
+
+
+class KeyBlocking(BlockingStrategy):
+    """KeyBlocking : Literals with the same blocking key form a block.
+
+    The key is computed by `key()` from the last name and first name of the first instance of each literal. The label
+    of a block is its smallest literal.
+    """
+
+    name = 'key'
+
+    def key(self, lastname, firstname):
+        raise NotImplementedError
+
+    def blocks(self, prepared):
+        names = prepared.df.drop_duplicates('AUTH_LITERAL')[['AUTH_LITERAL', 'LASTNAME', 'FIRSTNAME']].values
+        groups = defaultdict(set)
+        for literal, lastname, firstname in names:
+            groups[self.key(lastname, firstname)].add(literal)
+        return dict((min(literals), literals) for literals in groups.values())
+
+
+class SurnameInitialBlocking(KeyBlocking):
+    """SurnameInitialBlocking : Blocks of the literals with the same last name and first initial."""
+
+    name = 'surname-initial'
+
+    def key(self, lastname, firstname):
+        return lastname.strip().upper(), first_initial(firstname)
+
+
+class PhoneticBlocking(KeyBlocking):
+    """PhoneticBlocking : Blocks of the literals with the same Soundex code of the last name and first initial."""
+
+    name = 'phonetic'
+
+    def key(self, lastname, firstname):
+        return soundex(lastname), first_initial(firstname)
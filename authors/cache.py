@@ -0,0 +1,195 @@
+"""
+Persistent cache of parsed Author-Paper instances.
+
+Reading a Web of Science file with `tethne.readers.wos.read` and parsing it with `CorpusParser.parse()` takes seconds
+to minutes; loading the pickled DataFrame of a previous run takes milliseconds. `InstanceCache` stores the parsed
+DataFrame under a key made of the SHA-1 of the input file(s) and ``parser_version``, so that an entry is never used for
+a modified file or after a change of the parser. The cache directory is resolved in this order:
+    1. The `directory` given to `InstanceCache`
+    2. The environment variable ``TETHNE_CACHE_DIR``
+    3. ``~/.cache/tethne-services``
+
+The total size of the entries is bounded by `max_bytes`; the least recently used entries are evicted first.
+
+Example:
+    >>> from authors.cache import InstanceCache
+    >>> from authors.paperinstances import PreparedCorpus
+    >>> cache = InstanceCache(max_bytes=2 * 1024 ** 3)
+    >>> df = cache.load('tests/data/Boyer_Barbara.txt') # parsed on the first call, unpickled afterwards
+    >>> prepared = PreparedCorpus(df=df)
+    >>> cache.invalidate('tests/data/Boyer_Barbara.txt')
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+from authors.paperinstances import CorpusParser, parser_version
+
+
+logger = logging.getLogger('InstanceCache')
+
+# Environment variable which overrides the default cache directory.
+cache_directory_variable = 'TETHNE_CACHE_DIR'
+
+default_cache_directory = os.path.join(os.path.expanduser('~'), '.cache', 'tethne-services')
+
+# Extension of the cache entries.
+entry_extension = '.pkl'
+
+
+def source_files(path):
+    """Returns the files `tethne.readers.wos.read` reads for `path` (a file, or the `.txt` files of a directory)."""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path)
+                      if name.endswith('txt') and not name.startswith('.'))
+    return [path]
+
+
+def content_hash(path, block_size=1 << 20):
+    """
+    Returns the SHA-1 hex digest of the contents of the file(s) at `path` and of ``parser_version``.
+
+    :param path: path of a WoS data file or of a directory of data files
+    :param block_size: (int) number of bytes read at a time
+    :return: (str) hex digest
+
+    Raises:
+        ValueError: If `path` does not exist
+    """
+    if not os.path.exists(path):
+        raise ValueError('No such file or directory: %s' % path)
+    digest = hashlib.sha1('parser-%d' % parser_version)
+    for filename in source_files(path):
+        digest.update(os.path.basename(filename).encode('utf-8'))
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class InstanceCache:
+    """InstanceCache : An on-disk, size-bounded cache of the DataFrames returned by `CorpusParser.parse()`.
+
+    Each entry is one pickle file named after the key of the source file(s) (see `content_hash`). Reading an entry
+    updates its modification time, which orders the entries for eviction. Entries which can not be read (truncated
+    file, pickle of an incompatible pandas version, ...) are dropped and count as misses.
+
+    Example:
+        >>> cache = InstanceCache(directory='/tmp/tethne-cache', max_bytes=512 * 1024 ** 2)
+        >>> df = cache.load(path)
+        >>> cache.info() # {'entries': 1, 'bytes': 1432211, 'max_bytes': 536870912, 'hits': 0, 'misses': 1}
+    """
+
+    def __init__(self, directory=None, max_bytes=1024 ** 3):
+        """Initialisation(__init__()) for the class `InstanceCache`
+
+        Args:
+            directory (str) : directory of the cache entries. Created if needed.
+            max_bytes (int) : maximum total size of the entries. ``None`` means unbounded.
+        """
+        self.directory = directory or os.environ.get(cache_directory_variable) or default_cache_directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + entry_extension)
+
+    def get(self, path):
+        """
+        Returns the cached DataFrame of the file(s) at `path`, or ``None`` if there is none for their current
+        contents.
+        """
+        entry = self.entry_path(content_hash(path))
+        if not os.path.exists(entry):
+            self.misses += 1
+            return None
+        try:
+            df = pd.read_pickle(entry)
+        except Exception:
+            logger.warning('Dropping unreadable cache entry %s', entry)
+            self.remove(entry)
+            self.misses += 1
+            return None
+        os.utime(entry, None)
+        self.hits += 1
+        return df
+
+    def put(self, path, df):
+        """Stores `df` as the parsed instances of the file(s) at `path`, then evicts entries beyond `max_bytes`."""
+        entry = self.entry_path(content_hash(path))
+        # Write to a temporary file and rename it, so that concurrent readers never see a partial entry.
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                pickle.dump(df, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(temporary, entry)
+        except Exception:
+            self.remove(temporary)
+            raise
+        self.evict()
+
+    def load(self, path):
+        """
+        Returns the parsed instances of the file(s) at `path`, from the cache if possible. Otherwise the file(s) are
+        read with `tethne.readers.wos.read`, parsed, and the result is cached.
+        """
+        df = self.get(path)
+        if df is None:
+            from tethne.readers import wos
+            df = CorpusParser(tethne_corpus=wos.read(path)).parse()
+            self.put(path, df)
+        return df
+
+    def entries(self):
+        """Returns the (path, size, last use) of every entry, least recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(entry_extension):
+                entry = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(entry)
+                except OSError:
+                    continue
+                entries.append((entry, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: (entry[2], entry[0]))
+
+    def evict(self):
+        """Removes the least recently used entries until their total size is at most `max_bytes`."""
+        if self.max_bytes is None:
+            return
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            logger.debug('Evicting cache entry %s (%d bytes)', entry, size)
+            self.remove(entry)
+            total -= size
+
+    def invalidate(self, path=None):
+        """Removes the entry of the file(s) at `path` (for their current contents), or every entry if `path` is
+        ``None``."""
+        if path is None:
+            for entry, _, _ in self.entries():
+                self.remove(entry)
+        else:
+            self.remove(self.entry_path(content_hash(path)))
+
+    def remove(self, entry):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+    def info(self):
+        """Returns the number and total size of the entries, the size bound and the hit and miss counters."""
+        entries = self.entries()
+        return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries), 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses}
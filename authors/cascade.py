@@ -0,0 +1,243 @@
+"""
+Pre-filter cascade : settles obvious pairs from their cheapest features, before the classifier is called.
+
+The features of a pair are calculated in stages, cheapest first:
+    1. ``overlap`` : BOTH_NAME_SCORE, INSTIT_SCORE, EMAIL_ADDR_SCORE, AUTH_KW_SCORE, COAUTHOR_SCORE (vectorized)
+    2. ``names`` : FNAME_SCORE, LNAME_SCORE (`fuzz.ratio`)
+    3. ``partial`` : FNAME_PARTIAL_SCORE, LNAME_PARTIAL_SCORE (`fuzz.partial_ratio`)
+After each stage, the `Rule`s whose features are all known are applied, and the pairs they settle leave the cascade.
+The classifier only sees the pairs no rule settled. ``counters`` counts the pairs settled at each stage.
+
+A rule is only worth using if the classifier agrees with it. `Cascade.verify()` checks this without any data: it walks
+every tree of the forest over the box of feature values the rule covers and bounds the match probability the
+classifier can give to a pair of the box. A rule labelling pairs 0 is safe if the bound is below 0.5, a rule labelling
+pairs 1 if it is above. `benchmarks/cascade.py` also measures the agreement on the corpora of `tests/data`.
+
+Example:
+    >>> from authors.cascade import Cascade, Rule
+    >>> cascade = Cascade() # default_rules
+    >>> labels = classify_pairs(prepared, pairs, cascade=cascade)
+    >>> cascade.info() # {'pairs': 466, 'overlap': 0, 'names': 289, 'partial': 0, 'model': 177}
+    >>> cascade.verify() # [('identical-names', 1, (0.98, 0.98), True), ('distinct-last-names', 0, (0.0, 0.2), True)]
+"""
+from __future__ import division
+import numpy as np
+
+from authors import metrics
+from authors.models import get_classifier
+from authors.paperinstances import features
+
+
+# Stages of the cascade, cheapest first, and the features calculated by each of them.
+stages = [('overlap', ['INSTIT_SCORE', 'BOTH_NAME_SCORE', 'EMAIL_ADDR_SCORE', 'AUTH_KW_SCORE', 'COAUTHOR_SCORE']),
+          ('names', ['FNAME_SCORE', 'LNAME_SCORE']),
+          ('partial', ['FNAME_PARTIAL_SCORE', 'LNAME_PARTIAL_SCORE'])]
+
+
+class Rule:
+    """Rule : Settles every pair whose features all lie in the given ranges.
+
+    Example:
+        >>> Rule('no-overlap', 0, {'EMAIL_ADDR_SCORE': (0, 0), 'COAUTHOR_SCORE': (0, 0)})
+    """
+
+    def __init__(self, name, label, ranges):
+        """Initialisation(__init__()) for the class `Rule`
+
+        Args:
+            name (str) : name of the rule, used in reports
+            label (int) : label of the pairs the rule settles (1 for a match, 0 otherwise)
+            ranges (dict) : maps a feature name to an inclusive (low, high) range of values
+
+        Raises:
+            ValueError: If a feature name is unknown
+        """
+        for feature in ranges:
+            if feature not in features:
+                raise ValueError('Unknown feature %r, expected one of %s' % (feature, features))
+        self.name = name
+        self.label = label
+        self.ranges = dict(ranges)
+
+    def __repr__(self):
+        return 'Rule(%r, %r, %r)' % (self.name, self.label, self.ranges)
+
+    def applies(self, scores):
+        """Returns a boolean mask of the rows of `scores` (n x 9, columns as in ``features``) the rule settles."""
+        mask = np.ones(len(scores), dtype=bool)
+        for feature, (low, high) in self.ranges.items():
+            column = scores[:, features.index(feature)]
+            mask &= (column >= low) & (column <= high)
+        return mask
+
+    def box(self):
+        """
+        Returns the (lower, upper) bounds of the 9 features over the pairs the rule covers. Scores lie in [0, 1], and a
+        first (last) name ratio of 1 means identical names, so the partial ratio is 1 as well.
+        """
+        lower = np.zeros(len(features))
+        upper = np.ones(len(features))
+        for feature, (low, high) in self.ranges.items():
+            lower[features.index(feature)] = max(low, 0.0)
+            upper[features.index(feature)] = min(high, 1.0)
+        for ratio, partial_ratio in [('FNAME_SCORE', 'FNAME_PARTIAL_SCORE'), ('LNAME_SCORE', 'LNAME_PARTIAL_SCORE')]:
+            if lower[features.index(ratio)] >= 1.0:
+                lower[features.index(partial_ratio)] = 1.0
+        return lower, upper
+
+
+no_overlap = {'INSTIT_SCORE': (0, 0), 'EMAIL_ADDR_SCORE': (0, 0), 'AUTH_KW_SCORE': (0, 0), 'COAUTHOR_SCORE': (0, 0)}
+
+# Both rules settle pairs after the ``names`` stage, and were verified against the bundled model with
+# `Cascade.verify()`. On the corpora of `tests/data` they settle about 60% of the pairs of the initial clusters.
+default_rules = [Rule('identical-names', 1, dict(no_overlap, BOTH_NAME_SCORE=(1, 1), FNAME_SCORE=(1, 1),
+                                                 LNAME_SCORE=(1, 1))),
+                 Rule('distinct-last-names', 0, {'INSTIT_SCORE': (0, 0), 'EMAIL_ADDR_SCORE': (0, 0),
+                                                 'AUTH_KW_SCORE': (0, 0), 'LNAME_SCORE': (0, 0.9)})]
+
+
+class Cascade:
+    """Cascade : Classifies pairs of Author-Paper instances, settling the obvious ones with cheap `Rule`s first.
+
+    See the module documentation. ``counters`` holds the number of pairs seen (``pairs``), settled at each stage, and
+    classified by the model (``model``).
+    """
+
+    def __init__(self, rules=None, classifier=None):
+        """Initialisation(__init__()) for the class `Cascade`
+
+        Args:
+            rules (list) : `Rule`s applied in order. ``None`` uses ``default_rules``, an empty list sends every pair to
+                           the classifier.
+            classifier : classifier of the remaining pairs. ``None`` uses `get_classifier()` when first needed.
+        """
+        self.rules = list(default_rules if rules is None else rules)
+        self.classifier = classifier
+        self.counters = {}
+        self.reset()
+
+    def reset(self):
+        """Sets every counter back to 0."""
+        self.counters = dict((name, 0) for name in ['pairs', 'model'] + [stage for stage, _ in stages])
+
+    def info(self):
+        """Returns a copy of the counters."""
+        return dict(self.counters)
+
+    def get_classifier(self):
+        return self.classifier if self.classifier is not None else get_classifier()
+
+    def classify(self, store, left, right, return_proba=False, return_settled=False):
+        """
+        Classifies the pairs (left[i], right[i]) of a `FeatureStore`.
+
+        :param store: `FeatureStore`
+        :param left: integer positions of the first instance of each pair
+        :param right: integer positions of the second instance of each pair
+        :param return_proba: (bool) also return the match probability of each pair. Pairs settled by a rule get the
+                             probability 1.0 or 0.0.
+        :param return_settled: (bool) also return a boolean numpy array, ``True`` for the pairs settled by a rule
+        :return: numpy array of labels (and a numpy array of match probabilities, and the boolean array of settled
+                 pairs)
+        """
+        left = np.asarray(left, dtype=np.intp)
+        right = np.asarray(right, dtype=np.intp)
+        n = len(left)
+        scores = np.zeros((n, len(features)))
+        labels = np.zeros(n, dtype=int)
+        probabilities = np.zeros(n)
+        settled_pairs = np.zeros(n, dtype=bool)
+        pending = np.arange(n)
+        known = set()
+        applied = set()
+        for stage, columns in stages:
+            if not pending.size:
+                break
+            indices = [features.index(column) for column in columns]
+            stage_scores = store.scores(left[pending], right[pending], columns=columns)
+            scores[pending[:, np.newaxis], indices] = stage_scores[:, indices]
+            known.update(columns)
+            for i, rule in enumerate(self.rules):
+                if i in applied or not set(rule.ranges) <= known:
+                    continue
+                applied.add(i)
+                settled = rule.applies(scores[pending])
+                labels[pending[settled]] = rule.label
+                probabilities[pending[settled]] = float(rule.label)
+                settled_pairs[pending[settled]] = True
+                self.counters[stage] += int(settled.sum())
+                metrics.count('pairs_settled', int(settled.sum()))
+                pending = pending[~settled]
+        if pending.size:
+            clf = self.get_classifier()
+            with metrics.stage('predict'):
+                metrics.count('classifier_calls')
+                metrics.count('pairs_predicted', len(pending))
+                proba = clf.predict_proba(scores[pending])
+            labels[pending] = clf.classes_.take(np.argmax(proba, axis=1))
+            probabilities[pending] = proba[:, list(clf.classes_).index(1)]
+            self.counters['model'] += len(pending)
+        self.counters['pairs'] += n
+        if return_settled:
+            return (labels, probabilities, settled_pairs) if return_proba else (labels, settled_pairs)
+        if return_proba:
+            return labels, probabilities
+        return labels
+
+    def verify(self):
+        """
+        Bounds the match probability the classifier can give to the pairs each rule settles.
+
+        :return: list of (rule name, label, (lowest, highest) match probability, safe) tuples. A rule is safe if the
+                 classifier labels every pair it covers with the label of the rule.
+        """
+        forest = compiled_forest(self.get_classifier())
+        report = []
+        for rule in self.rules:
+            lower, upper = rule.box()
+            low, high = probability_bounds(forest, lower, upper)
+            safe = high < 0.5 if rule.label == 0 else low > 0.5
+            report.append((rule.name, rule.label, (low, high), safe))
+        return report
+
+
+def compiled_forest(classifier):
+    """Returns `classifier` as a `CompiledForest`, compiling a scikit-learn forest if needed."""
+    from authors.forest import CompiledForest
+    if isinstance(classifier, CompiledForest):
+        return classifier
+    return CompiledForest.from_sklearn(classifier)
+
+
+def probability_bounds(forest, lower, upper):
+    """
+    Returns the lowest and highest match probability `forest` can give to a sample whose features lie between `lower`
+    and `upper`. Each tree is walked into every branch the box reaches, and the extreme leaf values are averaged over
+    the trees: the bounds are safe, though not always tight.
+
+    :param forest: `CompiledForest`
+    :param lower: lower bound of each feature
+    :param upper: upper bound of each feature
+    :return: tuple (lowest, highest)
+    """
+    # Samples are compared with the thresholds as float32, like `CompiledForest.apply` does.
+    lower = np.asarray(lower, dtype=np.float32).astype(np.float64)
+    upper = np.asarray(upper, dtype=np.float32).astype(np.float64)
+    match_column = list(forest.classes_).index(1)
+    low = high = 0.0
+    for root in forest.roots:
+        values = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if forest.left[node] == -1:
+                values.append(forest.value[node, match_column])
+                continue
+            feature, threshold = forest.feature[node], forest.threshold[node]
+            if lower[feature] <= threshold:
+                stack.append(forest.left[node])
+            if upper[feature] > threshold:
+                stack.append(forest.right[node])
+        low += min(values)
+        high += max(values)
+    return low / len(forest.roots), high / len(forest.roots)
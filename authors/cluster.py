@@ -1,10 +1,14 @@
-from authors.paperinstances import CorpusParser, classify
+from authors import metrics
+from authors.blocking import FuzzyLabelBlocking, name_matches
+from authors.engine import (average_linkage, cluster_block, cluster_blocks, probability_components, score_blocks,
+                            secondary_keys, split_block)
+from authors.paperinstances import CorpusParser, PreparedCorpus, prepare_corpus
 from tethne import Corpus
-from tethne.readers import wos
 from fuzzywuzzy import fuzz
-from pprint import pprint
-import numpy as np
+from collections import Counter
+import pandas as pd
 import logging
+import pickle
 
 
 logger = logging.getLogger('AuthorCluster')
@@ -30,21 +34,30 @@ class InitialCluster:
 
 
     """
-    def __init__(self, corpus):
+    def __init__(self, corpus, threshold=70, indexed=True, blocking=None):
         """Initialisation(__init__()) for the class `InitialCluster`
 
         Args:
-            corpus (`Tethne` corpus object)
+            corpus (`Tethne` corpus object or `PreparedCorpus`)
+            threshold (int) : minimum `fuzz.ratio` (0-100) for an author literal to join an existing label
+            indexed (bool) : look up candidate labels in a `LiteralIndex` instead of comparing every literal with
+                             every label. Both give the same clusters; the linear scan is kept as a reference.
+            blocking (`BlockingStrategy`) : strategy grouping the literals into clusters. The default is the greedy
+                                            `FuzzyLabelBlocking` with `threshold` and `indexed`; other strategies
+                                            ignore both.
 
         Returns:
             `InitialCluster` class instance : The purpose of this method is to create an instance of InitialCluster
 
         Raises:
-            ValueError : If the input parameter `corpus` is not an object of class `tethne.Corpus`
+            ValueError : If the input parameter `corpus` is neither a `tethne.Corpus` nor a `PreparedCorpus`
         """
-        if not isinstance(corpus, Corpus):
-            raise ValueError('The input parameter should be a Tethne Corpus object')
+        if not isinstance(corpus, (Corpus, PreparedCorpus)):
+            raise ValueError('The input parameter should be a Tethne Corpus object or a PreparedCorpus')
         self.corpus = corpus
+        self.threshold = threshold
+        self.indexed = indexed
+        self.blocking = blocking
         self.initial_clusters = {}
 
     def build(self):
@@ -76,23 +89,18 @@ class InitialCluster:
 
         :return:
         """
-        parser = CorpusParser(tethne_corpus=self.corpus)
-        df = parser.parse()
-        unclassified = np.sort(np.array(df.AUTH_LITERAL.unique()))
-        assigned = set()
-        for x in unclassified:
-            match = False
-            if x not in assigned:
-                for k in self.initial_clusters.keys():
-                    if x == k or max(fuzz.ratio(x, k), fuzz.ratio(k, x)) >= 70:
-                        self.initial_clusters[k].add(x)
-                        assigned.add(x)
-                        match = True
-                        break
-                if not match:
-                    self.initial_clusters[x] = set()
-                    self.initial_clusters[x].add(x)
-                    assigned.add(x)
+        with metrics.stage('initial_cluster'):
+            prepared = prepare_corpus(self.corpus)
+            cached = self.indexed and self.blocking is None
+            if cached and self.threshold in prepared.initial_clusters:
+                self.initial_clusters = dict((k, set(v)) for k, v in prepared.initial_clusters[self.threshold].items())
+            else:
+                strategy = self.blocking or FuzzyLabelBlocking(threshold=self.threshold, indexed=self.indexed)
+                self.initial_clusters = strategy.blocks(prepared)
+                if cached:
+                    prepared.initial_clusters[self.threshold] = dict((k, set(v))
+                                                                     for k, v in self.initial_clusters.items())
+            metrics.count('blocks', len(self.initial_clusters))
         logger.debug("Size of the initial Cluster is %s", len(self.initial_clusters))
         return self.initial_clusters
 
@@ -117,48 +125,83 @@ class IdentityCluster:
                     3. Author First Name
 
         STEP 2 : Use the `IdentityCluster` class to group instances belonging to the same class(Basically, build a
-                 dictionary).
+                 dictionary). Within each initial cluster (block), every unordered pair of instances is classified at
+                 most once: matches are merged with union-find, and pairs already in the same component are skipped.
+                 The components of each block are kept in ``components`` and the number of comparisons made and
+                 avoided in ``block_stats``.
 
         STEP 3 : Return the dictionary with LABEL as keys and a set of pandas DataFrame indexes as values. These indices
                  are the same which are created in the STEP 1 of the algorithm
 
+    The instances (``prepared``), ``initial_clusters`` and ``components`` are kept after a build. They can be saved and
+    loaded with `save()` / `load()`, and `update()` adds new papers to them without classifying the old pairs again.
+
     Example:
         >>> from authors.cluster import IdentityCluster
         >>> from tethne.readers import wos
-        >>> from authors.paperinstances import CorpusParser
+        >>> from authors.paperinstances import PreparedCorpus
         >>> datapath = "/Users/aosingh/tethne-services/tests/data/Albertini_David.txt"
         >>> corpus = wos.read(datapath)
 
-        >>> corpus_parser = CorpusParser(tethne_corpus=corpus)
-        >>> df = corpus_parser.parse() # STEP 1 in the algorithm
+        >>> prepared = PreparedCorpus(tethne_corpus=corpus) # STEP 1 in the algorithm, done only once
+        >>> df = prepared.df
 
-        >>> identity_cluster_instance = IdentityCluster(corpus=corpus)
+        >>> identity_cluster_instance = IdentityCluster(corpus=prepared)
         >>> identity_clusters = identity_cluster_instance.build() # STEPS 2 and 3 in the algorithm
 
     """
-    def __init__(self, corpus):
+    def __init__(self, corpus, threshold=70, blocking=None, max_block_size=None,
+                 split_keys=('initial', 'coauthor', 'institute'), max_pairs=None, cascade=None, decisions=None):
         """Initialisation(__init__()) for the class `IdentityCluster`
 
         Args:
-            corpus (`Tethne` corpus object)
+            corpus (`Tethne` corpus object or `PreparedCorpus`)
+            threshold (int) : name similarity threshold passed on to `InitialCluster`
+            blocking (`BlockingStrategy`) : blocking strategy passed on to `InitialCluster`
+            max_block_size (int) : blocks with more instances are split into sub-blocks with `split_block`, and only
+                                   the pairs inside a sub-block are classified. ``None`` never splits.
+            split_keys (tuple) : secondary keys the blocks are split with, in order (see `engine.secondary_keys`)
+            max_pairs (int) : pair budget of each (sub-)block. A warning is logged for every block whose budget cut
+                              the work short. ``None`` means no budget.
+            cascade (`authors.cascade.Cascade`) : settles the obvious pairs with cheap rules before the classifier. The
+                                                  number of pairs it settled is ``settled`` in ``block_stats``.
+            decisions (`authors.decisions.DecisionStore`) : store of the pair decisions of previous runs. Known pairs
+                                                            are looked up instead of classified again.
 
         Returns:
             `IdentityCluster` class instance : The purpose of this method is to create an instance of IdentityCluster
 
         Raises:
-            ValueError: If the input parameter `corpus` is not an object of class `tethne.Corpus`
+            ValueError: If the input parameter `corpus` is neither a `tethne.Corpus` nor a `PreparedCorpus`, or a
+                        split key is unknown
 
 
         """
-        if not isinstance(corpus, Corpus):
-            raise ValueError("The input object should be a Tethne Corpus object")
+        if not isinstance(corpus, (Corpus, PreparedCorpus)):
+            raise ValueError("The input object should be a Tethne Corpus object or a PreparedCorpus")
+        for key in split_keys:
+            if key not in secondary_keys:
+                raise ValueError('Unknown secondary key %r, expected one of %s' % (key, sorted(secondary_keys)))
         self.corpus = corpus
+        self.threshold = threshold
+        self.blocking = blocking
+        self.max_block_size = max_block_size
+        self.split_keys = tuple(split_keys)
+        self.max_pairs = max_pairs
+        self.cascade = cascade
+        self.decisions = decisions
         self.identity_clusters = {}
+        self.components = {}
+        self.block_stats = {}
+        self.prepared = None
+        self.initial_clusters = {}
 
-    def build(self):
+    def build(self, n_jobs=1):
         """
         Args:
             self
+            n_jobs (int) : number of worker processes the blocks are spread over. 1 (the default) builds every block in
+                           this process, ``None`` or -1 use one process per CPU. The result is the same either way.
 
         Returns:
             `Dictionary` : A set of clusters, where (for each cluster) the key is the Label and the value is the set of
@@ -228,34 +271,308 @@ class IdentityCluster:
              u'SANTOSKA': set([u'SANTOSKAWOS:A1988R225500053']),
              u'SMITHGW': set([u'SMITHGWWOS:A1982QN98300013'])}
         """
-        parser = CorpusParser(tethne_corpus=self.corpus)
-        df = parser.parse()
-        initial_cluster_instance = InitialCluster(corpus=self.corpus)
-        initial_clusters = initial_cluster_instance.build()
+        with metrics.stage('identity_cluster'):
+            return self.cluster(prepare_corpus(self.corpus), n_jobs=n_jobs)
+
+    def update(self, new_corpus, n_jobs=1):
+        """
+        Adds the Author-Paper instances of `new_corpus` to the clustering state of a previous `build()` (or `update()`)
+        and returns the identity clusters of all the instances, without classifying again the pairs classified before.
+
+        The initial clusters are rebuilt over all the author literals, as new literals can change the labels. Every
+        previous block whose instances all fall into one new block is passed on as settled to `cluster_block`: its
+        components are reused and only the pairs involving a new instance (or an instance of another previous block)
+        are classified. The result is the same as a `build()` over all the instances. Instances whose index is already
+        known are ignored.
+
+        ``Example``
+            >>> identity_cluster = IdentityCluster(corpus=wos.read('authors_2016.txt'))
+            >>> identity_cluster.build()
+            >>> identity_cluster.save('authors.state')
+            >>> identity_cluster = IdentityCluster.load('authors.state') # in a later run
+            >>> identity_clusters = identity_cluster.update(wos.read('authors_2017.txt'))
+
+        Args:
+            new_corpus (`Tethne` corpus object or `PreparedCorpus`) : the new instances
+            n_jobs (int) : see `build()`
+
+        Returns:
+            `Dictionary` : the identity clusters, as returned by `build()`
+
+        Raises:
+            ValueError: If there is no state to update (`build()` was never called), or `new_corpus` is neither a
+                        `tethne.Corpus` nor a `PreparedCorpus`
+        """
+        if self.prepared is None:
+            raise ValueError('build() should be called before update()')
+        if isinstance(new_corpus, PreparedCorpus):
+            new_df = new_corpus.df
+        else:
+            new_df = CorpusParser(tethne_corpus=new_corpus).parse()
+        new_df = new_df[~new_df.index.isin(self.prepared.df.index)]
+        if len(new_df) == 0:
+            return self.identity_clusters
+        prepared = PreparedCorpus(df=pd.concat([self.prepared.df, new_df]))
+        # Only the blocks whose pairs were all considered can be reused.
+        previous = dict((label, components) for label, components in self.components.items()
+                        if self.block_stats[label].get('sub_blocks', 1) == 1
+                        and not self.block_stats[label].get('truncated'))
+        with metrics.stage('identity_cluster'):
+            return self.cluster(prepared, n_jobs=n_jobs, previous=previous)
+
+    def cluster(self, prepared, n_jobs=1, previous=None):
+        """Clusters the instances of `prepared` and keeps the state. `previous` holds the ``components`` of a previous
+        run over a subset of the instances, see `update()`."""
+        initial_clusters = InitialCluster(corpus=prepared, threshold=self.threshold, blocking=self.blocking).build()
+        previous = previous or {}
+        previous_blocks = {}
+        for label, components in previous.items():
+            for component in components:
+                for index in component:
+                    previous_blocks[index] = label
+        index = prepared.df.index
+
+        self.prepared = prepared
+        self.initial_clusters = initial_clusters
+        self.identity_clusters = {}
+        self.components = {}
+        self.block_stats = {}
+        blocks = {}
+        settled = {}
         for x in initial_clusters:
-            self.identity_clusters[x] = set()
-            current_df = df[df['AUTH_LITERAL'].isin([x])]
-            for index, _ in current_df.iterrows():
-                self.identity_clusters[x].add(index)
-
-            current_block = df[df['AUTH_LITERAL'].isin(initial_clusters[x])]
-
-            if len(current_block) > 1:
-                for index, row in current_block.iterrows():
-                    counter = False
-                    for index_child, row_child in current_block.iterrows():
-                        if index != index_child:
-                            score = classify(row, row_child)
-                            if score[0] == 1:
-                                counter = True
-                                self.identity_clusters[x].add(index)
-                            if counter:
-                                break
+            self.identity_clusters[x] = set(prepared.rows([x]).index)
+            positions = prepared.positions(initial_clusters[x])
+            metrics.observe('block_size', len(positions))
+            if len(positions) < 2:
+                continue
+            if self.max_block_size is not None and len(positions) > self.max_block_size:
+                sub_blocks = split_block(prepared.df, positions, self.max_block_size, keys=self.split_keys)
+                logger.info("Block %s of %s instances split into %s sub-blocks (largest %s)", x, len(positions),
+                            len(sub_blocks), max(len(sub_block) for sub_block in sub_blocks))
+            else:
+                sub_blocks = [positions]
+            self.block_stats[x] = {'size': len(positions), 'pairs': len(positions) * (len(positions) - 1) // 2,
+                                   'compared': 0, 'settled': 0, 'truncated': False, 'sub_blocks': len(sub_blocks)}
+            self.components[x] = []
+            for i, sub_block in enumerate(sub_blocks):
+                if len(sub_block) < 2:
+                    self.components[x].append(set(index[sub_block]))
+                    continue
+                blocks[x, i] = sub_block
+                # A previous block is settled if all its instances are in this block.
+                counts = Counter(previous_blocks.get(instance) for instance in index[sub_block])
+                settled[x, i] = [[index.get_indexer(list(component)) for component in previous[label]]
+                                 for label in sorted(label for label in counts if label is not None)
+                                 if counts[label] == sum(len(component) for component in previous[label])]
+
+        for (x, _), components, stats in cluster_blocks(prepared.df, blocks, n_jobs=n_jobs, settled=settled,
+                                                        max_pairs=self.max_pairs, cascade=self.cascade,
+                                                        decisions=self.decisions):
+            # An instance which matched at least one other instance of the block is in a component of size > 1.
+            for component in components:
+                if len(component) > 1:
+                    self.identity_clusters[x].update(component)
+            self.components[x].extend(components)
+            self.block_stats[x]['compared'] += stats['compared']
+            self.block_stats[x]['settled'] += stats['settled']
+            self.block_stats[x]['truncated'] |= stats['truncated']
+        for x, stats in self.block_stats.items():
+            stats['avoided'] = stats['pairs'] - stats['compared']
+            metrics.count('pairs_compared', stats['compared'])
+            metrics.count('pairs_avoided', stats['avoided'])
+            if stats['truncated']:
+                logger.warning("Block %s : pair budget of %s reached, %s of %s pairs classified", x, self.max_pairs,
+                               stats['compared'], stats['pairs'])
+        logger.debug("Pairs compared %s (settled by the cascade %s), pairs avoided %s",
+                     sum(stats['compared'] for stats in self.block_stats.values()),
+                     sum(stats['settled'] for stats in self.block_stats.values()),
+                     sum(stats['avoided'] for stats in self.block_stats.values()))
         return self.identity_clusters
 
+    def save(self, path):
+        """Saves the clustering state (instances, initial clusters, components and identity clusters) to `path`."""
+        state = {'threshold': self.threshold,
+                 'blocking': self.blocking,
+                 'max_block_size': self.max_block_size,
+                 'split_keys': self.split_keys,
+                 'max_pairs': self.max_pairs,
+                 'cascade': self.cascade,
+                 'df': self.prepared.df,
+                 'initial_clusters': self.initial_clusters,
+                 'components': self.components,
+                 'block_stats': self.block_stats,
+                 'identity_clusters': self.identity_clusters}
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Returns an `IdentityCluster` with the clustering state saved by `save()`, ready for `update()`."""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        names = ('blocking', 'max_block_size', 'split_keys', 'max_pairs', 'cascade')
+        settings = dict((name, state[name]) for name in names if name in state)
+        identity_cluster = cls(corpus=PreparedCorpus(df=state['df']), threshold=state['threshold'], **settings)
+        identity_cluster.prepared = identity_cluster.corpus
+        identity_cluster.initial_clusters = state['initial_clusters']
+        identity_cluster.components = state['components']
+        identity_cluster.block_stats = state['block_stats']
+        identity_cluster.identity_clusters = state['identity_clusters']
+        return identity_cluster
+
+
+class GraphCluster:
+    """GraphCluster : Clusters Author-Paper instances from the match probabilities of all the pairs of each block.
+
+    `IdentityCluster` keeps only the components built from the hard labels of the classifier, and skips the pairs it
+    does not need for them. `GraphCluster` classifies every pair of each initial cluster once (`score()`) and keeps the
+    match probabilities as one sparse matrix per block (``scores``). The clusters are then built from the matrices at
+    any probability threshold (`cluster()`), in milliseconds and without classifying any pair again, either as the
+    connected components of the pairs above the threshold or by average-linkage hierarchical clustering.
+
+    At the threshold 0.5 the connected components are those of `IdentityCluster`, but `score()` classifies all the
+    pairs of a block rather than the few `IdentityCluster` needs: pass a `Cascade` or a `DecisionStore` to make it
+    cheaper.
+
+    Example:
+        >>> from authors.cluster import GraphCluster
+        >>> graph_cluster = GraphCluster(corpus=prepared)
+        >>> identity_clusters = graph_cluster.build() # same as IdentityCluster(corpus=prepared).build()
+        >>> strict = graph_cluster.cluster(probability=0.9)
+        >>> averaged = graph_cluster.cluster(probability=0.7, method='average')
+    """
+
+    methods = ('components', 'average')
 
+    def __init__(self, corpus, threshold=70, blocking=None, cascade=None, decisions=None):
+        """Initialisation(__init__()) for the class `GraphCluster`
 
-corpus = wos.read('/Users/aosingh/tethne-services/tests/data/Boyer_Barbara.txt')
-idenityobj = IdentityCluster(corpus=corpus)
-idenityobj.build()
+        Args:
+            corpus (`Tethne` corpus object or `PreparedCorpus`)
+            threshold (int) : name similarity threshold passed on to `InitialCluster`
+            blocking (`BlockingStrategy`) : blocking strategy passed on to `InitialCluster`
+            cascade (`authors.cascade.Cascade`) : settles the obvious pairs with cheap rules before the classifier
+            decisions (`authors.decisions.DecisionStore`) : store of the pair decisions of previous runs
 
+        Raises:
+            ValueError: If the input parameter `corpus` is neither a `tethne.Corpus` nor a `PreparedCorpus`
+        """
+        if not isinstance(corpus, (Corpus, PreparedCorpus)):
+            raise ValueError("The input object should be a Tethne Corpus object or a PreparedCorpus")
+        self.corpus = corpus
+        self.threshold = threshold
+        self.blocking = blocking
+        self.cascade = cascade
+        self.decisions = decisions
+        self.prepared = None
+        self.initial_clusters = {}
+        self.scores = {}
+        self.label_instances = {}
+        self.components = {}
+        self.identity_clusters = {}
+
+    def score(self, n_jobs=1):
+        """
+        Classifies every pair of instances of each initial cluster and keeps their match probabilities in ``scores``, a
+        dictionary mapping a block label to a tuple (index, matrix) as returned by `engine.score_block`.
+
+        Args:
+            n_jobs (int) : number of worker processes, as in `IdentityCluster.build()`
+
+        Returns:
+            `Dictionary` : ``scores``
+        """
+        with metrics.stage('graph_score'):
+            self.prepared = prepare_corpus(self.corpus)
+            self.initial_clusters = InitialCluster(corpus=self.prepared, threshold=self.threshold,
+                                                   blocking=self.blocking).build()
+            blocks = dict((label, self.prepared.positions(members)) for label, members in self.initial_clusters.items())
+            self.scores = {}
+            # Instances of the literal of each label, looked up once rather than at every `cluster()`.
+            literals = self.prepared.df.groupby('AUTH_LITERAL').groups
+            self.label_instances = dict((label, set(literals.get(label, []))) for label in self.initial_clusters)
+            for label, index, matrix, stats in score_blocks(self.prepared.df, blocks, n_jobs=n_jobs,
+                                                            cascade=self.cascade, decisions=self.decisions):
+                self.scores[label] = (index, matrix)
+                metrics.count('pairs_compared', stats['pairs'])
+        return self.scores
+
+    def cluster(self, probability=0.5, method='components'):
+        """
+        Builds the identity clusters from ``scores`` (see `score()`), without classifying any pair.
+
+        Args:
+            probability (float) : match probability threshold. With ``components``, pairs above it are linked; with
+                                  ``average``, clusters are merged while the average probability of their pairs is at
+                                  least `probability`.
+            method (str) : ``components`` (see `engine.probability_components`) or ``average`` (see
+                           `engine.average_linkage`)
+
+        Returns:
+            `Dictionary` : the identity clusters, as returned by `IdentityCluster.build()`. The components of each block
+            are kept in ``components``.
+
+        Raises:
+            ValueError: If `method` is unknown, or `score()` was never called
+        """
+        if method not in self.methods:
+            raise ValueError('Unknown method %r, expected one of %s' % (method, self.methods))
+        if self.prepared is None:
+            raise ValueError('score() should be called before cluster()')
+        clustering = probability_components if method == 'components' else average_linkage
+        self.components = {}
+        self.identity_clusters = {}
+        for label, (index, matrix) in self.scores.items():
+            self.identity_clusters[label] = set(self.label_instances[label])
+            self.components[label] = [set(index[group]) for group in clustering(matrix, probability)]
+            for component in self.components[label]:
+                if len(component) > 1:
+                    self.identity_clusters[label].update(component)
+        return self.identity_clusters
+
+    def build(self, probability=0.5, method='components', n_jobs=1):
+        """Scores the pairs (once) and returns the identity clusters at `probability`, see `score()` and `cluster()`."""
+        if self.prepared is None:
+            self.score(n_jobs=n_jobs)
+        return self.cluster(probability=probability, method=method)
+
+
+def disambiguate(corpus, lastname, firstname, threshold=70):
+    """
+    Finds the papers of one researcher, without clustering the rest of the corpus.
+
+    The queried name is turned into an author literal (``LASTNAME + FIRSTNAME``, upper case) and used as the label of
+    a single initial cluster: the block holds the instances of every literal which passes the name-similarity rule of
+    `InitialCluster` against it, looked up in a `LiteralIndex`. Only the pairs of this block are classified (as in
+    `IdentityCluster`), so the time taken depends on the size of the block, not of the corpus. The instances of the
+    literals closest to the query are the seeds, and every component holding a seed is returned: one set per person
+    the classifier tells apart under that name.
+
+    ``Example``
+        >>> from authors.cluster import disambiguate
+        >>> prepared = PreparedCorpus(tethne_corpus=wos.read('./data/Albertini_David.txt'))
+        >>> people = disambiguate(prepared, 'Albertini', 'David F')
+        >>> papers = people[0] # set of the Author-Paper indices of the largest match
+
+    :param corpus: `Tethne` corpus object or `PreparedCorpus`. Pass a `PreparedCorpus` to run several queries on the
+                   same corpus.
+    :param lastname: (str) last name of the researcher
+    :param firstname: (str) first name(s) or initials of the researcher
+    :param threshold: (int) `fuzz.ratio` threshold of the name-similarity rule, as in `InitialCluster`
+    :return: list of sets of Author-Paper instance indices, largest first. Empty if no literal matches the name.
+    """
+    prepared = prepare_corpus(corpus)
+    query = (lastname.strip() + firstname.strip()).upper()
+    literals = [literal for literal in prepared.literal_index(threshold).candidates(query)
+                if name_matches(literal, query, threshold)]
+    if not literals:
+        return []
+    similarity = dict((literal, max(fuzz.ratio(literal, query), fuzz.ratio(query, literal))) for literal in literals)
+    best = max(similarity.values())
+    seeds = set(prepared.rows([literal for literal in literals if similarity[literal] == best]).index)
+
+    components, stats = cluster_block(prepared.df, prepared.positions(literals))
+    logger.debug("Block of %s : %s literals, %s instances, %s pairs compared", query, len(literals), stats['size'],
+                 stats['compared'])
+    matches = [component for component in components if component & seeds]
+    return sorted(matches, key=lambda component: (-len(component), min(component)))
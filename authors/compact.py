@@ -0,0 +1,206 @@
+"""
+Compact layout of the Author-Paper instance table returned by `CorpusParser.parse()`.
+
+Most columns of the table repeat a few values many times: every author of a paper repeats the WOS ID, title, journal
+and publisher of the paper, and an author literal appears once per paper of the author. The list-valued columns hold
+one Python list per row. `CompactInstances` stores
+    * the repeated strings as pandas categoricals (one small integer code per row),
+    * the list-valued columns as `ListColumn`s (a flat array of integer codes into the unique items plus an offset
+      array),
+    * no string index : the integer position is the primary key, and the string index of `parse()` (``LASTNAME +
+      FIRSTNAME + WOSID``, i.e. ``AUTH_LITERAL + WOSID``) is rebuilt from the categoricals when asked for.
+
+Example:
+    >>> from authors.compact import CompactInstances
+    >>> df = CorpusParser(tethne_corpus=corpus).parse()
+    >>> compact = CompactInstances(df)
+    >>> compact.memory_usage()['total'] # bytes, to compare with df.memory_usage(deep=True).sum()
+    >>> compact.positions(['BOYERBCWOS:000076265300004']) # array([0])
+    >>> compact.to_frame().equals(df) # True
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from authors.paperinstances import columns
+
+
+# Columns stored as pandas categoricals.
+categorical_columns = ['WOSID', 'DATE', 'TITLE', 'LASTNAME', 'FIRSTNAME', 'JOURNAL', 'PUBLISHER', 'AUTH_LITERAL']
+
+# Columns stored as `ListColumn`s. EMAILADDRESS and INSTITUTE hold either a list or a single value.
+list_columns = ['EMAILADDRESS', 'SUBJECT', 'WC', 'AUTHOR_KEYWORDS', 'INSTITUTE', 'CO-AUTHORS']
+
+
+class ListColumn:
+    """ListColumn : A column of lists stored as flat arrays.
+
+    The items of row i are ``items[codes[offsets[i]:offsets[i + 1]]]``, where ``items`` holds every distinct item once.
+    Rows holding a single value instead of a list (as EMAILADDRESS and INSTITUTE sometimes do) are stored as a list of
+    one item and flagged in ``scalars``. Items are told apart by type as well as value (``'X'`` and ``u'X'`` are
+    distinct), because the scoring code treats them differently.
+
+    Example:
+        >>> column = ListColumn.from_values([[u'A', u'B'], u'A', []])
+        >>> column[0], column[1], column[2] # ([u'A', u'B'], u'A', [])
+        >>> column.codes, column.offsets # array([0, 1, 0]), array([0, 2, 3, 3])
+    """
+
+    def __init__(self, offsets, codes, items, scalars):
+        self.offsets = offsets
+        self.codes = codes
+        self.items = items
+        self.scalars = scalars
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Builds a `ListColumn` from a sequence of lists (or single values).
+
+        :param values: sequence with one list or hashable value per row
+        :return: `ListColumn`
+
+        Raises:
+            ValueError: If an item is not hashable
+        """
+        ids = {}
+        items = []
+        offsets = [0]
+        codes = []
+        scalars = []
+        for value in values:
+            is_scalar = not isinstance(value, list)
+            for item in ([value] if is_scalar else value):
+                try:
+                    key = (type(item), item)
+                    code = ids.get(key)
+                except TypeError:
+                    raise ValueError('Items of a list column should be hashable, got %r' % (item,))
+                if code is None:
+                    code = ids[key] = len(items)
+                    items.append(item)
+                codes.append(code)
+            offsets.append(len(codes))
+            scalars.append(is_scalar)
+        item_array = np.empty(len(items), dtype=object)
+        item_array[:] = items
+        return cls(offsets=np.array(offsets, dtype=np.int64), codes=np.array(codes, dtype=smallest_int(len(items))),
+                   items=item_array, scalars=np.array(scalars, dtype=bool))
+
+    def __len__(self):
+        return len(self.scalars)
+
+    def __getitem__(self, i):
+        values = list(self.items.take(self.codes[self.offsets[i]:self.offsets[i + 1]]))
+        if self.scalars[i]:
+            return values[0]
+        return values
+
+    def to_list(self, positions=None):
+        """Returns the values of the rows at `positions` (all rows by default) as new Python lists."""
+        if positions is None:
+            positions = range(len(self))
+        return [self[i] for i in positions]
+
+    def memory_usage(self):
+        """Returns the size in bytes of the arrays and of the distinct items."""
+        return (self.offsets.nbytes + self.codes.nbytes + self.scalars.nbytes + self.items.nbytes +
+                sum(object_size(item) for item in self.items))
+
+
+class CompactInstances:
+    """CompactInstances : The Author-Paper instance table in a compact, categorical layout.
+
+    See the module documentation. `to_frame()` rebuilds the DataFrame of `CorpusParser.parse()`, completely or for a
+    subset of the rows, so that only the rows being worked on have to be expanded into Python objects.
+
+    Example:
+        >>> compact = CompactInstances(df)
+        >>> compact.table['JOURNAL'] # categorical
+        >>> compact.lists['CO-AUTHORS'][0] # [(u'MARTINDALE', u'MARK Q'), ...]
+        >>> block = compact.to_frame(compact.positions(['BOYERBCWOS:000076265300004']))
+    """
+
+    def __init__(self, df):
+        """Initialisation(__init__()) for the class `CompactInstances`
+
+        Args:
+            df (pandas DataFrame) : Author-Paper instances as returned by `CorpusParser.parse()`
+        """
+        self.table = pd.DataFrame(dict((column, categorical(df[column].values)) for column in categorical_columns),
+                                  columns=categorical_columns)
+        self.lists = dict((column, ListColumn.from_values(df[column].values)) for column in list_columns)
+        self._key_index = None
+
+    def __len__(self):
+        return len(self.table)
+
+    def keys(self, positions=None):
+        """Returns the string index of `CorpusParser.parse()` of the rows at `positions` (all rows by default)."""
+        literals = self.table['AUTH_LITERAL'].values
+        wosids = self.table['WOSID'].values
+        if positions is not None:
+            literals, wosids = literals.take(positions), wosids.take(positions)
+        return pd.Index([literal + wosid for literal, wosid in zip(literals, wosids)], dtype=object)
+
+    def positions(self, keys):
+        """
+        Maps string index values back to integer primary keys. The mapping is built on first use.
+
+        :param keys: sequence of index values of `CorpusParser.parse()`
+        :return: numpy array of positions
+
+        Raises:
+            KeyError: If a key is unknown
+        """
+        if self._key_index is None:
+            self._key_index = self.keys()
+        positions = self._key_index.get_indexer(list(keys))
+        if (positions < 0).any():
+            raise KeyError('Unknown Author-Paper instance indices: %s' % list(np.asarray(keys)[positions < 0]))
+        return positions
+
+    def to_frame(self, positions=None):
+        """
+        Rebuilds the DataFrame of `CorpusParser.parse()`.
+
+        :param positions: integer positions of the rows to rebuild, in the order wanted. All rows by default.
+        :return: pandas DataFrame with the 14 columns of `CorpusParser.parse()` and its string index.
+        """
+        data = {}
+        for column in categorical_columns:
+            values = np.asarray(self.table[column].values, dtype=object)
+            data[column] = values if positions is None else values.take(positions)
+        for column in list_columns:
+            data[column] = self.lists[column].to_list(positions)
+        return pd.DataFrame(data, columns=columns, index=self.keys(positions))
+
+    def memory_usage(self):
+        """Returns the size in bytes of every column, and their ``total``."""
+        usage = dict((column, int(self.table[column].memory_usage(index=False, deep=True)))
+                     for column in categorical_columns)
+        usage.update((column, self.lists[column].memory_usage()) for column in list_columns)
+        usage['total'] = sum(usage.values())
+        return usage
+
+
+def categorical(values):
+    """Returns `values` as a categorical, with the categories in order of first appearance."""
+    codes, uniques = pd.factorize(values)
+    return pd.Categorical.from_codes(codes, uniques)
+
+
+def smallest_int(count):
+    """Returns the smallest signed integer dtype which can hold the codes 0 .. count - 1."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if count <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.int64
+
+
+def object_size(value):
+    """Returns the size in bytes of `value`, including the items of a tuple."""
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(object_size(item) for item in value)
+    return sys.getsizeof(value)
@@ -0,0 +1,169 @@
+"""
+Persistent store of pair decisions, reused across runs.
+
+`IdentityCluster` classifies the same pairs of Author-Paper instances again in every run over overlapping corpora.
+`DecisionStore` keeps the label and match probability of every classified pair in a SQLite database, keyed by the
+indices of both instances (``AUTH_LITERAL`` + ``WOSID``, stable across runs) and by the version of the model (see
+`model_version`). `classify_pairs` looks the pairs up before computing any feature, classifies only the unknown ones
+and writes them back, so that clustering the same instances again is mostly lookups. Only the decisions of the
+classifier are stored: the pairs settled by the rules of a `authors.cascade.Cascade` are settled again in every run.
+
+The classifier is symmetric, so a pair is stored once whatever the order of its instances. The database is opened in
+WAL mode and may be shared by the worker processes of ``IdentityCluster.build(n_jobs > 1)``; each process opens its own
+connection and reuses it for all its lookups and writes.
+
+Example:
+    >>> from authors.decisions import DecisionStore
+    >>> decisions = DecisionStore('decisions.sqlite')
+    >>> IdentityCluster(corpus=corpus, decisions=decisions).build() # classifies and stores every pair
+    >>> IdentityCluster(corpus=corpus, decisions=decisions).build() # lookups only
+    >>> decisions.info() # {'hits': 6217, 'misses': 6217, 'writes': 6217, 'size': 6217, 'model': '5f1c...'}
+"""
+import os
+import sqlite3
+import threading
+
+from authors.cache import content_hash
+from authors.models import get_classifier_path
+
+
+_versions = {}
+
+# Number of pairs looked up or written per statement batch.
+batch_size = 5000
+
+
+def model_version(path=None):
+    """
+    Returns the version of the model at `path`: the SHA-1 of the model file and of ``parser_version``, as the features
+    of a pair depend on both.
+
+    :param path: path of the model. ``None`` uses the path of `get_classifier()`.
+    :return: (str) hex digest
+    """
+    path = os.path.abspath(path or get_classifier_path())
+    stat = os.stat(path)
+    key = (path, stat.st_mtime, stat.st_size)
+    if key not in _versions:
+        _versions[key] = content_hash(path)
+    return _versions[key]
+
+
+class DecisionStore:
+    """DecisionStore : SQLite store of the label and match probability of pairs of Author-Paper instances.
+
+    ``hits`` and ``misses`` count the pairs looked up, ``writes`` the pairs stored by this object.
+    """
+
+    def __init__(self, path, model=None, timeout=60.0):
+        """Initialisation(__init__()) for the class `DecisionStore`
+
+        Args:
+            path (str) : path of the SQLite database, created if needed
+            model (str) : model version the decisions belong to. ``None`` uses `model_version()` of the current model.
+            timeout (float) : seconds to wait for a lock held by another process
+        """
+        self.path = path
+        self.model = model or model_version()
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.local = threading.local()
+
+    def __getstate__(self):
+        # Connections can not be pickled : a copy sent to a worker process opens its own.
+        state = dict(self.__dict__)
+        del state['local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.local = threading.local()
+
+    @property
+    def connection(self):
+        """The connection of this thread, opened on first use."""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS decisions (model TEXT, first TEXT, second TEXT, '
+                               'label INTEGER, probability REAL, PRIMARY KEY (model, first, second)) WITHOUT ROWID')
+            connection.execute('CREATE TEMP TABLE IF NOT EXISTS query (first TEXT, second TEXT)')
+            connection.commit()
+            self.local.connection = connection
+        return connection
+
+    def close(self):
+        """Closes the connection of this thread. The store opens a new one if used again."""
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    @staticmethod
+    def key(first, second):
+        return (first, second) if first <= second else (second, first)
+
+    def get(self, pairs):
+        """
+        Looks up the decisions of many pairs at once.
+
+        :param pairs: list of (index, index) pairs of instances
+        :return: dictionary mapping each pair found (as given) to a tuple (label, probability)
+        """
+        keys = {}
+        for pair in pairs:
+            keys.setdefault(self.key(*pair), []).append(pair)
+        found = {}
+        connection = self.connection
+        unique = list(keys)
+        for start in range(0, len(unique), batch_size):
+            connection.execute('DELETE FROM query')
+            connection.executemany('INSERT INTO query VALUES (?, ?)', unique[start:start + batch_size])
+            rows = connection.execute('SELECT d.first, d.second, d.label, d.probability FROM query q '
+                                      'JOIN decisions d ON d.model = ? AND d.first = q.first AND d.second = q.second',
+                                      (self.model,))
+            for first, second, label, probability in rows:
+                for pair in keys[(first, second)]:
+                    found[pair] = (label, probability)
+        connection.execute('DELETE FROM query')
+        connection.commit()
+        self.hits += len(found)
+        self.misses += len(pairs) - len(found)
+        return found
+
+    def put(self, pairs, labels, probabilities):
+        """
+        Stores the decisions of many pairs at once, in one transaction. A decision already stored is replaced.
+
+        :param pairs: list of (index, index) pairs of instances
+        :param labels: label of each pair
+        :param probabilities: match probability of each pair
+        """
+        rows = [self.key(*pair) + (int(label), float(probability))
+                for pair, label, probability in zip(pairs, labels, probabilities)]
+        connection = self.connection
+        with connection:
+            for start in range(0, len(rows), batch_size):
+                connection.executemany('INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?, ?)',
+                                       [(self.model,) + row for row in rows[start:start + batch_size]])
+        self.writes += len(rows)
+
+    def __len__(self):
+        """Returns the number of decisions stored for the model of this store."""
+        return self.connection.execute('SELECT COUNT(*) FROM decisions WHERE model = ?', (self.model,)).fetchone()[0]
+
+    def clear(self, all_models=False):
+        """Deletes the decisions of the model of this store, or of every model."""
+        with self.connection as connection:
+            if all_models:
+                connection.execute('DELETE FROM decisions')
+            else:
+                connection.execute('DELETE FROM decisions WHERE model = ?', (self.model,))
+
+    def info(self):
+        """Returns the counters, the number of decisions stored for the model and the model version."""
+        return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes, 'size': len(self), 'model': self.model}
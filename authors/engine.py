@@ -0,0 +1,384 @@
+from authors.blocking import first_initial
+from authors.paperinstances import Compare, FeatureStore, classify_pairs
+from scipy import sparse
+from scipy.sparse import csgraph
+import multiprocessing
+import numpy as np
+import logging
+
+
+logger = logging.getLogger('AuthorCluster')
+
+
+class UnionFind:
+    """UnionFind : Disjoint sets over the integers 0 .. n-1, with union by size and path halving.
+
+    Example:
+        >>> forest = UnionFind(4)
+        >>> forest.union(0, 2)
+        >>> forest.same(0, 2) # True
+        >>> forest.components() # [[0, 2], [1], [3]]
+    """
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, a):
+        parent = self.parent
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    def union(self, a, b):
+        """Merges the sets of `a` and `b`. Returns ``False`` if they already were in the same set."""
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return True
+
+    def same(self, a, b):
+        return self.find(a) == self.find(b)
+
+    def components(self):
+        """Returns the sets as sorted lists, ordered by their smallest member."""
+        components = {}
+        for a in range(len(self.parent)):
+            components.setdefault(self.find(a), []).append(a)
+        return sorted(components.values())
+
+
+def cluster_block(df, positions, chunk_size=None, settled=None, max_pairs=None, cascade=None, decisions=None):
+    """
+    Groups the Author-Paper instances of one block into identity components.
+
+    Every unordered pair of instances is considered once. Pairs classified as a match are merged in a `UnionFind`, and
+    pairs whose instances are already in the same component are not classified at all, as the classifier can not
+    change the components any more. The instances are preprocessed once into a `FeatureStore`, and the pairs of one
+    instance are sent to `classify_pairs` together.
+
+    `settled` describes groups of instances whose pairs have all been classified before (the blocks of a previous run,
+    see `IdentityCluster.update`). Their components are merged up front and no pair inside a group is classified again.
+    The components are the connected components of the match graph either way, so the result is the same as without
+    `settled`.
+
+    With `max_pairs`, at most that many pairs are classified: the remaining pairs are dropped and ``truncated`` is set
+    in the stats.
+
+    With a `cascade` (see `authors.cascade`), the pairs its rules settle are not sent to the classifier; their number is
+    ``settled`` in the stats. With a `decisions` store (see `authors.decisions`), the pairs it knows are not classified
+    again; they still count as compared.
+
+    ``Example``
+        >>> positions = prepared.positions(initial_clusters['BOYERB'])
+        >>> components, stats = cluster_block(prepared.df, positions)
+        >>> stats # {'size': 31, 'pairs': 465, 'compared': 45, 'avoided': 420, 'settled': 0, 'truncated': False}
+
+    :param df: DataFrame of Author-Paper instances
+    :param positions: integer row positions in `df` of the instances of the block
+    :param chunk_size: passed on to `classify_pairs`
+    :param settled: list of settled groups. A group is the list of its components, each component a list of row
+                    positions in `df` (all of them in `positions`).
+    :param max_pairs: (int) pair budget of the block. ``None`` classifies every pair which can change the components.
+    :param cascade: `authors.cascade.Cascade` passed on to `classify_pairs`
+    :param decisions: `authors.decisions.DecisionStore` passed on to `classify_pairs`
+    :return: tuple (components, stats). components is a list of sets of `df` indices; stats is a dictionary with the
+             block size, the number of unordered pairs, the number of pairs compared and avoided, the number of pairs
+             settled by the cascade, and whether the pair budget cut the work short (``truncated``).
+    """
+    positions = np.asarray(positions, dtype=np.intp)
+    n = len(positions)
+    store = FeatureStore(df.iloc[positions])
+    forest = UnionFind(n)
+    groups = [-1] * n
+    local = dict((position, i) for i, position in enumerate(positions))
+    for group, components in enumerate(settled or ()):
+        for component in components:
+            members = [local[position] for position in component]
+            for member in members:
+                groups[member] = group
+                forest.union(members[0], member)
+    compared = 0
+    truncated = False
+    modelled = cascade.counters['model'] if cascade is not None else 0
+    for i in range(n - 1):
+        group = groups[i]
+        others = [j for j in range(i + 1, n) if not (group != -1 and groups[j] == group) and not forest.same(i, j)]
+        if not others:
+            continue
+        if max_pairs is not None and compared + len(others) > max_pairs:
+            others = others[:max_pairs - compared]
+            truncated = True
+            if not others:
+                break
+        pairs = np.column_stack((np.repeat(i, len(others)), others))
+        labels = classify_pairs(store, pairs, chunk_size=chunk_size, cascade=cascade, decisions=decisions)
+        compared += len(others)
+        for j, label in zip(others, labels):
+            if label == 1:
+                forest.union(i, j)
+        if truncated:
+            break
+
+    components = [set(store.index[component]) for component in forest.components()]
+    pairs = n * (n - 1) // 2
+    settled_pairs = compared - (cascade.counters['model'] - modelled) if cascade is not None else 0
+    stats = {'size': n, 'pairs': pairs, 'compared': compared, 'avoided': pairs - compared, 'settled': settled_pairs,
+             'truncated': truncated}
+    return components, stats
+
+
+def cluster_block_task(task):
+    """Runs `cluster_block` on a (label, block DataFrame, settled groups, pair budget, cascade, decision store) task
+    inside a worker process."""
+    label, block_df, settled, max_pairs, cascade, decisions = task
+    components, stats = cluster_block(block_df, np.arange(len(block_df)), settled=settled, max_pairs=max_pairs,
+                                      cascade=cascade, decisions=decisions)
+    return label, components, stats
+
+
+def local_settled(positions, settled):
+    """Maps the row positions of settled groups (see `cluster_block`) to positions within the block rows."""
+    if not settled:
+        return settled
+    local = dict((position, i) for i, position in enumerate(positions))
+    return [[[local[position] for position in component] for component in group] for group in settled]
+
+
+def cluster_blocks(df, blocks, n_jobs=1, settled=None, max_pairs=None, cascade=None, decisions=None):
+    """
+    Runs `cluster_block` for many blocks, optionally spread over a pool of worker processes.
+
+    Blocks are scheduled from the largest to the smallest so that one big block started last can not keep the other
+    workers waiting. Each task carries only the rows of its block, not the whole DataFrame. The result does not depend
+    on `n_jobs`.
+
+    ``Example``
+        >>> blocks = dict((label, prepared.positions(members)) for label, members in initial_clusters.items())
+        >>> for label, components, stats in cluster_blocks(prepared.df, blocks, n_jobs=8):
+        >>>     print label, components
+
+    :param df: DataFrame of Author-Paper instances
+    :param blocks: dictionary mapping a block label to the integer row positions of its instances in `df`
+    :param n_jobs: (int) number of worker processes. 1 runs the blocks in this process, ``None`` or -1 use one process
+                   per CPU.
+    :param settled: dictionary mapping a block label to its settled groups, see `cluster_block`
+    :param max_pairs: (int) pair budget of every block, see `cluster_block`
+    :param cascade: `authors.cascade.Cascade` of every block, see `cluster_block`. The worker processes count with
+                    their own copy, so with `n_jobs` > 1 only the stats of the blocks report the settled pairs.
+    :param decisions: `authors.decisions.DecisionStore` of every block, see `cluster_block`. Each worker process opens
+                      its own connection to the database.
+    :return: list of (label, components, stats) tuples, as returned by `cluster_block`, largest block first.
+    """
+    settled = settled or {}
+    order = sorted(blocks, key=lambda label: (-len(blocks[label]), label))
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = multiprocessing.cpu_count()
+    if n_jobs == 1 or len(order) < 2:
+        return [(label,) + cluster_block(df, blocks[label], settled=settled.get(label), max_pairs=max_pairs,
+                                         cascade=cascade, decisions=decisions)
+                for label in order]
+
+    tasks = ((label, df.iloc[blocks[label]], local_settled(blocks[label], settled.get(label)), max_pairs, cascade,
+              decisions)
+             for label in order)
+    pool = multiprocessing.Pool(processes=min(n_jobs, len(order)))
+    try:
+        results = dict((result[0], result) for result in pool.imap_unordered(cluster_block_task, tasks, chunksize=1))
+    finally:
+        pool.close()
+        pool.join()
+    return [results[label] for label in order]
+
+
+def score_block(df, positions, chunk_size=None, cascade=None, decisions=None):
+    """
+    Classifies every unordered pair of instances of one block and returns their match probabilities as a sparse
+    matrix, from which the components can be rebuilt at any probability threshold (see `probability_components` and
+    `average_linkage`) without classifying the pairs again.
+
+    Unlike `cluster_block`, no pair is skipped: a pair whose instances are already linked is classified too, as its
+    probability matters at a higher threshold.
+
+    ``Example``
+        >>> index, matrix, stats = score_block(prepared.df, prepared.positions(initial_clusters['BOYERB']))
+        >>> components = probability_components(matrix, probability=0.8)
+
+    :param df: DataFrame of Author-Paper instances
+    :param positions: integer row positions in `df` of the instances of the block
+    :param chunk_size: passed on to `classify_pairs`
+    :param cascade: `authors.cascade.Cascade` passed on to `classify_pairs`
+    :param decisions: `authors.decisions.DecisionStore` passed on to `classify_pairs`
+    :return: tuple (index, matrix, stats). index holds the `df` indices of the instances; matrix is a
+             `scipy.sparse.csr_matrix` of shape (n, n) holding the match probability of each pair (i, j), i < j, in its
+             upper triangle (pairs of probability 0 are not stored); stats is a dictionary with the block size and the
+             number of pairs.
+    """
+    positions = np.asarray(positions, dtype=np.intp)
+    n = len(positions)
+    store = FeatureStore(df.iloc[positions])
+    rows, columns = np.triu_indices(n, 1)
+    if len(rows):
+        _, probabilities = classify_pairs(store, np.column_stack((rows, columns)), chunk_size=chunk_size,
+                                          return_proba=True, cascade=cascade, decisions=decisions)
+    else:
+        probabilities = np.zeros(0)
+    stored = probabilities > 0
+    matrix = sparse.csr_matrix((probabilities[stored], (rows[stored], columns[stored])), shape=(n, n))
+    return np.asarray(store.index), matrix, {'size': n, 'pairs': len(rows)}
+
+
+def score_block_task(task):
+    """Runs `score_block` on a (label, block DataFrame, cascade, decision store) task inside a worker process."""
+    label, block_df, cascade, decisions = task
+    return (label,) + score_block(block_df, np.arange(len(block_df)), cascade=cascade, decisions=decisions)
+
+
+def score_blocks(df, blocks, n_jobs=1, cascade=None, decisions=None):
+    """
+    Runs `score_block` for many blocks, optionally spread over a pool of worker processes (see `cluster_blocks`).
+
+    :param df: DataFrame of Author-Paper instances
+    :param blocks: dictionary mapping a block label to the integer row positions of its instances in `df`
+    :param n_jobs: (int) number of worker processes, see `cluster_blocks`
+    :param cascade: `authors.cascade.Cascade` of every block
+    :param decisions: `authors.decisions.DecisionStore` of every block
+    :return: list of (label, index, matrix, stats) tuples, as returned by `score_block`, largest block first.
+    """
+    order = sorted(blocks, key=lambda label: (-len(blocks[label]), label))
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = multiprocessing.cpu_count()
+    if n_jobs == 1 or len(order) < 2:
+        return [(label,) + score_block(df, blocks[label], cascade=cascade, decisions=decisions) for label in order]
+
+    tasks = ((label, df.iloc[blocks[label]], cascade, decisions) for label in order)
+    pool = multiprocessing.Pool(processes=min(n_jobs, len(order)))
+    try:
+        results = dict((result[0], result) for result in pool.imap_unordered(score_block_task, tasks, chunksize=1))
+    finally:
+        pool.close()
+        pool.join()
+    return [results[label] for label in order]
+
+
+def probability_components(matrix, probability=0.5):
+    """
+    Returns the connected components of the graph linking the pairs of `matrix` whose match probability is above
+    `probability`. At 0.5 these are the components `cluster_block` builds, as the classifier labels a pair as a match
+    when its probability is above 0.5.
+
+    :param matrix: sparse matrix of match probabilities, as returned by `score_block`
+    :param probability: (float) probability threshold
+    :return: list of arrays of positions in `matrix`, ordered by their first position
+    """
+    n = matrix.shape[0]
+    matrix = matrix.tocoo()
+    linked = matrix.data > probability
+    if not linked.any():
+        return [np.array([i], dtype=np.intp) for i in range(n)]
+    graph = sparse.csr_matrix((np.ones(linked.sum(), dtype=np.int8), (matrix.row[linked], matrix.col[linked])),
+                              shape=(n, n))
+    _, labels = csgraph.connected_components(graph, directed=False)
+    return grouped(labels)
+
+
+def average_linkage(matrix, probability=0.5):
+    """
+    Returns the clusters of an average-linkage hierarchical clustering of the instances of `matrix`, with the distance
+    1 - match probability, cut so that two clusters are merged while the average match probability of their pairs is at
+    least `probability`. Less prone than `probability_components` to chain distinct authors through a single pair.
+
+    :param matrix: sparse matrix of match probabilities, as returned by `score_block`
+    :param probability: (float) probability threshold
+    :return: list of arrays of positions in `matrix`, ordered by their first position
+    """
+    from scipy.cluster.hierarchy import fcluster, linkage
+    n = matrix.shape[0]
+    if n < 2 or (probability > 0 and not matrix.nnz):
+        return [np.array([i], dtype=np.intp) for i in range(n)]
+    # The condensed distance matrix of scipy lists the pairs (i, j), i < j, in the order of np.triu_indices.
+    distances = 1.0 - matrix.toarray()[np.triu_indices(n, 1)]
+    labels = fcluster(linkage(distances, method='average'), t=1.0 - probability, criterion='distance')
+    return grouped(labels)
+
+
+def grouped(labels):
+    """Groups the positions of `labels` by label, the groups ordered by their first position."""
+    groups = {}
+    for position, label in enumerate(labels):
+        groups.setdefault(label, []).append(position)
+    return sorted((np.array(group, dtype=np.intp) for group in groups.values()), key=lambda group: group[0])
+
+
+def initial_keys(rows):
+    """Secondary key : the first initial of each instance."""
+    return [first_initial(firstname) for firstname in rows['FIRSTNAME'].values]
+
+
+def coauthor_keys(rows):
+    """Secondary key : instances are linked when they share a co-author, and each group of linked instances gets one
+    key. Instances without co-authors share the key ``None``."""
+    forest = UnionFind(len(rows))
+    owners = {}
+    for i, coauthors in enumerate(rows['CO-AUTHORS'].values):
+        for coauthor in coauthors:
+            forest.union(i, owners.setdefault(coauthor, i))
+    return [forest.find(i) if len(coauthors) else None for i, coauthors in enumerate(rows['CO-AUTHORS'].values)]
+
+
+def institute_keys(rows):
+    """Secondary key : the organisation (first part) of the institute of each instance, as found by
+    `Compare.get_institute_name`, or ``None``."""
+    keys = []
+    for institutions, lastname in zip(rows['INSTITUTE'].values, rows['LASTNAME'].values):
+        institute = Compare.get_institute_name(institutions, lastname)
+        keys.append(institute.split(',')[0].strip().upper() if institute else None)
+    return keys
+
+
+# Secondary keys `split_block` can split a block with.
+secondary_keys = {'initial': initial_keys, 'coauthor': coauthor_keys, 'institute': institute_keys}
+
+
+def split_block(df, positions, max_size, keys=('initial', 'coauthor', 'institute')):
+    """
+    Splits a block larger than `max_size` instances into sub-blocks, so that only the pairs inside each sub-block are
+    classified. The block is split by the first secondary key of `keys` (instances with the same key stay together);
+    the sub-blocks still larger than `max_size` are split by the next key, and so on. Sub-blocks may remain larger than
+    `max_size` when the keys are exhausted.
+
+    ``Example``
+        >>> sub_blocks = split_block(prepared.df, prepared.positions(initial_clusters['SMITHJ']), max_size=200)
+
+    :param df: DataFrame of Author-Paper instances
+    :param positions: integer row positions in `df` of the instances of the block
+    :param max_size: (int) maximum number of instances of a sub-block
+    :param keys: names of the secondary keys, from ``secondary_keys``
+    :return: list of arrays of row positions, ordered by their first position
+
+    Raises:
+        ValueError: If a key is unknown
+    """
+    for key in keys:
+        if key not in secondary_keys:
+            raise ValueError('Unknown secondary key %r, expected one of %s' % (key, sorted(secondary_keys)))
+    positions = np.asarray(positions, dtype=np.intp)
+    pending = [(positions, 0)]
+    sub_blocks = []
+    while pending:
+        block, depth = pending.pop()
+        if len(block) <= max_size or depth == len(keys):
+            sub_blocks.append(block)
+            continue
+        groups = {}
+        for i, value in enumerate(secondary_keys[keys[depth]](df.iloc[block])):
+            groups.setdefault(value, []).append(i)
+        for members in groups.values():
+            pending.append((block[members], depth + 1))
+    return sorted(sub_blocks, key=lambda block: block[0])
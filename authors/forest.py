@@ -0,0 +1,197 @@
+"""
+Compiled random forest : the trees of a scikit-learn `RandomForestClassifier` as flat NumPy arrays.
+
+The serialized classifier in `classificationmodels/random_forest.pkl` can be converted into a `.npz` file with
+
+    $ python -m authors.forest classificationmodels/random_forest.pkl classificationmodels/random_forest.npz
+
+A `CompiledForest` scores N x 9 feature matrices with a handful of vectorized NumPy operations per tree level, does not
+need scikit-learn at all, and can be loaded from a memory-mapped `.npz` so that worker processes share one copy of the
+model.
+"""
+from __future__ import division
+import pickle
+import struct
+import sys
+import zipfile
+
+import numpy as np
+
+
+# Marker scikit-learn uses for the children of a leaf node.
+TREE_LEAF = -1
+
+# Arrays stored in the `.npz` file of a compiled forest.
+array_names = ['feature', 'threshold', 'left', 'right', 'value', 'roots', 'classes']
+
+
+class CompiledForest:
+    """CompiledForest : A random forest classifier evaluated directly on flat NumPy arrays.
+
+    The nodes of all the trees are concatenated. For node i, ``feature[i]`` and ``threshold[i]`` define the split
+    (go left if ``X[:, feature[i]] <= threshold[i]``), ``left[i]`` and ``right[i]`` are the children (-1 for a leaf) and
+    ``value[i]`` holds the class probabilities of the leaf. ``roots`` holds the root node of each tree.
+
+    The results are identical to those of the scikit-learn estimator it was compiled from: the input is cast to float32
+    like scikit-learn does, and the trees are averaged in the same order.
+
+    Example:
+        >>> from authors.forest import CompiledForest
+        >>> forest = CompiledForest.from_sklearn(clf)
+        >>> forest.save('random_forest.npz')
+        >>> forest = CompiledForest.load('random_forest.npz') # memory-mapped
+        >>> forest.predict(scores_df[features]) # same as clf.predict(scores_df[features])
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+
+    @classmethod
+    def from_sklearn(cls, clf):
+        """
+        Compiles a fitted scikit-learn `RandomForestClassifier` (single output).
+
+        :param clf: fitted `RandomForestClassifier`
+        :return: `CompiledForest`
+        """
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in clf.estimators_:
+            tree = estimator.tree_
+            leaf = tree.children_left == TREE_LEAF
+            proba = tree.value[:, 0, :]
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(leaf, TREE_LEAF, tree.children_left + offset))
+            right.append(np.where(leaf, TREE_LEAF, tree.children_right + offset))
+            value.append(proba / normalizer)
+            offset += tree.node_count
+        return cls(feature=np.concatenate(feature).astype(np.intp),
+                   threshold=np.concatenate(threshold).astype(np.float64),
+                   left=np.concatenate(left).astype(np.intp),
+                   right=np.concatenate(right).astype(np.intp),
+                   value=np.concatenate(value).astype(np.float64),
+                   roots=np.array(roots, dtype=np.intp),
+                   classes=np.asarray(clf.classes_))
+
+    def apply(self, X):
+        """
+        Returns the leaf reached in every tree by every sample, as an array of shape (n_samples, n_trees).
+
+        Each tree is walked one level at a time for all the samples which have not reached a leaf yet.
+
+        :param X: array-like of shape (n_samples, n_features)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        feature, threshold, left, right = self.feature, self.threshold, self.left, self.right
+        leaves = np.empty((X.shape[0], len(self.roots)), dtype=np.intp)
+        for tree, root in enumerate(self.roots):
+            rows = np.arange(X.shape[0])
+            node = np.repeat(root, X.shape[0])
+            while rows.size:
+                children = left[node]
+                internal = children != TREE_LEAF
+                leaves[rows[~internal], tree] = node[~internal]
+                rows, node, children = rows[internal], node[internal], children[internal]
+                go_left = X[rows, feature[node]] <= threshold[node]
+                node = np.where(go_left, children, right[node])
+        return leaves
+
+    def predict_proba(self, X):
+        """
+        Returns the class probabilities of every sample, shape (n_samples, n_classes), as averaged over all trees.
+
+        :param X: array-like of shape (n_samples, n_features)
+        """
+        leaves = self.apply(X)
+        proba = self.value[leaves[:, 0]].copy()
+        for tree in range(1, leaves.shape[1]):
+            proba += self.value[leaves[:, tree]]
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        """
+        Returns the predicted class of every sample.
+
+        :param X: array-like of shape (n_samples, n_features)
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def save(self, path):
+        """Saves the arrays into an uncompressed `.npz` file, which `load()` can memory-map."""
+        arrays = dict((name, getattr(self, name)) for name in array_names if name != 'classes')
+        np.savez(path, classes=self.classes_, **arrays)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Loads a compiled forest saved with `save()`.
+
+        :param path: path of the `.npz` file
+        :param mmap: (bool) memory-map the arrays read-only instead of reading them into memory. Processes which map the
+                     same file share its pages.
+        :return: `CompiledForest`
+        """
+        arrays = load_npz(path, mmap=mmap)
+        # Plain ndarray views of the mapped pages avoid the overhead of numpy.memmap on every indexing operation.
+        return cls(**dict((name, array.view(np.ndarray)) for name, array in arrays.items()))
+
+
+def load_npz(path, mmap=True):
+    """
+    Loads the arrays of an uncompressed `.npz` file. With `mmap`, every array is a read-only `numpy.memmap` over its
+    bytes inside the zip file (numpy.load ignores `mmap_mode` for `.npz` files).
+
+    :param path: path of the `.npz` file
+    :param mmap: (bool) memory-map the arrays
+    :return: dictionary mapping array names to arrays
+
+    Raises:
+        ValueError: If an array of the file is compressed and `mmap` is set
+    """
+    if not mmap:
+        with np.load(path) as npz:
+            return dict((name, npz[name]) for name in npz.files)
+
+    arrays = {}
+    with open(path, 'rb') as f:
+        for info in zipfile.ZipFile(f).infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError('%s is compressed and can not be memory-mapped' % info.filename)
+            # The data follows the 30 byte local file header, the file name and the extra field.
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-len('.npy')] if info.filename.endswith('.npy') else info.filename
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                     order='F' if fortran_order else 'C')
+    return arrays
+
+
+def main(argv):
+    if len(argv) != 3:
+        sys.stderr.write('usage: python -m authors.forest <classifier.pkl> <output.npz>\n')
+        return 2
+    with open(argv[1], 'rb') as f:
+        clf = pickle.load(f)
+    CompiledForest.from_sklearn(clf).save(argv[2])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
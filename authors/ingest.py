@@ -0,0 +1,112 @@
+"""
+Ingestion of many Web of Science export files into one table of Author-Paper instances.
+
+WoS exports come as many files per author or query, and the same paper often appears in several of them. `ingest()`
+reads and parses the files in a pool of worker processes (`wos.read` + `CorpusParser.parse()` per file, or an
+`InstanceCache` lookup), concatenates the instances in the order of the files, and drops the duplicate instances by
+their index (``AUTH_LITERAL`` + ``WOSID``), so that a paper found in overlapping exports is clustered only once.
+
+Example:
+    >>> from authors.cache import InstanceCache
+    >>> from authors.cluster import IdentityCluster
+    >>> from authors.ingest import ingest
+    >>> from authors.paperinstances import PreparedCorpus
+    >>> df = ingest('exports/', n_jobs=4) # every .txt file of the directory
+    >>> df = ingest(['Boyer_Barbara.txt', 'Hollinger_Thomas.txt'], cache=InstanceCache())
+    >>> identity_clusters = IdentityCluster(corpus=PreparedCorpus(df=df)).build()
+"""
+import logging
+import multiprocessing
+import os
+
+import pandas as pd
+from tethne.readers import wos
+
+from authors import metrics
+from authors.cache import source_files
+from authors.paperinstances import CorpusParser, columns
+
+
+logger = logging.getLogger('AuthorIngest')
+
+
+def input_files(paths):
+    """
+    Returns the WoS files of `paths`, in order and without repetition: a file as is, a directory as its `.txt` files
+    (sorted, as `tethne.readers.wos.read` reads them).
+
+    :param paths: path of a file or directory, or list of such paths
+    :return: list of file paths
+
+    Raises:
+        ValueError: If a path does not exist
+    """
+    if isinstance(paths, basestring):
+        paths = [paths]
+    files, seen = [], set()
+    for path in paths:
+        if not os.path.exists(path):
+            raise ValueError('No such file or directory: %s' % path)
+        for filename in source_files(path):
+            if os.path.abspath(filename) not in seen:
+                seen.add(os.path.abspath(filename))
+                files.append(filename)
+    return files
+
+
+def parse_file(path, cache=None):
+    """
+    Returns the Author-Paper instances of one WoS file, as a DataFrame returned by `CorpusParser.parse()`.
+
+    :param path: path of a WoS file
+    :param cache: `authors.cache.InstanceCache` the parse is looked up in (and stored to), or ``None``
+    """
+    if cache is not None:
+        return cache.load(path)
+    return CorpusParser(tethne_corpus=wos.read(path)).parse()
+
+
+def parse_file_task(task):
+    """Runs `parse_file` on a (path, cache) task inside a worker process."""
+    path, cache = task
+    return parse_file(path, cache=cache)
+
+
+def ingest(paths, n_jobs=1, cache=None):
+    """
+    Parses many WoS files into one DataFrame of Author-Paper instances, without duplicate instances.
+
+    :param paths: path of a file or directory, or list of such paths (see `input_files`)
+    :param n_jobs: (int) number of worker processes. 1 parses the files in this process, ``None`` or -1 use one process
+                   per CPU. The result does not depend on `n_jobs`.
+    :param cache: `authors.cache.InstanceCache` to reuse the parses of previous runs. Each worker process counts the
+                  hits and misses of its own copy.
+    :return: pandas DataFrame with the columns of `CorpusParser.parse()`. The instances are in the order of the files;
+             an instance found in several files is kept where it appears first.
+
+    Raises:
+        ValueError: If a path does not exist
+    """
+    files = input_files(paths)
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = multiprocessing.cpu_count()
+    with metrics.stage('ingest'):
+        if n_jobs == 1 or len(files) < 2:
+            frames = [parse_file(path, cache=cache) for path in files]
+        else:
+            pool = multiprocessing.Pool(processes=min(n_jobs, len(files)))
+            try:
+                # imap keeps the order of the files, whatever the order the workers finish in.
+                frames = list(pool.imap(parse_file_task, [(path, cache) for path in files], chunksize=1))
+            finally:
+                pool.close()
+                pool.join()
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat(frames)
+        duplicated = df.index.duplicated(keep='first')
+        df = df[~duplicated]
+        metrics.count('files', len(files))
+        metrics.count('duplicates', int(duplicated.sum()))
+    logger.info("Ingested %s files : %s instances, %s duplicates dropped", len(files), len(df), duplicated.sum())
+    return df
@@ -0,0 +1,219 @@
+"""
+Stage-level metrics of the disambiguation pipeline.
+
+The pipeline is instrumented with named stages:
+    * ``ingest`` : `authors.ingest.ingest()`
+    * ``parse`` : `CorpusParser.parse()`
+    * ``initial_cluster`` : `InitialCluster.build()`
+    * ``identity_cluster`` : `IdentityCluster.build()` and `update()`
+    * ``graph_score`` : `GraphCluster.score()`
+    * ``features`` : feature computation (`FeatureStore.scores()`, `Compare.calculate_scores()`)
+    * ``predict`` : calls to the classifier
+and counters (``files``, ``duplicates``, ``instances``, ``blocks``, ``pairs_scored``, ``pairs_compared``,
+``pairs_avoided``, ``pairs_settled``, ``decisions_found``, ``classifier_calls``, ``pairs_predicted``) and histograms
+(``block_size``).
+
+Nothing is recorded until a `Metrics` collector is activated with `set_metrics()`. For every stage the collector keeps
+the number of calls, the wall time, the counters incremented while the stage ran, and the peak resident memory of the
+process when the stage ended (``peak_rss``, with ``rss_growth`` the part of it reached during the stage). Stages nest:
+the time of ``features`` is also part of the time of ``identity_cluster``. `Metrics.report()` returns everything as a
+dictionary (`Metrics.to_json()` as JSON), and hooks are called with an event at the end of each stage, to export the
+metrics to a monitoring system.
+
+Work done in the worker processes of ``IdentityCluster.build(n_jobs > 1)`` is not recorded, except for the counters
+``IdentityCluster`` derives from the stats of the blocks.
+
+Example:
+    >>> from authors.metrics import Metrics, set_metrics
+    >>> metrics = set_metrics(Metrics(hooks=[lambda event: statsd.timing(event['stage'], event['seconds'])]))
+    >>> IdentityCluster(corpus=corpus).build()
+    >>> metrics.report()['stages']['predict'] # {'calls': 7, 'seconds': 0.21, 'counters': {...}, 'peak_rss': ...}
+    >>> set_metrics(None)
+"""
+from contextlib import contextmanager
+import json
+import logging
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+
+logger = logging.getLogger('AuthorMetrics')
+
+_collector = None
+
+
+def peak_rss():
+    """Returns the peak resident memory of the process in bytes, or ``None`` where it is not available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def bucket(value):
+    """Returns the power of two histogram bucket of `value`: 0, 1, 2 (2-3), 4 (4-7), 8 (8-15) ..."""
+    value = int(value)
+    if value < 1:
+        return 0
+    return 1 << (value.bit_length() - 1)
+
+
+class Metrics:
+    """Metrics : Collects the wall time, counters, histograms and peak memory of the stages of the pipeline.
+
+    Thread safe: stages may run in several threads at once, each thread keeping its own stack of open stages.
+
+    Example:
+        >>> metrics = Metrics()
+        >>> with metrics.stage('parse'):
+        >>>     metrics.count('instances', 120)
+        >>> metrics.report() # {'stages': {'parse': {'calls': 1, 'counters': {'instances': 120}, ...}}, ...}
+    """
+
+    def __init__(self, hooks=None):
+        """Initialisation(__init__()) for the class `Metrics`
+
+        Args:
+            hooks (list) : callables called with an event dictionary at the end of each stage: ``stage``, ``seconds``,
+                           ``counters`` (incremented during this call of the stage), ``peak_rss`` and ``rss_growth``.
+                           A hook which raises is logged and otherwise ignored.
+        """
+        self.hooks = list(hooks or [])
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stages = {}
+        self.counters = {}
+        self.histograms = {}
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def reset(self):
+        """Forgets everything recorded so far. Stages open in other threads are still recorded when they end."""
+        with self.lock:
+            self.stages = {}
+            self.counters = {}
+            self.histograms = {}
+
+    def open_stages(self):
+        """Returns the stack of the stages open in this thread, innermost last, as (name, counters) tuples."""
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    @contextmanager
+    def stage(self, name):
+        """Records the block of the ``with`` statement as one call of the stage `name`."""
+        stack = self.open_stages()
+        counters = {}
+        stack.append((name, counters))
+        rss_before = peak_rss()
+        start = time.time()
+        try:
+            yield self
+        finally:
+            seconds = time.time() - start
+            stack.pop()
+            rss = peak_rss()
+            growth = rss - rss_before if rss is not None else None
+            with self.lock:
+                record = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'counters': {}, 'peak_rss': None,
+                                                       'rss_growth': 0})
+                record['calls'] += 1
+                record['seconds'] += seconds
+                for counter, value in counters.items():
+                    record['counters'][counter] = record['counters'].get(counter, 0) + value
+                record['peak_rss'] = rss
+                if growth is not None:
+                    record['rss_growth'] += growth
+            event = {'stage': name, 'seconds': seconds, 'counters': dict(counters), 'peak_rss': rss,
+                     'rss_growth': growth}
+            for hook in self.hooks:
+                try:
+                    hook(event)
+                except Exception:
+                    logger.exception('Metrics hook %r failed', hook)
+
+    def count(self, name, value=1):
+        """Adds `value` to the counter `name`, in total and in every stage open in this thread."""
+        for _, counters in self.open_stages():
+            counters[name] = counters.get(name, 0) + value
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """Adds `value` to the histogram `name` (power of two buckets, see `bucket`)."""
+        key = bucket(value)
+        with self.lock:
+            histogram = self.histograms.setdefault(name, {})
+            histogram[key] = histogram.get(key, 0) + 1
+
+    def report(self):
+        """
+        Returns everything recorded so far as a dictionary of plain values:
+            * ``stages`` : name -> {``calls``, ``seconds``, ``counters``, ``peak_rss``, ``rss_growth``}
+            * ``counters`` : name -> total
+            * ``histograms`` : name -> {bucket lower bound -> count}
+            * ``peak_rss`` : peak resident memory of the process in bytes
+        """
+        with self.lock:
+            stages = dict((name, dict(record, counters=dict(record['counters'])))
+                          for name, record in self.stages.items())
+            return {'stages': stages,
+                    'counters': dict(self.counters),
+                    'histograms': dict((name, dict(histogram)) for name, histogram in self.histograms.items()),
+                    'peak_rss': peak_rss()}
+
+    def to_json(self, **kwargs):
+        """Returns `report()` as a JSON string. `kwargs` are passed on to `json.dumps`."""
+        return json.dumps(self.report(), sort_keys=True, **kwargs)
+
+
+def get_metrics():
+    """Returns the active `Metrics` collector, or ``None``."""
+    return _collector
+
+
+def set_metrics(metrics):
+    """
+    Activates a `Metrics` collector for the whole process.
+
+    :param metrics: `Metrics`, or ``None`` to stop recording
+    :return: `metrics`
+    """
+    global _collector
+    _collector = metrics
+    return metrics
+
+
+@contextmanager
+def stage(name):
+    """Records the block of the ``with`` statement as a call of the stage `name` of the active collector, if any."""
+    collector = _collector
+    if collector is None:
+        yield None
+    else:
+        with collector.stage(name):
+            yield collector
+
+
+def count(name, value=1):
+    """Adds `value` to the counter `name` of the active collector, if any."""
+    collector = _collector
+    if collector is not None:
+        collector.count(name, value)
+
+
+def observe(name, value):
+    """Adds `value` to the histogram `name` of the active collector, if any."""
+    collector = _collector
+    if collector is not None:
+        collector.observe(name, value)
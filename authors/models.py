@@ -0,0 +1,79 @@
+"""
+Access to the serialized classification model.
+
+The model is loaded the first time `get_classifier()` is called, not when a module of the `authors` package is
+imported, and is then cached for the lifetime of the process. The path of the model is resolved in this order:
+    1. The path given to `set_classifier_path()`
+    2. The environment variable ``TETHNE_CLASSIFIER_PATH``
+    3. `classificationmodels/random_forest.pkl` in this repository
+
+A `.pkl` path is unpickled into the scikit-learn estimator, a `.npz` path is loaded as a memory-mapped
+`authors.forest.CompiledForest`. Both expose ``predict``, ``predict_proba`` and ``classes_``.
+
+Example:
+    >>> from authors.models import get_classifier, set_classifier_path
+    >>> set_classifier_path('/data/models/random_forest.npz') # optional
+    >>> clf = get_classifier()
+"""
+import os
+import pickle
+import threading
+
+
+# Environment variable which overrides the default model path.
+classifier_path_variable = 'TETHNE_CLASSIFIER_PATH'
+
+default_classifier_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'classificationmodels',
+                                       'random_forest.pkl')
+
+_lock = threading.Lock()
+_classifier = None
+_classifier_path = None
+
+
+def get_classifier_path():
+    """Returns the path the classifier is (or will be) loaded from."""
+    return _classifier_path or os.environ.get(classifier_path_variable) or default_classifier_path
+
+
+def set_classifier_path(path):
+    """
+    Sets the path of the classifier. A classifier loaded from another path is dropped and the new one is loaded on the
+    next call to `get_classifier()`.
+
+    :param path: path of a `.pkl` or `.npz` model, or ``None`` to go back to the default path
+    """
+    global _classifier, _classifier_path
+    with _lock:
+        if path != _classifier_path:
+            _classifier = None
+        _classifier_path = path
+
+
+def load_classifier(path):
+    """
+    Loads a classifier from `path`, without caching it.
+
+    :param path: path of a pickled scikit-learn estimator (`.pkl`) or of a compiled forest (`.npz`)
+    :return: classifier with ``predict``, ``predict_proba`` and ``classes_``
+    """
+    if path.endswith('.npz'):
+        from authors.forest import CompiledForest
+        return CompiledForest.load(path)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def get_classifier():
+    """
+    Returns the classifier, loading it on the first call. Safe to call from several threads: the model is loaded
+    only once.
+    """
+    global _classifier
+    classifier = _classifier
+    if classifier is None:
+        with _lock:
+            if _classifier is None:
+                _classifier = load_classifier(get_classifier_path())
+            classifier = _classifier
+    return classifier
@@ -1,20 +1,17 @@
 from __future__ import division
+import numpy as np
 import pandas as pd
 import re
-import os
-import pickle
 
 from tethne import Corpus
 from ast import literal_eval
+from authors import metrics
+from authors.blocking import LiteralIndex
+from authors.models import get_classifier
+from authors.institutes import InstituteSimilarity
+from authors.similarity import name_similarity
+from authors.vocabulary import InternedSets
 from utilities import cosine_similarity, sentence_to_vector
-from fuzzywuzzy import fuzz
-
-
-# LOAD THE SERIALIZED RANDOM FOREST CLASSIFIER
-classifier_path = '../classificationmodels/random_forest.pkl'
-classifier = os.path.join(os.path.dirname(__file__), classifier_path)
-with open(classifier, 'r') as output:
-    clf = pickle.loads(output.read())
 
 
 # COLUMNS returned in the Author-paper instances after parsing a `Tethne` Corpus object
@@ -22,6 +19,19 @@ columns = ["WOSID", "DATE", "TITLE", "LASTNAME", "FIRSTNAME", "JOURNAL", "EMAILA
            "PUBLISHER", "SUBJECT", "WC", "AUTHOR_KEYWORDS", "INSTITUTE", "AUTH_LITERAL", "CO-AUTHORS"]
 
 
+# Version of the output of `CorpusParser.parse()`. Increment it whenever the parsed rows change, so that cached parses
+# (see `authors.cache`) are not reused.
+parser_version = 1
+
+# Fields of a training record (see `Compare`) and the Author-paper instance columns they are read from.
+record_fields = [('FIRST_NAME', 'FIRSTNAME'),
+                 ('LAST_NAME', 'LASTNAME'),
+                 ('EMAILADDRESS', 'EMAILADDRESS'),
+                 ('INSTITUTE', 'INSTITUTE'),
+                 ('AUTHOR_KW', 'AUTHOR_KEYWORDS'),
+                 ('COAUTHORS', 'CO-AUTHORS')]
+
+
 # LAMBDA functions to be used when we compare institute names of 2 Author-paper instances.
 split_institute = lambda institute:institute.split(',')
 join_institute_names = lambda institute : " ".join(x for x in institute)
@@ -64,6 +74,8 @@ class CorpusParser:
         __init__(self, tethne_corpus) : Initialisation method for the class `CorpusParser`
 
         parse(self) : Returns a pandas DataFrame of Author-Paper instances.
+
+        parse_iter(self, chunk_size) : Yields the Author-Paper instances as DataFrames of at most `chunk_size` rows.
     """
 
     def __init__(self, tethne_corpus):
@@ -87,11 +99,11 @@ class CorpusParser:
         self.indices = []
         self.df = None
 
-    def parse(self):
-        """Parse method : iterates over each paper in the Corpus object and adds it to the pandas DataFrame
+    def iter_records(self):
+        """Iterates over the Author-Paper instances of the corpus, without storing them.
 
         Returns:
-            df : A pandas DataFrame with 14 columns. Each row in the dataFrame is an Author-Paper instance.
+            generator of (index, row) tuples, `row` being a tuple with the values of the 14 columns.
         """
         for paper in self.corpus:
             set_of_authors = set(paper.authors_full)
@@ -102,7 +114,6 @@ class CorpusParser:
                     lastname = author[0]
                     firstname = author[1]
                     index = lastname+firstname+getattr(paper, 'wosid')
-                    self.indices.append(index)
 
                     row = (getattr(paper, 'wosid', ''),
                            str(getattr(paper, 'date', '')),
@@ -119,10 +130,143 @@ class CorpusParser:
                            lastname+firstname,
                            list(coauthor_set))
 
-                    self.records.append(row)
-        self.df = pd.DataFrame(self.records, columns=columns, index=self.indices)
+                    yield index, row
+
+    def parse(self):
+        """Parse method : iterates over each paper in the Corpus object and adds it to the pandas DataFrame
+
+        Returns:
+            df : A pandas DataFrame with 14 columns. Each row in the dataFrame is an Author-Paper instance.
+        """
+        with metrics.stage('parse'):
+            for index, row in self.iter_records():
+                self.indices.append(index)
+                self.records.append(row)
+            self.df = pd.DataFrame(self.records, columns=columns, index=self.indices)
+            metrics.count('instances', len(self.df))
         return self.df
 
+    def parse_iter(self, chunk_size=10000):
+        """Parse method for large corpora : yields the Author-Paper instances in DataFrames of `chunk_size` rows.
+
+        Unlike `parse()`, the rows are not kept in ``records`` and ``indices`` (nor the result in ``df``), so only one
+        chunk is held in memory at a time. With a corpus read by ``wos.read(path, streaming=True)`` the papers are not
+        held in memory either. Concatenating the chunks gives the DataFrame `parse()` returns.
+
+        ``Example``
+            >>> for chunk in CorpusParser(tethne_corpus=corpus).parse_iter(chunk_size=5000):
+            >>>     process(chunk)
+
+        Args:
+            chunk_size (int) : maximum number of rows of each DataFrame.
+
+        Returns:
+            generator of pandas DataFrames with the 14 columns of `parse()`.
+
+        Raises:
+            ValueError: If `chunk_size` is not a positive integer.
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size should be a positive integer')
+        indices = []
+        records = []
+        for index, row in self.iter_records():
+            indices.append(index)
+            records.append(row)
+            if len(records) == chunk_size:
+                yield pd.DataFrame(records, columns=columns, index=indices)
+                indices = []
+                records = []
+        if records:
+            yield pd.DataFrame(records, columns=columns, index=indices)
+
+
+class PreparedCorpus:
+    """PreparedCorpus : The Author-Paper instances of a corpus, parsed once and shared by every stage.
+
+    A `PreparedCorpus` holds the DataFrame returned by `CorpusParser.parse()` together with data derived per author
+    literal (``AUTH_LITERAL``): the sorted unique literals and the row positions of each literal, plus the
+    per-instance `FeatureStore` used for pair scoring (built on first use). `InitialCluster`, `IdentityCluster` and
+    `classify_pairs` all accept a `PreparedCorpus`, so the corpus is parsed only once, and the same object can be
+    reused for repeated clustering runs (for example with different thresholds) in one process.
+    Initial clusters are cached per threshold in ``initial_clusters``, and `LiteralIndex`es of all the literals in
+    ``literal_indexes``.
+
+    Example:
+        >>> from authors.paperinstances import PreparedCorpus
+        >>> from authors.cluster import InitialCluster, IdentityCluster
+        >>> from tethne.readers import wos
+        >>> corpus = wos.read("/Users/aosingh/tethne-services/tests/data/Boyer_Barbara.txt")
+        >>> prepared = PreparedCorpus(tethne_corpus=corpus)
+        >>> clusters = InitialCluster(corpus=prepared).build()
+        >>> identity_clusters = IdentityCluster(corpus=prepared).build()
+        >>> stricter = IdentityCluster(corpus=prepared, threshold=80).build() # no parsing here
+    """
+
+    def __init__(self, tethne_corpus=None, df=None):
+        """Initialisation(__init__()) for the class `PreparedCorpus`
+
+        Args:
+            tethne_corpus (`Tethne` corpus object) : corpus to parse. Not needed if `df` is given.
+            df (pandas DataFrame) : Author-Paper instances already returned by `CorpusParser.parse()`
+
+        Raises:
+            ValueError: If neither `tethne_corpus` nor `df` is given.
+        """
+        if df is None:
+            if tethne_corpus is None:
+                raise ValueError('Either a Tethne Corpus object or a DataFrame of Author-Paper instances is required')
+            df = CorpusParser(tethne_corpus=tethne_corpus).parse()
+        self.corpus = tethne_corpus
+        self.df = df
+        self.literals = np.sort(np.array(df.AUTH_LITERAL.unique()))
+        self.literal_positions = dict((literal, np.asarray(positions, dtype=np.intp))
+                                      for literal, positions in df.groupby('AUTH_LITERAL').indices.items())
+        self.initial_clusters = {}
+        self.literal_indexes = {}
+        self._feature_store = None
+
+    @property
+    def feature_store(self):
+        """The `FeatureStore` of all the instances, built on first use."""
+        if self._feature_store is None:
+            self._feature_store = FeatureStore(self.df)
+        return self._feature_store
+
+    def literal_index(self, threshold=70):
+        """Returns a `LiteralIndex` holding every literal, built on first use for each threshold."""
+        if threshold not in self.literal_indexes:
+            index = LiteralIndex(literals=self.literals, threshold=threshold)
+            for literal in self.literals:
+                index.add(literal)
+            self.literal_indexes[threshold] = index
+        return self.literal_indexes[threshold]
+
+    def positions(self, literals):
+        """Returns the sorted row positions of all the Author-Paper instances having one of the given literals."""
+        positions = [self.literal_positions[literal] for literal in literals if literal in self.literal_positions]
+        if not positions:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(positions))
+
+    def rows(self, literals):
+        """Returns the Author-Paper instances having one of the given literals, in the order of the DataFrame."""
+        return self.df.iloc[self.positions(literals)]
+
+
+def prepare_corpus(corpus):
+    """
+    Returns `corpus` as a `PreparedCorpus`, parsing it if it is a `tethne.Corpus`.
+
+    Raises:
+        ValueError: If `corpus` is neither a `tethne.Corpus` nor a `PreparedCorpus`
+    """
+    if isinstance(corpus, PreparedCorpus):
+        return corpus
+    if isinstance(corpus, Corpus):
+        return PreparedCorpus(tethne_corpus=corpus)
+    raise ValueError('The input parameter should be a Tethne Corpus object or a PreparedCorpus')
+
 
 class Compare:
 
@@ -352,6 +496,83 @@ class Compare:
             return cosine_similarity(sentence_to_vector(institute1), sentence_to_vector(institute2))
         return 0
 
+    @staticmethod
+    def create_batch_record(df, pairs):
+        """
+        Build the training records for a whole batch of Author-Paper instance pairs in one go.
+        This is the batched counterpart of ``create_single_record()``; each row of the returned DataFrame holds the
+        fields FIRST_NAME1, LAST_NAME1, ..., COAUTHORS2 for one pair.
+
+        ``Example``
+            >>> pairs = [('BOYERBCWOS:000076265300004', 'BOYERBWOS:A1996UQ10700011'), (0, 1)]
+            >>> record_df = Compare.create_batch_record(df, [(0, 1), (0, 2)])
+
+        :param df: DataFrame of Author-Paper instances as returned by ``CorpusParser.parse()``
+        :param pairs: array of shape (n, 2) with either integer row positions or index labels of `df`
+        :return: pandas DataFrame with one training record per pair.
+        """
+        left, right = pair_positions(df, pairs)
+        record = {}
+        for attribute_name, column_name in record_fields:
+            values = df[column_name].values
+            record[attribute_name + '1'] = values.take(left)
+            record[attribute_name + '2'] = values.take(right)
+        return pd.DataFrame(record)
+
+    @staticmethod
+    def score_record(row):
+        """
+        Calculate the feature values for a single training record, in the order defined by ``features``.
+        The fuzzy name scores are looked up in the shared `authors.similarity.name_similarity` cache.
+
+        :param row: training record (a dict or a pandas Series) with the fields FIRST_NAME1, ..., COAUTHORS2
+        :return: tuple of 9 feature values.
+        """
+        first_name1 = row['FIRST_NAME1']
+        first_name2 = row['FIRST_NAME2']
+        last_name1 = row['LAST_NAME1']
+        last_name2 = row['LAST_NAME2']
+        return (Compare.get_score_for_institute_names(row),
+                Compare.get_score_for_name(row),
+                name_similarity.ratio(first_name1, first_name2),
+                # FIRST_NAME2 is compared with itself here, exactly as in the features the model was trained on.
+                max(name_similarity.partial_ratio(first_name1, first_name2),
+                    name_similarity.partial_ratio(first_name2, first_name2)),
+                name_similarity.ratio(last_name1, last_name2),
+                max(name_similarity.partial_ratio(last_name1, last_name2),
+                    name_similarity.partial_ratio(last_name2, last_name1)),
+                Compare.get_score_for_email_address(row),
+                Compare.get_score_for_author_keywords(row),
+                Compare.get_score_for_coauthors(row))
+
+    @staticmethod
+    def score_records(record_df):
+        """
+        Calculate the feature values for every training record in `record_df`.
+
+        :param record_df: DataFrame of training records, see ``create_single_record()`` and ``create_batch_record()``
+        :return: pandas DataFrame with the columns defined in ``features``, aligned with `record_df`.
+        """
+        scores = [Compare.score_record(row) for row in record_df.to_dict('records')]
+        return pd.DataFrame(scores, columns=features, index=record_df.index, dtype=float)
+
+    @staticmethod
+    def score_batch(df, pairs):
+        """
+        Calculate the feature values for a batch of Author-Paper instance pairs. The instances involved are
+        preprocessed once into a `FeatureStore`.
+
+        ``Example``
+            >>> scores_df = Compare.score_batch(df, [(0, 1), (0, 2), (1, 2)])
+            >>> get_classifier().predict(scores_df[features])
+
+        :param df: DataFrame of Author-Paper instances as returned by ``CorpusParser.parse()``
+        :param pairs: array of shape (n, 2) with either integer row positions or index labels of `df`
+        :return: pandas DataFrame with the columns defined in ``features``, one row per pair.
+        """
+        store, left, right = feature_store_positions(df, pairs)
+        return pd.DataFrame(store.scores(left, right), columns=features)
+
     def calculate_scores(self):
         """
         Calculate the scores for each feature defined below.
@@ -361,23 +582,294 @@ class Compare:
 
         :return:
         """
-        self.record_df['INSTIT_SCORE'] = self.record_df.apply(lambda row: Compare.get_score_for_institute_names(row), axis=1)
-        self.record_df['BOTH_NAME_SCORE'] = self.record_df.apply(lambda row: Compare.get_score_for_name(row), axis=1)
-        self.record_df['FNAME_SCORE'] = self.record_df.apply(lambda row: max(fuzz.ratio(row['FIRST_NAME1'], row['FIRST_NAME2'])/100.0, fuzz.ratio(row['FIRST_NAME2'], row['FIRST_NAME1'])/100.0), axis=1)
-        self.record_df['LNAME_SCORE'] = self.record_df.apply(lambda row: max(fuzz.ratio(row['LAST_NAME1'], row['LAST_NAME2'])/100.0, fuzz.ratio(row['LAST_NAME2'], row['LAST_NAME1'])/100.0), axis=1)
-        self.record_df['LNAME_PARTIAL_SCORE'] = self.record_df.apply(lambda row: max(fuzz.partial_ratio(row['LAST_NAME1'], row['LAST_NAME2'])/100.0, fuzz.partial_ratio(row['LAST_NAME2'], row['LAST_NAME1'])/100.0), axis=1)
-        self.record_df['FNAME_PARTIAL_SCORE'] = self.record_df.apply(lambda row: max(fuzz.partial_ratio(row['FIRST_NAME1'], row['FIRST_NAME2'])/100.0, fuzz.partial_ratio(row['FIRST_NAME2'], row['FIRST_NAME2'])/100.0), axis=1)
-        self.record_df['EMAIL_ADDR_SCORE'] = self.record_df.apply(lambda row: Compare.get_score_for_email_address(row), axis=1)
-        self.record_df['AUTH_KW_SCORE'] = self.record_df.apply(lambda row: Compare.get_score_for_author_keywords(row), axis=1)
-        self.record_df['COAUTHOR_SCORE'] = self.record_df.apply(lambda row: Compare.get_score_for_coauthors(row), axis=1)
+        with metrics.stage('features'):
+            metrics.count('pairs_scored', len(self.record_df))
+            scores_df = Compare.score_records(self.record_df)
+        for feature in features:
+            self.record_df[feature] = scores_df[feature]
         self.scores_df = self.record_df[features]
 
 
+class FeatureStore:
+    """FeatureStore : Everything pair scoring needs, precomputed once per Author-Paper instance.
+
+    `Compare` resolves the institute of an instance, tokenizes it, and turns the lists of co-authors, author keywords
+    and email addresses into sets again for every pair it scores. A `FeatureStore` does this work once per instance, so
+    that scoring the O(n^2) pairs of a block only combines ready-made structures:
+        * ``institutes`` : resolved institute name (first 3 comma separated parts, see `Compare.get_institute_name`),
+                           and ``institute_similarity`` the `InstituteSimilarity` of these names
+        * ``coauthors``, ``keywords``, ``emails`` : `InternedSets`, the values interned into integer ids and stored as
+                                                  sparse rows, so that the overlap features of a whole batch are a
+                                                  few sparse matrix products. A single email address is stored as a
+                                                  set of one; ``email_lists`` marks the instances with a list.
+
+    The scores are identical to those of `Compare.score_record`.
+
+    Example:
+        >>> store = FeatureStore(df)
+        >>> scores = store.scores([0, 0], [1, 2]) # 2 x 9 array, columns as in `features`
+        >>> labels = classify_pairs(store, [(0, 1), (0, 2)])
+    """
+
+    def __init__(self, df):
+        """Initialisation(__init__()) for the class `FeatureStore`
+
+        Args:
+            df (pandas DataFrame) : Author-Paper instances as returned by `CorpusParser.parse()`
+        """
+        self.index = df.index
+        self.first_names = df['FIRSTNAME'].values
+        self.last_names = df['LASTNAME'].values
+        self.institutes = [FeatureStore.institute_name(institutions, last_name)
+                           for institutions, last_name in zip(df['INSTITUTE'].values, self.last_names)]
+        self.institute_similarity = InstituteSimilarity(self.institutes)
+        self.coauthors = InternedSets.from_sets([FeatureStore.overlap_set(values)
+                                                 for values in df['CO-AUTHORS'].values])
+        self.keywords = InternedSets.from_sets([FeatureStore.overlap_set(values)
+                                                for values in df['AUTHOR_KEYWORDS'].values])
+        emails = [FeatureStore.email_value(email) for email in df['EMAILADDRESS'].values]
+        self.email_lists = np.array([isinstance(email, frozenset) for email in emails], dtype=bool)
+        self.emails = InternedSets.from_sets([email if email is None or isinstance(email, frozenset)
+                                              else frozenset([email]) for email in emails])
+
+    def __len__(self):
+        return len(self.index)
+
+    @staticmethod
+    def institute_name(institutions, author):
+        """Returns the institute of `author` truncated to its first 3 parts, as compared by
+        `Compare.get_score_for_institute_names`, or ``None``."""
+        institute = Compare.get_institute_name(institutions, author)
+        if institute is None:
+            return None
+        return join_institute_names(split_institute(institute)[0:3])
+
+    @staticmethod
+    def overlap_set(values):
+        """Returns `values` as a frozenset, or ``None`` if the overlap score of `Compare` would be 0 for any pair."""
+        try:
+            if values is None or len(values) == 0:
+                return None
+            return frozenset(values)
+        except Exception:
+            return None
+
+    @staticmethod
+    def email_value(email):
+        """Returns a list of email addresses as a frozenset, a single address as-is, or ``None`` if empty."""
+        if email is None or len(email) == 0:
+            return None
+        if isinstance(email, list):
+            return frozenset(email)
+        return email
+
+    def email_scores(self, left, right):
+        """Vectorized `Compare.get_score_for_email_address` : the Jaccard score if both instances have a list of
+        addresses, otherwise 1 if one address is (in) the other."""
+        jaccard = self.emails.jaccard(left, right)
+        shared = (self.emails.intersection_sizes(left, right) > 0) & self.emails.valid[left] & self.emails.valid[right]
+        both_lists = self.email_lists[left] & self.email_lists[right]
+        return np.where(both_lists, jaccard, shared.astype(float))
+
+    def scores(self, left, right, columns=None):
+        """
+        Calculate the feature values of the pairs (left[i], right[i]).
+
+        :param left: integer positions of the first instance of each pair
+        :param right: integer positions of the second instance of each pair
+        :param columns: names of the features to calculate (see ``features``). ``None`` calculates all of them; the
+                        columns of the other features are left at 0.
+        :return: numpy array of shape (n, 9), columns in the order defined by ``features``.
+        """
+        with metrics.stage('features'):
+            metrics.count('pairs_scored', len(left))
+            left = np.asarray(left, dtype=np.intp)
+            right = np.asarray(right, dtype=np.intp)
+            wanted = [name in columns for name in features] if columns is not None else [True] * len(features)
+            scores = np.zeros((len(left), len(features)))
+            first_names1, first_names2 = self.first_names.take(left), self.first_names.take(right)
+            last_names1, last_names2 = self.last_names.take(left), self.last_names.take(right)
+            if wanted[0]:
+                scores[:, 0] = self.institute_similarity.scores(left, right)
+            if wanted[1]:
+                scores[:, 1] = (first_names1 == first_names2) & (last_names1 == last_names2)
+            if any(wanted[2:6]):
+                for i in range(len(left)):
+                    first_name1, first_name2 = first_names1[i], first_names2[i]
+                    last_name1, last_name2 = last_names1[i], last_names2[i]
+                    if wanted[2]:
+                        scores[i, 2] = name_similarity.ratio(first_name1, first_name2)
+                    if wanted[3]:
+                        # FIRST_NAME2 is compared with itself here, exactly as in the features the model was
+                        # trained on.
+                        scores[i, 3] = max(name_similarity.partial_ratio(first_name1, first_name2),
+                                           name_similarity.partial_ratio(first_name2, first_name2))
+                    if wanted[4]:
+                        scores[i, 4] = name_similarity.ratio(last_name1, last_name2)
+                    if wanted[5]:
+                        scores[i, 5] = max(name_similarity.partial_ratio(last_name1, last_name2),
+                                           name_similarity.partial_ratio(last_name2, last_name1))
+            if wanted[6]:
+                scores[:, 6] = self.email_scores(left, right)
+            if wanted[7]:
+                scores[:, 7] = self.keywords.jaccard(left, right)
+            if wanted[8]:
+                scores[:, 8] = self.coauthors.jaccard(left, right)
+            return scores
+
+
+def pair_positions(df, pairs):
+    """
+    Resolve an array of Author-Paper instance pairs to two arrays of integer row positions in `df`.
+
+    :param df: DataFrame of Author-Paper instances (or any object with the same ``index``, like a `FeatureStore`)
+    :param pairs: array of shape (n, 2) with either integer row positions or index labels of `df`
+    :return: tuple (left, right) of integer numpy arrays.
+
+    Raises:
+        ValueError: If `pairs` is not of shape (n, 2)
+        KeyError: If an index label in `pairs` is not present in `df`, or a position is not in ``[0, len(df))``
+    """
+    if len(pairs) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    pairs = np.asarray(pairs)
+    if pairs.ndim != 2 or pairs.shape[1] != 2:
+        raise ValueError('pairs should be an array of shape (n, 2)')
+    if pairs.dtype.kind in 'iu':
+        outside = (pairs < 0) | (pairs >= len(df.index))
+        if outside.any():
+            raise KeyError('Author-Paper instance positions out of range: %s' % list(pairs[outside]))
+        return pairs[:, 0].astype(np.intp), pairs[:, 1].astype(np.intp)
+    positions = df.index.get_indexer(pairs.ravel())
+    if (positions < 0).any():
+        raise KeyError('Unknown Author-Paper instance indices: %s' % list(pairs.ravel()[positions < 0]))
+    positions = positions.reshape(pairs.shape)
+    return positions[:, 0], positions[:, 1]
+
+
+def feature_store_positions(df, pairs):
+    """
+    Returns a `FeatureStore` for the instances of `pairs` and the positions of the pairs in that store.
+
+    A `FeatureStore` is used as-is and a `PreparedCorpus` provides its own. For a DataFrame, a store is built for the
+    rows which appear in `pairs` only.
+
+    :param df: DataFrame of Author-Paper instances, `PreparedCorpus` or `FeatureStore`
+    :param pairs: array of shape (n, 2) with either integer row positions or index labels of `df`
+    :return: tuple (store, left, right)
+    """
+    if isinstance(df, FeatureStore):
+        left, right = pair_positions(df, pairs)
+        return df, left, right
+    if isinstance(df, PreparedCorpus):
+        left, right = pair_positions(df.df, pairs)
+        return df.feature_store, left, right
+    left, right = pair_positions(df, pairs)
+    rows = np.unique(np.concatenate((left, right)))
+    store = FeatureStore(df.iloc[rows])
+    return store, np.searchsorted(rows, left), np.searchsorted(rows, right)
+
+
 def classify(paper_sample1, paper_sample2):
     compare_instance = Compare(paper_sample1, paper_sample2)
     compare_instance.create_single_record()
     compare_instance.calculate_scores()
-    return clf.predict(compare_instance.scores_df[features])
+    with metrics.stage('predict'):
+        metrics.count('classifier_calls')
+        metrics.count('pairs_predicted')
+        return get_classifier().predict(compare_instance.scores_df[features])
+
+
+def classify_pairs(df, pairs, chunk_size=None, return_proba=False, cascade=None, decisions=None):
+    """
+    Classify a batch of Author-Paper instance pairs with a single call to the classifier (per chunk).
+
+    Returns the same labels as calling ``classify()`` on each pair, but computes the features for the whole batch at
+    once from a `FeatureStore`. Pass a `PreparedCorpus` (whose store is built once and reused) or a `FeatureStore`
+    when classifying many batches over the same instances.
+
+    ``Example``
+        >>> from authors.paperinstances import CorpusParser, classify_pairs
+        >>> df = CorpusParser(tethne_corpus=corpus).parse()
+        >>> labels = classify_pairs(df, [('BOYERBCWOS:000076265300004', 'BOYERBWOS:A1996UQ10700011'),
+        >>>                              ('BOYERBCWOS:000076265300004', 'MARTINDALEMQWOS:000077556600009')])
+        >>> labels # array([1, 0])
+        >>> labels, probabilities = classify_pairs(df, [(0, 1), (0, 2)], return_proba=True)
+
+    :param df: DataFrame of Author-Paper instances as returned by ``CorpusParser.parse()``, a `PreparedCorpus` or a
+               `FeatureStore`
+    :param pairs: array of shape (n, 2) with either integer row positions or index labels of `df`
+    :param chunk_size: (int) maximum number of pairs scored and classified at once. ``None`` classifies all pairs
+                       together.
+    :param return_proba: (bool) if ``True`` also return the match probability of each pair.
+    :param cascade: `authors.cascade.Cascade` settling the obvious pairs from their cheapest features before the
+                    classifier is called. Settled pairs get the match probability 1.0 or 0.0.
+    :param decisions: `authors.decisions.DecisionStore` consulted before any feature is computed. Only the pairs it does
+                      not know are classified, and the decisions of the classifier (not those of the rules of
+                      `cascade`) are added to it.
+    :return: numpy array of labels (1 for a match, 0 otherwise), and a numpy array of match probabilities if
+             `return_proba` is set.
+    """
+    store, left, right = feature_store_positions(df, pairs)
+    if decisions is None:
+        labels, probabilities, _ = classify_positions(store, left, right, chunk_size=chunk_size, cascade=cascade)
+    else:
+        keys = list(zip(store.index[left], store.index[right]))
+        found = decisions.get(keys)
+        labels = np.zeros(len(keys), dtype=int)
+        probabilities = np.zeros(len(keys))
+        for i, key in enumerate(keys):
+            if key in found:
+                labels[i], probabilities[i] = found[key]
+        unknown = np.array([i for i, key in enumerate(keys) if key not in found], dtype=np.intp)
+        metrics.count('decisions_found', len(keys) - len(unknown))
+        if len(unknown):
+            labels[unknown], probabilities[unknown], settled = classify_positions(store, left[unknown], right[unknown],
+                                                                                chunk_size=chunk_size, cascade=cascade)
+            # Only the decisions of the classifier are stored: the 1.0 / 0.0 of the pairs settled by the rules of a
+            # cascade are not match probabilities, and would be reused by runs without that cascade.
+            stored = unknown[~settled]
+            decisions.put([keys[i] for i in stored], labels[stored], probabilities[stored])
+    if return_proba:
+        return labels, probabilities
+    return labels
+
+
+def classify_positions(store, left, right, chunk_size=None, cascade=None):
+    """
+    Classifies the pairs (left[i], right[i]) of a `FeatureStore`, `chunk_size` pairs at a time.
+
+    :param store: `FeatureStore`
+    :param left: integer positions of the first instance of each pair
+    :param right: integer positions of the second instance of each pair
+    :param chunk_size: (int) maximum number of pairs scored and classified at once. ``None`` classifies all pairs
+                       together.
+    :param cascade: `authors.cascade.Cascade` settling the obvious pairs before the classifier is called
+    :return: tuple (labels, probabilities, settled) of numpy arrays, `settled` being ``True`` for the pairs settled by
+             a rule of `cascade` instead of the classifier.
+    """
+    step = chunk_size or max(len(left), 1)
+    if cascade is not None:
+        results = [cascade.classify(store, left[start:start + step], right[start:start + step], return_proba=True,
+                                    return_settled=True)
+                   for start in range(0, len(left), step)]
+        return tuple(np.concatenate([np.empty(0, dtype=dtype)] + [result[i] for result in results])
+                     for i, dtype in enumerate((int, float, bool)))
+
+    clf = get_classifier()
+    labels = [np.empty(0, dtype=clf.classes_.dtype)]
+    probabilities = [np.empty(0, dtype=float)]
+    match_column = list(clf.classes_).index(1)
+    for start in range(0, len(left), step):
+        scores = store.scores(left[start:start + step], right[start:start + step])
+        # RandomForestClassifier.predict() is the argmax of predict_proba(), so both come from a single call.
+        with metrics.stage('predict'):
+            metrics.count('classifier_calls')
+            metrics.count('pairs_predicted', len(scores))
+            proba = clf.predict_proba(scores)
+        labels.append(clf.classes_.take(np.argmax(proba, axis=1)))
+        probabilities.append(proba[:, match_column])
+    return np.concatenate(labels), np.concatenate(probabilities), np.zeros(len(left), dtype=bool)
 
 
 
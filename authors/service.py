@@ -0,0 +1,470 @@
+"""
+HTTP service exposing the disambiguation pipeline.
+
+Every process importing the library pays for loading the model and parsing the corpora. `Service` does both once and
+serves many clients: the classifier is loaded when the service starts, corpora are parsed once and kept in memory under
+the SHA-1 of their content, the pair classification requests of concurrent clients are coalesced into micro-batches
+(one `classify_pairs` call per corpus and batch, see `Batcher`) and clustering jobs run in a pool of worker processes,
+so that the threads answering the requests stay responsive.
+
+The server is a threaded `HTTPServer` (one thread per request). All the bodies are JSON, except the body of
+``POST /corpora`` which is the text of a Web of Science export.
+
+    * ``GET /health`` : ``{"status": "ok", "model": ..., "corpora": ..., "max_corpora": ..., "jobs": ...,
+      "max_jobs": ..., "requests": ..., "batches": ...}``
+    * ``POST /corpora`` : parses a WoS export. Returns ``{"corpus": id, "instances": n, "index": [...]}``, ``index``
+      being the indices of the Author-Paper instances (``AUTH_LITERAL`` + ``WOSID``).
+    * ``POST /classify`` : ``{"corpus": id, "pairs": [[index, index], ...]}``. Returns ``{"labels": [...],
+      "probabilities": [...]}``.
+    * ``POST /cluster`` : ``{"corpus": id, "threshold": 70}``. Starts an `IdentityCluster` job, returns ``{"job": id}``
+      with the status 202.
+    * ``GET /jobs/<id>`` : ``{"status": "pending" | "done" | "failed"}``, with the ``clusters`` (label -> sorted
+      indices) of a finished job, or the ``error`` of a failed one.
+    * ``DELETE /corpora/<id>``, ``DELETE /jobs/<id>`` : forget a corpus or a job. Returns ``{"deleted": id}``.
+
+The service keeps at most ``max_corpora`` corpora (the least recently used are dropped first) and ``max_jobs`` jobs
+(the oldest finished jobs are dropped first; pending jobs are always kept).
+
+Errors are returned as ``{"error": message}`` with the status 400 (invalid request), 404 (unknown corpus, job or
+path) or 500 (unexpected error, logged by the server).
+
+Example:
+    >>> from authors.service import Service, make_server
+    >>> server = make_server(port=8080, service=Service(processes=4))
+    >>> server.serve_forever()
+
+    $ python -m authors.service --port 8080 --processes 4
+    $ curl --data-binary @tests/data/Boyer_Barbara.txt localhost:8080/corpora
+    $ curl -d '{"corpus": "5f1c...", "pairs": [["BOYERBCWOS:000076265300004", "BOYERBWOS:A1996UQ10700011"]]}' \
+        localhost:8080/classify
+"""
+import argparse
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+from tethne.readers import wos
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from Queue import Empty, Queue
+    from SocketServer import ThreadingMixIn
+except ImportError: # Python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from queue import Empty, Queue
+    from socketserver import ThreadingMixIn
+
+from authors.cluster import IdentityCluster
+from authors.decisions import model_version
+from authors.models import get_classifier
+from authors.paperinstances import CorpusParser, PreparedCorpus, classify_pairs, pair_positions
+
+
+logger = logging.getLogger('AuthorService')
+
+
+class Batcher:
+    """Batcher : Coalesces the requests of concurrent threads into batches processed by a single thread.
+
+    A request is a key and an array of items. The batching thread waits up to `max_wait` seconds after the first
+    request of a batch for more requests (or until `max_items` items are queued), then calls `function` once per key
+    with the items of all the requests of that key concatenated, and hands each request its slice of the results.
+
+    Example:
+        >>> batcher = Batcher(lambda key, items: (items * 2,))
+        >>> batcher.submit('a', np.array([1, 2])) # (array([2, 4]),), from the batching thread
+        >>> batcher.close()
+    """
+
+    def __init__(self, function, max_wait=0.005, max_items=50000):
+        """Initialisation(__init__()) for the class `Batcher`
+
+        Args:
+            function (callable) : called with a key and a numpy array of items, returns a tuple of numpy arrays with
+                                  one value per item
+            max_wait (float) : seconds a batch waits for more requests after its first one
+            max_items (int) : a batch is processed as soon as it holds this many items
+        """
+        self.function = function
+        self.max_wait = max_wait
+        self.max_items = max_items
+        self.requests = 0
+        self.batches = 0
+        self.queue = Queue()
+        self.thread = threading.Thread(target=self.run, name='Batcher')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, key, items):
+        """
+        Queues a request and waits for its results.
+
+        :param key: requests are only batched with requests of the same key
+        :param items: numpy array of items
+        :return: tuple of numpy arrays, the results of `function` for `items`
+        """
+        request = {'key': key, 'items': items, 'done': threading.Event(), 'result': None, 'error': None}
+        self.queue.put(request)
+        # A timeout keeps the wait interruptible (Event.wait() without one ignores KeyboardInterrupt in Python 2).
+        while not request['done'].wait(1.0):
+            pass
+        if request['error'] is not None:
+            raise request['error']
+        return request['result']
+
+    def run(self):
+        while True:
+            request = self.queue.get()
+            if request is None:
+                return
+            batch = [request]
+            size = len(request['items'])
+            deadline = time.time() + self.max_wait
+            stop = False
+            while size < self.max_items:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=remaining)
+                except Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                size += len(request['items'])
+            self.process(batch)
+            if stop:
+                return
+
+    def process(self, batch):
+        self.batches += 1
+        self.requests += len(batch)
+        groups = {}
+        for request in batch:
+            groups.setdefault(request['key'], []).append(request)
+        for key, requests in groups.items():
+            try:
+                results = self.function(key, np.concatenate([request['items'] for request in requests]))
+                start = 0
+                for request in requests:
+                    end = start + len(request['items'])
+                    request['result'] = tuple(result[start:end] for result in results)
+                    start = end
+            except Exception as error:
+                logger.exception('Batch of %s requests failed', len(requests))
+                for request in requests:
+                    request['error'] = error
+            for request in requests:
+                request['done'].set()
+
+    def close(self):
+        """Processes the requests already queued and stops the batching thread."""
+        self.queue.put(None)
+        self.thread.join()
+
+
+def cluster_job(df, threshold, cascade, decisions):
+    """Runs `IdentityCluster` on the instances `df` inside a worker process. Returns label -> sorted indices."""
+    identity_clusters = IdentityCluster(corpus=PreparedCorpus(df=df), threshold=threshold, cascade=cascade,
+                                        decisions=decisions).build()
+    return dict((label, sorted(indices)) for label, indices in identity_clusters.items())
+
+
+class Service:
+    """Service : Corpora, micro-batched pair classification and clustering jobs shared by the requests of the server.
+
+    The methods are thread safe. Invalid requests raise `ValueError`, unknown corpora and jobs `KeyError`.
+
+    Example:
+        >>> service = Service(processes=2)
+        >>> corpus = service.add_corpus(open('tests/data/Boyer_Barbara.txt').read())
+        >>> labels, probabilities = service.classify(corpus['corpus'], corpus['index'][:2] + corpus['index'][1:3])
+        >>> job = service.cluster(corpus['corpus'])
+        >>> service.job(job) # {'status': 'done', 'clusters': {u'BOYERB': [...], ...}}
+        >>> service.close()
+    """
+
+    def __init__(self, processes=1, max_wait=0.005, max_pairs=50000, cascade=None, decisions=None, max_corpora=16,
+                 max_jobs=256):
+        """Initialisation(__init__()) for the class `Service`
+
+        Args:
+            processes (int) : number of worker processes of the clustering jobs. ``None`` or -1 use one process per CPU.
+            max_wait (float) : seconds a batch of classification requests waits for more requests (see `Batcher`)
+            max_pairs (int) : a batch is classified as soon as it holds this many pairs
+            cascade (`authors.cascade.Cascade`) : passed on to `classify_pairs` and `IdentityCluster`
+            decisions (`authors.decisions.DecisionStore`) : passed on to `classify_pairs` and `IdentityCluster`
+            max_corpora (int) : number of corpora kept in memory. Adding one more drops the least recently used.
+            max_jobs (int) : number of jobs kept. Starting one more drops the oldest finished jobs.
+        """
+        if processes is None or processes < 0:
+            processes = multiprocessing.cpu_count()
+        self.cascade = cascade
+        self.decisions = decisions
+        self.max_corpora = max_corpora
+        self.max_jobs = max_jobs
+        self.corpora = OrderedDict()
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        # Loaded before the pool starts, so that forked workers inherit the model instead of loading it again.
+        get_classifier()
+        self.model = model_version()
+        self.pool = multiprocessing.Pool(processes=processes)
+        self.batcher = Batcher(self.classify_batch, max_wait=max_wait, max_items=max_pairs)
+
+    def add_corpus(self, text):
+        """
+        Parses the text of a WoS export and keeps its instances. A corpus already added is not parsed again.
+
+        :param text: (str) content of a Web of Science plain text export
+        :return: dictionary with the ``corpus`` id, the number of ``instances`` and their ``index``
+
+        Raises:
+            ValueError: If the text holds no Author-Paper instance
+        """
+        if isinstance(text, type(u'')):
+            text = text.encode('utf-8')
+        corpus_id = hashlib.sha1(text).hexdigest()
+        with self.lock:
+            prepared = self.corpora.get(corpus_id)
+        if prepared is None:
+            handle, path = tempfile.mkstemp(suffix='.txt')
+            try:
+                with os.fdopen(handle, 'wb') as f:
+                    f.write(text)
+                try:
+                    corpus = wos.read(path)
+                except Exception as error:
+                    raise ValueError('Not a Web of Science export: %s' % error)
+            finally:
+                os.remove(path)
+            prepared = PreparedCorpus(df=CorpusParser(tethne_corpus=corpus).parse())
+            if not len(prepared.df):
+                raise ValueError('No Author-Paper instance in the corpus')
+            with self.lock:
+                prepared = self.corpora.setdefault(corpus_id, prepared)
+                while len(self.corpora) > self.max_corpora:
+                    dropped, _ = self.corpora.popitem(last=False)
+                    logger.info('Dropped the least recently used corpus %s', dropped)
+        return {'corpus': corpus_id, 'instances': len(prepared.df), 'index': list(prepared.df.index)}
+
+    def corpus(self, corpus_id):
+        with self.lock:
+            if corpus_id not in self.corpora:
+                raise KeyError('Unknown corpus %r' % corpus_id)
+            # Moved to the end : the least recently used corpus is the first one.
+            prepared = self.corpora.pop(corpus_id)
+            self.corpora[corpus_id] = prepared
+            return prepared
+
+    def remove_corpus(self, corpus_id):
+        with self.lock:
+            if self.corpora.pop(corpus_id, None) is None:
+                raise KeyError('Unknown corpus %r' % corpus_id)
+
+    def classify_batch(self, corpus_id, positions):
+        """Classifies an array of pairs of row positions of a corpus. Called by the batching thread only."""
+        return classify_pairs(self.corpus(corpus_id), positions, return_proba=True, cascade=self.cascade,
+                              decisions=self.decisions)
+
+    def classify(self, corpus_id, pairs):
+        """
+        Classifies pairs of instances of a corpus, in a batch shared with the concurrent requests.
+
+        :param corpus_id: id returned by `add_corpus`
+        :param pairs: list of (index, index) pairs of instances of the corpus
+        :return: tuple (labels, probabilities) of numpy arrays
+
+        Raises:
+            ValueError: If `pairs` is not a list of pairs of indices of the corpus
+        """
+        prepared = self.corpus(corpus_id)
+        try:
+            left, right = pair_positions(prepared.df, np.array(pairs, dtype=object))
+        except KeyError as error:
+            raise ValueError(error.args[0])
+        if not len(left):
+            return np.empty(0, dtype=int), np.empty(0, dtype=float)
+        return self.batcher.submit(corpus_id, np.column_stack((left, right)))
+
+    def cluster(self, corpus_id, threshold=70):
+        """Starts an `IdentityCluster` job on a corpus in the worker pool. Returns the id of the job."""
+        prepared = self.corpus(corpus_id)
+        if not 0 <= threshold <= 100:
+            raise ValueError('threshold should be between 0 and 100')
+        job_id = uuid.uuid4().hex
+        result = self.pool.apply_async(cluster_job, (prepared.df, threshold, self.cascade, self.decisions))
+        with self.lock:
+            self.jobs[job_id] = result
+            for finished in [key for key, job in self.jobs.items() if job.ready()]:
+                if len(self.jobs) <= self.max_jobs:
+                    break
+                del self.jobs[finished]
+        return job_id
+
+    def remove_job(self, job_id):
+        """Forgets a job. A pending job still runs to its end, but its result is dropped."""
+        with self.lock:
+            if self.jobs.pop(job_id, None) is None:
+                raise KeyError('Unknown job %r' % job_id)
+
+    def job(self, job_id, timeout=None):
+        """
+        Returns the status of a job, with its clusters once done.
+
+        :param job_id: id returned by `cluster`
+        :param timeout: (float) seconds to wait for the job to finish. ``None`` does not wait.
+        """
+        with self.lock:
+            if job_id not in self.jobs:
+                raise KeyError('Unknown job %r' % job_id)
+            result = self.jobs[job_id]
+        if timeout is not None:
+            result.wait(timeout)
+        if not result.ready():
+            return {'status': 'pending'}
+        try:
+            return {'status': 'done', 'clusters': result.get()}
+        except Exception as error:
+            return {'status': 'failed', 'error': '%s: %s' % (type(error).__name__, error)}
+
+    def info(self):
+        with self.lock:
+            corpora = len(self.corpora)
+            jobs = len(self.jobs)
+        return {'status': 'ok', 'model': self.model, 'corpora': corpora, 'jobs': jobs, 'max_corpora': self.max_corpora,
+                'max_jobs': self.max_jobs, 'requests': self.batcher.requests, 'batches': self.batcher.batches}
+
+    def close(self):
+        """Stops the batching thread and the worker pool. Jobs still running are cancelled."""
+        self.batcher.close()
+        self.pool.terminate()
+        self.pool.join()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Routes the requests to the `Service` of the server (``self.server.service``)."""
+
+    def log_message(self, format, *args):
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def read_json(self):
+        try:
+            body = json.loads(self.read_body().decode('utf-8'))
+        except ValueError:
+            raise ValueError('The body should be a JSON object')
+        if not isinstance(body, dict):
+            raise ValueError('The body should be a JSON object')
+        return body
+
+    def handle_request(self, method):
+        service = self.server.service
+        path = self.path.split('?')[0].rstrip('/')
+        try:
+            if method == 'GET' and path == '/health':
+                self.send_json(200, service.info())
+            elif method == 'GET' and path.startswith('/jobs/'):
+                self.send_json(200, service.job(path[len('/jobs/'):]))
+            elif method == 'POST' and path == '/corpora':
+                self.send_json(200, service.add_corpus(self.read_body()))
+            elif method == 'POST' and path == '/classify':
+                body = self.read_json()
+                labels, probabilities = service.classify(body.get('corpus'), body.get('pairs', []))
+                self.send_json(200, {'labels': labels.tolist(), 'probabilities': probabilities.tolist()})
+            elif method == 'POST' and path == '/cluster':
+                body = self.read_json()
+                self.send_json(202, {'job': service.cluster(body.get('corpus'), body.get('threshold', 70))})
+            elif method == 'DELETE' and path.startswith('/corpora/'):
+                service.remove_corpus(path[len('/corpora/'):])
+                self.send_json(200, {'deleted': path[len('/corpora/'):]})
+            elif method == 'DELETE' and path.startswith('/jobs/'):
+                service.remove_job(path[len('/jobs/'):])
+                self.send_json(200, {'deleted': path[len('/jobs/'):]})
+            else:
+                self.send_json(404, {'error': 'No such path: %s %s' % (method, path)})
+        except KeyError as error:
+            self.send_json(404, {'error': error.args[0]})
+        except (ValueError, TypeError) as error:
+            self.send_json(400, {'error': str(error)})
+        except Exception as error:
+            logger.exception('%s %s failed', method, path)
+            self.send_json(500, {'error': '%s: %s' % (type(error).__name__, error)})
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def make_server(host='127.0.0.1', port=8080, service=None):
+    """
+    Returns an HTTP server (not yet serving) for `service`.
+
+    :param host: (str) address to listen on
+    :param port: (int) port to listen on. 0 picks a free port, available as ``server.server_address[1]``.
+    :param service: `Service`. ``None`` creates one with the default settings.
+    """
+    server = ThreadedHTTPServer((host, port), RequestHandler)
+    server.service = service if service is not None else Service()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HTTP service exposing the disambiguation pipeline')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--processes', type=int, default=1, help='worker processes of the clustering jobs')
+    parser.add_argument('--max-wait', type=float, default=0.005, help='seconds a classification batch waits')
+    parser.add_argument('--max-corpora', type=int, default=16, help='corpora kept in memory')
+    parser.add_argument('--max-jobs', type=int, default=256, help='clustering jobs kept')
+    parser.add_argument('--decisions', help='path of a DecisionStore database')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    decisions = None
+    if args.decisions:
+        from authors.decisions import DecisionStore
+        decisions = DecisionStore(args.decisions)
+    service = Service(processes=args.processes, max_wait=args.max_wait, decisions=decisions,
+                      max_corpora=args.max_corpora, max_jobs=args.max_jobs)
+    server = make_server(args.host, args.port, service)
+    logger.info('Serving on %s:%s', *server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+from __future__ import division
+from collections import OrderedDict
+import threading
+
+from fuzzywuzzy import fuzz
+
+
+class NameSimilarityCache:
+    """NameSimilarityCache : A bounded LRU cache of the fuzzy similarity of two names.
+
+    The name features of `Compare` (FNAME_SCORE, FNAME_PARTIAL_SCORE, LNAME_SCORE, LNAME_PARTIAL_SCORE) depend only on
+    the two name strings, and a block usually holds a handful of distinct names spread over many papers. The cache
+    computes `fuzz.ratio` / `fuzz.partial_ratio` once per name pair and keeps the `maxsize` most recently used
+    results. ``hits`` and ``misses`` count the lookups.
+
+    Example:
+        >>> cache = NameSimilarityCache(maxsize=10000)
+        >>> cache.ratio(u'BARBARA C', u'BARBARA') # max(fuzz.ratio(a, b), fuzz.ratio(b, a)) / 100.0
+        >>> cache.partial_ratio(u'BARBARA C', u'BARBARA') # fuzz.partial_ratio(a, b) / 100.0
+        >>> cache.info() # {'hits': 0, 'misses': 2, 'size': 2, 'maxsize': 10000}
+    """
+
+    def __init__(self, maxsize=100000):
+        """Initialisation(__init__()) for the class `NameSimilarityCache`
+
+        Args:
+            maxsize (int) : maximum number of cached results. 0 disables caching, ``None`` means unbounded.
+        """
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                # Re-insert the entry to mark it as the most recently used one.
+                value = self.entries.pop(key)
+                self.entries[key] = value
+                return value
+            self.misses += 1
+        value = compute()
+        if self.maxsize != 0:
+            with self.lock:
+                self.entries[key] = value
+                if self.maxsize is not None and len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return value
+
+    def ratio(self, name1, name2):
+        """Returns ``max(fuzz.ratio(name1, name2), fuzz.ratio(name2, name1)) / 100.0``. The result is symmetric."""
+        key = ('ratio', name1, name2) if name1 <= name2 else ('ratio', name2, name1)
+        return self.lookup(key, lambda: max(fuzz.ratio(name1, name2)/100.0, fuzz.ratio(name2, name1)/100.0))
+
+    def partial_ratio(self, name1, name2):
+        """Returns ``fuzz.partial_ratio(name1, name2) / 100.0``."""
+        return self.lookup(('partial_ratio', name1, name2), lambda: fuzz.partial_ratio(name1, name2)/100.0)
+
+    def info(self):
+        """Returns the hit and miss counters and the size of the cache."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries), 'maxsize': self.maxsize}
+
+    def clear(self):
+        """Drops every cached result and resets the counters."""
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Cache shared by all the pair scoring in this process.
+name_similarity = NameSimilarityCache()
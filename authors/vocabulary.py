@@ -0,0 +1,107 @@
+from __future__ import division
+import numpy as np
+from scipy import sparse
+
+
+class Vocabulary:
+    """Vocabulary : Interns hashable values (co-author names, keywords, email addresses, ...) into integer ids.
+
+    Example:
+        >>> vocabulary = Vocabulary()
+        >>> vocabulary.intern(u'ALBERTINI, DAVID') # 0
+        >>> vocabulary.intern(u'BOYER, BARBARA') # 1
+        >>> vocabulary.intern(u'ALBERTINI, DAVID') # 0
+        >>> vocabulary.values[1] # u'BOYER, BARBARA'
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value):
+        """Returns the id of `value`, assigning the next free id to values seen for the first time."""
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+
+class InternedSets:
+    """InternedSets : One set of interned values per Author-Paper instance, stored as a CSR matrix.
+
+    Row i of the matrix has a 1 in the column of every value of set i; the column ids of each row are sorted. Rows whose
+    set is missing (``None``) are marked as not ``valid``. Intersections and Jaccard scores of many pairs of rows are
+    computed at once with sparse matrix products instead of Python set operations.
+
+    Example:
+        >>> sets = InternedSets.from_sets([frozenset([u'A', u'B']), None, frozenset([u'B', u'C'])])
+        >>> sets.jaccard([0, 0], [1, 2]) # array([ 0.        ,  0.33333333])
+        >>> sets.values(2) # frozenset([u'B', u'C'])
+    """
+
+    def __init__(self, indptr, indices, valid, vocabulary):
+        self.indptr = indptr
+        self.indices = indices
+        self.valid = valid
+        self.vocabulary = vocabulary
+        self.sizes = np.diff(indptr)
+        self.matrix = sparse.csr_matrix((np.ones(len(indices)), indices, indptr),
+                                        shape=(len(valid), max(len(vocabulary), 1)))
+
+    @classmethod
+    def from_sets(cls, sets, vocabulary=None):
+        """
+        Interns a sequence of sets.
+
+        :param sets: sequence of sets (any iterable of hashable values) or ``None`` for a missing set
+        :param vocabulary: `Vocabulary` to intern the values with. A new one is created if not given.
+        :return: `InternedSets`
+        """
+        if vocabulary is None:
+            vocabulary = Vocabulary()
+        indptr = [0]
+        indices = []
+        valid = []
+        for values in sets:
+            if values is not None:
+                indices.extend(sorted(set(vocabulary.intern(value) for value in values)))
+            indptr.append(len(indices))
+            valid.append(values is not None)
+        return cls(indptr=np.array(indptr, dtype=np.intp), indices=np.array(indices, dtype=np.intp),
+                   valid=np.array(valid, dtype=bool), vocabulary=vocabulary)
+
+    def __len__(self):
+        return len(self.valid)
+
+    def values(self, i):
+        """Returns set i as a frozenset of the original values, or ``None`` if it is missing."""
+        if not self.valid[i]:
+            return None
+        value_ids = self.indices[self.indptr[i]:self.indptr[i + 1]]
+        return frozenset(self.vocabulary.values[value_id] for value_id in value_ids)
+
+    def intersection_sizes(self, left, right):
+        """Returns the size of the intersection of sets left[i] and right[i], for every i."""
+        left = np.asarray(left, dtype=np.intp)
+        right = np.asarray(right, dtype=np.intp)
+        if len(left) == 0 or len(self.indices) == 0:
+            return np.zeros(len(left))
+        return np.asarray(self.matrix[left].multiply(self.matrix[right]).sum(axis=1)).ravel()
+
+    def jaccard(self, left, right):
+        """
+        Returns ``len(intersection) / len(union)`` of sets left[i] and right[i], for every i. The score is 0 if one
+        of the sets is missing or both are empty.
+        """
+        left = np.asarray(left, dtype=np.intp)
+        right = np.asarray(right, dtype=np.intp)
+        intersection = self.intersection_sizes(left, right)
+        union = self.sizes[left] + self.sizes[right] - intersection
+        scores = np.zeros(len(left))
+        scored = self.valid[left] & self.valid[right] & (union > 0)
+        scores[scored] = intersection[scored] / union[scored]
+        return scores
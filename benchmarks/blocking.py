@@ -0,0 +1,76 @@
+"""
+Comparison of the blocking strategies of `authors.blocking`.
+
+Run from the root of the repository:
+
+    $ python -m benchmarks.blocking
+    $ python -m benchmarks.blocking tests/data/Albertini_David.txt tests/data/random1.txt
+
+For each corpus and strategy the script prints the number of blocks, the largest and mean block size, the number of
+pairs the blocks generate (the work of `IdentityCluster`), the time taken to build the blocks, and the pair recall:
+the share of the pairs of instances clustered together by the default `IdentityCluster` (greedy fuzzy blocking) which
+fall in the same block of the strategy.
+"""
+import glob
+import itertools
+import os
+import sys
+import time
+
+from tethne.readers import wos
+from authors.blocking import (FuzzyLabelBlocking, PhoneticBlocking, SortedNeighbourhoodBlocking,
+                              SurnameInitialBlocking)
+from authors.cluster import IdentityCluster
+from authors.paperinstances import PreparedCorpus
+
+
+datadir = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data')
+
+strategies = [FuzzyLabelBlocking(), SortedNeighbourhoodBlocking(window=5), SortedNeighbourhoodBlocking(window=20),
+              SurnameInitialBlocking(), PhoneticBlocking()]
+
+
+def reference_pairs(prepared):
+    """Returns the pairs of instances the default `IdentityCluster` puts in the same component."""
+    identity_cluster = IdentityCluster(corpus=prepared)
+    identity_cluster.build()
+    pairs = set()
+    for components in identity_cluster.components.values():
+        for component in components:
+            pairs.update(itertools.combinations(sorted(component), 2))
+    return pairs
+
+
+def pair_recall(prepared, blocks, pairs):
+    block_of = {}
+    for label, literals in blocks.items():
+        for literal in literals:
+            block_of[literal] = label
+    literal_of = prepared.df['AUTH_LITERAL']
+    found = sum(1 for a, b in pairs if block_of[literal_of[a]] == block_of[literal_of[b]])
+    return found / float(len(pairs)) if pairs else 1.0
+
+
+def main(paths):
+    for path in paths:
+        prepared = PreparedCorpus(tethne_corpus=wos.read(path))
+        pairs = reference_pairs(prepared)
+        print '%s : %d instances, %d literals' % (os.path.basename(path), len(prepared.df), len(prepared.literals))
+        print '%-24s %8s %9s %9s %10s %9s %8s' % ('strategy', 'blocks', 'max size', 'mean size', 'pairs', 'time(s)',
+                                                  'recall')
+        for strategy in strategies:
+            start = time.time()
+            blocks = strategy.blocks(prepared)
+            elapsed = time.time() - start
+            statistics = strategy.statistics(prepared, blocks)
+            name = statistics['strategy']
+            if isinstance(strategy, SortedNeighbourhoodBlocking):
+                name += '(%d)' % strategy.window
+            print '%-24s %8d %9d %9.1f %10d %9.3f %8.3f' % (name, statistics['blocks'], statistics['max_size'],
+                                                            statistics['mean_size'], statistics['pairs'], elapsed,
+                                                            pair_recall(prepared, blocks, pairs))
+        print
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or sorted(glob.glob(os.path.join(datadir, '*.txt'))))
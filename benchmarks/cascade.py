@@ -0,0 +1,68 @@
+"""
+Validation of the pre-filter cascade of `authors.cascade` against the full model.
+
+Run from the root of the repository:
+
+    $ python -m benchmarks.cascade
+    $ python -m benchmarks.cascade tests/data/Albertini_David.txt
+
+The script first bounds the match probability of the classifier over every default rule (`Cascade.verify()`). Then,
+for each corpus, it classifies every pair of instances of the initial clusters with and without the cascade, and prints
+the number of pairs, the share of pairs on which both agree, the pairs settled at each stage of the cascade and the time
+taken. Without any disagreement the identity clusters are the same with and without the cascade.
+"""
+import glob
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+from tethne.readers import wos
+from authors.cascade import Cascade, stages
+from authors.cluster import InitialCluster
+from authors.paperinstances import FeatureStore, PreparedCorpus, classify_pairs
+
+
+datadir = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data')
+
+
+def block_pairs(prepared):
+    """Returns every pair of row positions inside the initial clusters of `prepared`, as an array of shape (n, 2)."""
+    pairs = []
+    for members in InitialCluster(corpus=prepared).build().values():
+        pairs.extend(itertools.combinations(prepared.positions(members), 2))
+    return np.array(pairs, dtype=np.intp).reshape(-1, 2)
+
+
+def timed(function, *args, **kwargs):
+    start = time.time()
+    result = function(*args, **kwargs)
+    return result, time.time() - start
+
+
+def main(paths):
+    cascade = Cascade()
+    for name, label, (low, high), safe in cascade.verify():
+        print 'rule %-20s label %d : match probability in [%.3f, %.3f], %s' % (name, label, low, high,
+                                                                               'safe' if safe else 'NOT SAFE')
+    print
+    print '%-28s %8s %9s %s %8s %8s' % ('corpus', 'pairs', 'agree', ' '.join('%8s' % stage for stage, _ in stages)
+                                        + ' %8s' % 'model', 'full(s)', 'cascade(s)')
+    for path in paths:
+        prepared = PreparedCorpus(tethne_corpus=wos.read(path))
+        pairs = block_pairs(prepared)
+        # Fresh stores, so that neither run profits from the name similarities cached by the other.
+        full, full_time = timed(classify_pairs, FeatureStore(prepared.df), pairs)
+        cascade.reset()
+        labels, cascade_time = timed(classify_pairs, FeatureStore(prepared.df), pairs, cascade=cascade)
+        counters = cascade.info()
+        agreement = (labels == full).mean() if len(pairs) else 1.0
+        print '%-28s %8d %9.4f %s %8.2f %8.2f' % (os.path.basename(path), len(pairs), agreement,
+                                                  ' '.join('%8d' % counters[stage] for stage, _ in stages)
+                                                  + ' %8d' % counters['model'], full_time, cascade_time)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or sorted(glob.glob(os.path.join(datadir, '*.txt'))))
@@ -0,0 +1,63 @@
+"""
+Memory used by the Author-Paper instance table : DataFrame of `CorpusParser.parse()` versus `CompactInstances`.
+
+Run from the root of the repository:
+
+    $ python -m benchmarks.compact_layout
+    $ python -m benchmarks.compact_layout tests/data/Honjo_Tasuka_part1.txt
+
+For each column the script prints the bytes held by the DataFrame and by the compact layout. The DataFrame size counts
+every object reachable from the column once (list items included, which ``DataFrame.memory_usage(deep=True)`` leaves
+out) plus the string index; ``pandas deep`` is the figure pandas reports.
+"""
+import os
+import sys
+import time
+
+from tethne.readers import wos
+from authors.compact import CompactInstances
+from authors.paperinstances import CorpusParser, columns
+
+
+datadir = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data')
+
+
+def reachable_size(values, seen):
+    """Returns the size of the objects reachable from `values` which are not in `seen` yet."""
+    size = 0
+    stack = list(values)
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return size
+
+
+def main(paths):
+    for path in paths:
+        df = CorpusParser(tethne_corpus=wos.read(path)).parse()
+        start = time.time()
+        compact = CompactInstances(df)
+        build_time = time.time() - start
+        usage = compact.memory_usage()
+        print '%s : %d instances, compact layout built in %.3fs' % (os.path.basename(path), len(df), build_time)
+        print '%-16s %12s %12s' % ('column', 'DataFrame', 'compact')
+        seen = set()
+        total = 0
+        for column in columns:
+            size = df[column].values.nbytes + reachable_size(df[column].values, seen)
+            total += size
+            print '%-16s %12d %12d' % (column, size, usage[column])
+        index_size = df.index.values.nbytes + reachable_size(df.index.values, seen)
+        total += index_size
+        print '%-16s %12d %12d' % ('index', index_size, 0)
+        print '%-16s %12d %12d (%.1fx smaller)' % ('total', total, usage['total'], total / float(usage['total']))
+        print '%-16s %12d' % ('pandas deep', df.memory_usage(deep=True).sum())
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or [os.path.join(datadir, 'Honjo_Tasuka_part1.txt')])
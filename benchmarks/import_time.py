@@ -0,0 +1,76 @@
+"""
+Cold start benchmark : time taken to import the `authors` modules and to load the classifier, each measured in a fresh
+Python process.
+
+Run from the root of the repository:
+
+    $ python -m benchmarks.import_time
+    $ python -m benchmarks.import_time --repeat 10 --max-import-seconds 1.5
+
+With ``--max-import-seconds`` the script exits with status 1 if the median import time of a module is above the limit,
+so it can guard against work creeping back into import time.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+rootdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+modules = ['authors.paperinstances', 'authors.cluster']
+
+models = [os.path.join(rootdir, 'classificationmodels', 'random_forest.pkl'),
+          os.path.join(rootdir, 'classificationmodels', 'random_forest.npz')]
+
+import_snippet = '''
+import sys, time
+start = time.time()
+import %s
+elapsed = time.time() - start
+import authors.models
+assert authors.models._classifier is None, 'the classifier was loaded at import time'
+print(elapsed)
+'''
+
+load_snippet = '''
+import time
+from authors.models import get_classifier, set_classifier_path
+set_classifier_path(%r)
+start = time.time()
+get_classifier()
+print(time.time() - start)
+'''
+
+
+def run(snippet):
+    env = dict(os.environ, PYTHONPATH=rootdir, PYTHONWARNINGS='ignore')
+    output = subprocess.check_output([sys.executable, '-c', snippet], cwd=rootdir, env=env)
+    return float(output.split()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-import-seconds', type=float, default=None)
+    args = parser.parse_args()
+
+    failed = False
+    for module in modules:
+        elapsed = median([run(import_snippet % module) for _ in range(args.repeat)])
+        print 'import %-40s %8.3fs' % (module, elapsed)
+        if args.max_import_seconds is not None and elapsed > args.max_import_seconds:
+            failed = True
+    for model in models:
+        elapsed = median([run(load_snippet % model) for _ in range(args.repeat)])
+        print 'load   %-40s %8.3fs' % (os.path.basename(model), elapsed)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
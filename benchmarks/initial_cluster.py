@@ -0,0 +1,44 @@
+"""
+Benchmark of `InitialCluster.build()` : linear scan over the labels versus the `LiteralIndex` lookup.
+
+Run from the root of the repository:
+
+    $ python -m benchmarks.initial_cluster
+    $ python -m benchmarks.initial_cluster tests/data/Albertini_David.txt tests/data/random1.txt
+
+For each corpus the script prints the number of distinct author literals, the number of initial clusters, the time
+taken by both strategies and whether they built identical clusters.
+"""
+import glob
+import os
+import sys
+import time
+
+from tethne.readers import wos
+from authors.cluster import InitialCluster
+from authors.paperinstances import PreparedCorpus
+
+
+datadir = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data')
+
+
+def timed_build(prepared, indexed):
+    start = time.time()
+    clusters = InitialCluster(corpus=prepared, indexed=indexed).build()
+    return clusters, time.time() - start
+
+
+def main(paths):
+    print '%-25s %9s %9s %10s %10s %8s %10s' % ('corpus', 'literals', 'clusters', 'linear(s)', 'indexed(s)',
+                                                'speedup', 'identical')
+    for path in paths:
+        prepared = PreparedCorpus(tethne_corpus=wos.read(path))
+        linear, linear_time = timed_build(prepared, indexed=False)
+        indexed, indexed_time = timed_build(prepared, indexed=True)
+        print '%-25s %9d %9d %10.3f %10.3f %7.1fx %10s' % (os.path.basename(path), len(prepared.literals),
+                                                           len(indexed), linear_time, indexed_time,
+                                                           linear_time / max(indexed_time, 1e-6), linear == indexed)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or sorted(glob.glob(os.path.join(datadir, '*.txt'))))
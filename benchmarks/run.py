@@ -0,0 +1,275 @@
+"""
+Benchmark suite : throughput of each stage of the pipeline on the bundled WoS corpora, and on larger corpora scaled up
+from them.
+
+Run from the root of the repository:
+
+    $ python -m benchmarks.run --output results.json
+    $ python -m benchmarks.run tests/data/Dawid_Igor.txt --scale 1 2 4 8 --output scaling.json
+    $ python -m benchmarks.run --baseline results.json --max-slowdown 0.25
+
+The stages are:
+    * ``read`` : `wos.read()` (count : papers)
+    * ``parse`` : `CorpusParser.parse()` (count : Author-Paper instances)
+    * ``initial_cluster`` : `InitialCluster.build()` (count : author literals)
+    * ``identity_cluster`` : `IdentityCluster.build()`, including its initial clusters (count : pairs classified)
+    * ``classify_pairs`` : `classify_pairs()` over the pairs of the initial clusters, at most ``--max-pairs`` of them
+    * ``classify`` : `classify()` on each of the first ``--max-single-pairs`` of these pairs
+For each stage the suite records the wall time (the best of ``--repeat`` runs), the count and count per second, the
+classifier calls, and the peak resident memory of the process at the end of the stage. Every corpus runs in a fresh
+Python process, so that the peak memory of one corpus does not leak into the next, and the name similarity cache is
+cleared before every run, so that repeats measure the same work.
+
+``--scale k`` benchmarks a corpus k times the size of each fixture: its papers are written k times to a WoS file, the
+copies with new WoS ids and, for a share (``--perturb``) of the authors, another first initial, so that the copies
+add new author literals as well as new papers of the known ones. The corpora are generated with a fixed ``--seed``.
+
+The results are written as JSON (``--output``). With ``--baseline`` each stage is compared with the same stage of a
+previous result file, and with ``--max-slowdown`` the script exits with status 1 if a stage got slower than that (0.25
+is 25% slower).
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+rootdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+datadir = os.path.join(rootdir, 'tests', 'data')
+
+
+def scale_corpus(path, factor, output, seed=0, perturb=0.2):
+    """
+    Writes to `output` a WoS file with `factor` copies of the papers of `path`. The first copy is unchanged; the others
+    get new WoS ids (``UT``) and, for a share `perturb` of their authors (``AU`` and ``AF`` alike), another first
+    initial.
+
+    :return: `output`
+    """
+    rng = random.Random(seed)
+    with open(path) as f:
+        lines = f.read().splitlines()
+    header, records, record = [], [], None
+    for line in lines:
+        if line.startswith('PT '):
+            record = [line]
+        elif record is not None:
+            record.append(line)
+            if line.startswith('ER'):
+                records.append(record)
+                record = None
+        elif not line.startswith('EF'):
+            header.append(line)
+    with open(output, 'w') as f:
+        f.write('\n'.join(header) + '\n')
+        for copy in range(factor):
+            for record in records:
+                if copy:
+                    record = perturbed_record(record, copy, rng, perturb)
+                f.write('\n'.join(record) + '\n\n')
+        f.write('EF\n')
+    return output
+
+
+def perturbed_record(record, copy, rng, perturb):
+    """Returns a copy of the lines of a WoS `record` with a new WoS id and some authors with another first initial."""
+    fields = []
+    for line in record:
+        if line[:2].strip():
+            fields.append([line[:2], [line[3:]]])
+        else:
+            fields[-1][1].append(line[3:])
+    n_authors = max([len(values) for tag, values in fields if tag in ('AU', 'AF')] + [0])
+    initials = {}
+    for i in range(n_authors):
+        if rng.random() < perturb:
+            initials[i] = rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+    lines = []
+    for tag, values in fields:
+        if tag == 'UT':
+            values = ['%sX%d' % (values[0], copy)] + values[1:]
+        elif tag in ('AU', 'AF'):
+            values = [renamed(value, initials.get(i)) for i, value in enumerate(values)]
+        lines.append('%s %s' % (tag, values[0]))
+        lines.extend('   ' + value for value in values[1:])
+    return lines
+
+
+def renamed(name, initial):
+    """Replaces the first letter of the first name of a WoS author ('LAST, FIRST') with `initial`."""
+    if initial is None or ', ' not in name:
+        return name
+    last, first = name.split(', ', 1)
+    if not first:
+        return name
+    initial = initial if first[0].isupper() else initial.lower()
+    return '%s, %s%s' % (last, initial, first[1:])
+
+
+def measure(function, repeat):
+    """Runs `function` `repeat` times, each time with a fresh `Metrics` collector and an empty name similarity cache.
+    Returns the result, the best wall time and the metrics report of the best run."""
+    from authors.metrics import Metrics, set_metrics
+    from authors.similarity import name_similarity
+    best = None
+    for _ in range(repeat):
+        name_similarity.clear()
+        metrics = set_metrics(Metrics())
+        start = time.time()
+        try:
+            result = function()
+        finally:
+            set_metrics(None)
+        seconds = time.time() - start
+        if best is None or seconds < best[1]:
+            best = (result, seconds, metrics.report())
+    return best
+
+
+def benchmark_corpus(path, repeat, max_pairs, max_single_pairs):
+    """Runs every stage on the corpus at `path`, in this process. Returns a list of stage records."""
+    import numpy as np
+    from tethne.readers import wos
+    from authors.cluster import IdentityCluster, InitialCluster
+    from authors.models import get_classifier
+    from authors.paperinstances import CorpusParser, PreparedCorpus, classify, classify_pairs
+
+    get_classifier() # loading the model is not part of any stage
+    records = []
+
+    def record(stage, seconds, report, count, unit):
+        records.append({'stage': stage, 'seconds': seconds, 'count': count, 'unit': unit,
+                        'per_second': count / seconds if seconds else None,
+                        'classifier_calls': report['counters'].get('classifier_calls', 0),
+                        'peak_rss': report['peak_rss']})
+
+    corpus, seconds, report = measure(lambda: wos.read(path), repeat)
+    record('read', seconds, report, len(corpus.papers), 'papers')
+    df, seconds, report = measure(lambda: CorpusParser(tethne_corpus=corpus).parse(), repeat)
+    record('parse', seconds, report, len(df), 'instances')
+    blocks, seconds, report = measure(lambda: InitialCluster(corpus=PreparedCorpus(df=df)).build(), repeat)
+    record('initial_cluster', seconds, report, df['AUTH_LITERAL'].nunique(), 'literals')
+    _, seconds, report = measure(lambda: IdentityCluster(corpus=PreparedCorpus(df=df)).build(), repeat)
+    record('identity_cluster', seconds, report, report['counters'].get('pairs_compared', 0), 'pairs')
+
+    prepared = PreparedCorpus(df=df)
+    pairs = list(itertools.islice((pair for members in blocks.values()
+                                   for pair in itertools.combinations(prepared.positions(members), 2)), max_pairs))
+    pairs = np.array(pairs, dtype=np.intp).reshape(-1, 2)
+    _, seconds, report = measure(lambda: classify_pairs(PreparedCorpus(df=df), pairs), repeat)
+    record('classify_pairs', seconds, report, len(pairs), 'pairs')
+    single = pairs[:max_single_pairs]
+    _, seconds, report = measure(lambda: [classify(df.iloc[i], df.iloc[j]) for i, j in single], repeat)
+    record('classify', seconds, report, len(single), 'pairs')
+    return records
+
+
+def run_worker(path, args):
+    """Benchmarks the corpus at `path` in a fresh Python process and returns its stage records."""
+    command = [sys.executable, '-m', 'benchmarks.run', '--worker', path, '--repeat', str(args.repeat),
+               '--max-pairs', str(args.max_pairs), '--max-single-pairs', str(args.max_single_pairs)]
+    env = dict(os.environ, PYTHONPATH=rootdir, PYTHONWARNINGS='ignore')
+    output = subprocess.check_output(command, cwd=rootdir, env=env)
+    return json.loads(output.splitlines()[-1])
+
+
+def environment():
+    """Describes the machine and the versions the results were measured with."""
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=rootdir,
+                                         stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'machine': platform.machine(),
+            'commit': commit, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, baseline):
+    """
+    Compares each stage of `results` with the same corpus, scale and stage of `baseline`.
+
+    :return: list of (result, baseline seconds, slowdown) tuples, slowdown being the relative change of the wall time
+             (0.1 is 10% slower, -0.1 10% faster).
+    """
+    reference = dict(((result['corpus'], result['scale'], result['stage']), result) for result in baseline['results'])
+    comparison = []
+    for result in results['results']:
+        previous = reference.get((result['corpus'], result['scale'], result['stage']))
+        if previous is None or not previous['seconds']:
+            continue
+        comparison.append((result, previous['seconds'], result['seconds'] / previous['seconds'] - 1.0))
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='WoS files (default: every fixture of tests/data)')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1], help='scale factors of the corpora')
+    parser.add_argument('--perturb', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-pairs', type=int, default=20000)
+    parser.add_argument('--max-single-pairs', type=int, default=200)
+    parser.add_argument('--output', help='JSON file the results are written to')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare with')
+    parser.add_argument('--max-slowdown', type=float, default=None)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print json.dumps(benchmark_corpus(args.worker, args.repeat, args.max_pairs, args.max_single_pairs))
+        return 0
+
+    paths = args.paths or sorted(glob.glob(os.path.join(datadir, '*.txt')))
+    results = {'environment': environment(), 'settings': {'repeat': args.repeat, 'max_pairs': args.max_pairs,
+                                                          'max_single_pairs': args.max_single_pairs,
+                                                          'perturb': args.perturb, 'seed': args.seed},
+               'results': []}
+    scratch = tempfile.mkdtemp(prefix='tethne-benchmarks-')
+    print '%-28s %5s %-17s %9s %10s %-9s %12s %7s %9s' % ('corpus', 'scale', 'stage', 'seconds', 'count', 'unit',
+                                                          'per second', 'calls', 'rss(MiB)')
+    try:
+        for path in paths:
+            for factor in args.scale:
+                corpus_path = path
+                if factor != 1:
+                    corpus_path = scale_corpus(path, factor, os.path.join(scratch, 'x%d_%s' % (
+                        factor, os.path.basename(path))), seed=args.seed, perturb=args.perturb)
+                for result in run_worker(corpus_path, args):
+                    result.update(corpus=os.path.basename(path), scale=factor)
+                    results['results'].append(result)
+                    print '%-28s %5d %-17s %9.3f %10d %-9s %12.1f %7d %9.1f' % (
+                        result['corpus'], factor, result['stage'], result['seconds'], result['count'], result['unit'],
+                        result['per_second'] or 0.0, result['classifier_calls'], (result['peak_rss'] or 0) / 2.0 ** 20)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print
+        print '%-28s %5s %-17s %9s %9s %9s' % ('corpus', 'scale', 'stage', 'baseline', 'seconds', 'change')
+        for result, previous, slowdown in compare(results, baseline):
+            regression = args.max_slowdown is not None and slowdown > args.max_slowdown
+            failed = failed or regression
+            print '%-28s %5d %-17s %9.3f %9.3f %+8.1f%%%s' % (result['corpus'], result['scale'], result['stage'],
+                                                               previous, result['seconds'], 100 * slowdown,
+                                                               '  REGRESSION' if regression else '')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
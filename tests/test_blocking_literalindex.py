@@ -0,0 +1,39 @@
+import unittest
+
+from fuzzywuzzy import fuzz
+from tethne.readers import wos
+from authors.blocking import LiteralIndex
+from authors.cluster import InitialCluster
+from authors.paperinstances import PreparedCorpus
+
+datapath = './data/Anderson_Everett.txt'
+
+
+class TestLiteralIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.prepared = PreparedCorpus(tethne_corpus=wos.read(datapath))
+        self.literals = list(self.prepared.literals)
+
+    def test_candidates_include_every_match(self):
+        for threshold in (50, 70, 90):
+            index = LiteralIndex(literals=self.literals, threshold=threshold)
+            for literal in self.literals:
+                index.add(literal)
+            for x in self.literals:
+                candidates = set(index.candidates(x))
+                for k in self.literals:
+                    if max(fuzz.ratio(x, k), fuzz.ratio(k, x)) >= threshold:
+                        self.assertIn(k, candidates)
+
+    def test_candidates_in_insertion_order(self):
+        index = LiteralIndex(literals=[u'ALBERTINIDF', u'ALBERTINID', u'ALBERTINDF'])
+        index.add(u'ALBERTINIDF')
+        index.add(u'ALBERTINDF')
+        self.assertEqual(index.candidates(u'ALBERTINID'), [u'ALBERTINIDF', u'ALBERTINDF'])
+        self.assertEqual(index.candidates(u'BOYERBC'), [])
+
+    def test_same_clusters_as_linear_scan(self):
+        linear = InitialCluster(corpus=self.prepared, indexed=False).build()
+        indexed = InitialCluster(corpus=self.prepared, indexed=True).build()
+        self.assertEqual(linear, indexed)
@@ -0,0 +1,54 @@
+import unittest
+
+from tethne.readers import wos
+from authors.blocking import (FuzzyLabelBlocking, PhoneticBlocking, SortedNeighbourhoodBlocking,
+                              SurnameInitialBlocking, soundex)
+from authors.cluster import IdentityCluster, InitialCluster
+from authors.paperinstances import PreparedCorpus
+
+datapath = './data/Boyer_Barbara.txt'
+
+
+class TestBlockingStrategies(unittest.TestCase):
+
+    def setUp(self):
+        self.prepared = PreparedCorpus(tethne_corpus=wos.read(datapath))
+        self.strategies = [FuzzyLabelBlocking(), SortedNeighbourhoodBlocking(window=3), SurnameInitialBlocking(),
+                           PhoneticBlocking()]
+
+    def test_soundex(self):
+        self.assertEqual(soundex(u'ROBERT'), u'R163')
+        self.assertEqual(soundex(u'RUPERT'), u'R163')
+        self.assertEqual(soundex(u'ASHCRAFT'), u'A261')
+        self.assertEqual(soundex(u'TYMCZAK'), u'T522')
+        self.assertEqual(soundex(u"O'HARA"), u'O600')
+        self.assertEqual(soundex(u''), u'')
+
+    def test_partition(self):
+        for strategy in self.strategies:
+            blocks = strategy.blocks(self.prepared)
+            literals = [literal for members in blocks.values() for literal in members]
+            self.assertEqual(sorted(literals), sorted(self.prepared.literals))
+            for label, members in blocks.items():
+                self.assertIn(label, members)
+
+    def test_fuzzy_blocking(self):
+        blocks = FuzzyLabelBlocking().blocks(self.prepared)
+        self.assertEqual(blocks, InitialCluster(corpus=self.prepared).build())
+
+    def test_key_blocking(self):
+        blocks = SurnameInitialBlocking().blocks(self.prepared)
+        self.assertIn(u'BOYERB', blocks)
+        self.assertSetEqual(blocks[u'BOYERB'], set([u'BOYERB', u'BOYERBC']))
+
+    def test_statistics(self):
+        strategy = SurnameInitialBlocking()
+        statistics = strategy.statistics(self.prepared, strategy.blocks(self.prepared))
+        self.assertEqual(statistics['instances'], len(self.prepared.df))
+        self.assertEqual(sum(statistics['sizes'].values()), statistics['blocks'])
+        self.assertEqual(statistics['pairs'], sum(size * (size - 1) // 2 * count
+                                                  for size, count in statistics['sizes'].items()))
+
+    def test_identity_cluster(self):
+        identity_clusters = IdentityCluster(corpus=self.prepared, blocking=PhoneticBlocking()).build()
+        self.assertEqual(len(identity_clusters[u'BOYERB']), 30)
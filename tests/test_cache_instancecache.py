@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from tethne.readers import wos
+from authors.cache import InstanceCache, content_hash
+from authors.paperinstances import CorpusParser
+
+sys.path.append('./')
+datapath = './data/Boyer_Barbara.txt'
+datapath2 = './data/deTerra_Noel.txt'
+
+
+class TestInstanceCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_load(self):
+        cache = InstanceCache(directory=self.directory)
+        df = cache.load(datapath)
+        self.assertEqual(cache.misses, 1)
+        cached = cache.load(datapath)
+        self.assertEqual(cache.hits, 1)
+        self.assertTrue(cached.equals(CorpusParser(tethne_corpus=wos.read(datapath)).parse()))
+        self.assertTrue(cached.equals(df))
+
+    def test_changed_file(self):
+        path = os.path.join(self.directory, 'corpus.txt')
+        shutil.copy(datapath, path)
+        key = content_hash(path)
+        cache = InstanceCache(directory=os.path.join(self.directory, 'cache'))
+        cache.load(path)
+        with open(path, 'ab') as f:
+            f.write('\n')
+        self.assertNotEqual(content_hash(path), key)
+        self.assertIsNone(cache.get(path))
+
+    def test_invalidate(self):
+        cache = InstanceCache(directory=self.directory)
+        cache.load(datapath)
+        cache.load(datapath2)
+        cache.invalidate(datapath)
+        self.assertIsNone(cache.get(datapath))
+        self.assertIsNotNone(cache.get(datapath2))
+        cache.invalidate()
+        self.assertEqual(cache.info()['entries'], 0)
+
+    def test_eviction(self):
+        cache = InstanceCache(directory=self.directory)
+        cache.load(datapath)
+        cache.load(datapath2)
+        sizes = dict((os.path.basename(entry), size) for entry, size, _ in cache.entries())
+        # Mark the first entry as the least recently used one.
+        first = cache.entry_path(content_hash(datapath))
+        os.utime(first, (0, 0))
+        cache.max_bytes = sum(sizes.values()) - 1
+        cache.evict()
+        self.assertIsNone(cache.get(datapath))
+        self.assertIsNotNone(cache.get(datapath2))
+
+    def test_unreadable_entry(self):
+        cache = InstanceCache(directory=self.directory)
+        cache.load(datapath)
+        with open(cache.entry_path(content_hash(datapath)), 'wb') as f:
+            f.write('truncated')
+        self.assertIsNone(cache.get(datapath))
+        self.assertEqual(cache.info()['entries'], 0)
@@ -0,0 +1,57 @@
+import unittest
+import itertools
+
+import numpy as np
+from tethne.readers import wos
+from authors.cascade import Cascade, Rule
+from authors.cluster import IdentityCluster, InitialCluster
+from authors.paperinstances import PreparedCorpus, classify_pairs
+
+datapath = './data/Boyer_Barbara.txt'
+
+
+class TestCascadeRules(unittest.TestCase):
+
+    def setUp(self):
+        self.prepared = PreparedCorpus(tethne_corpus=wos.read(datapath))
+        pairs = []
+        for members in InitialCluster(corpus=self.prepared).build().values():
+            pairs.extend(itertools.combinations(self.prepared.positions(members), 2))
+        self.pairs = np.array(pairs)
+
+    def test_unknown_feature(self):
+        self.assertRaises(ValueError, Rule, 'typo', 0, {'EMAIL_SCORE': (0, 0)})
+
+    def test_default_rules_are_safe(self):
+        for name, label, (low, high), safe in Cascade().verify():
+            self.assertTrue(safe, name)
+            self.assertLessEqual(low, high)
+
+    def test_agreement_with_model(self):
+        cascade = Cascade()
+        labels, probabilities = classify_pairs(self.prepared, self.pairs, chunk_size=100, return_proba=True,
+                                               cascade=cascade)
+        self.assertEqual(list(labels), list(classify_pairs(self.prepared, self.pairs)))
+        counters = cascade.info()
+        self.assertEqual(counters['pairs'], len(self.pairs))
+        self.assertEqual(counters['overlap'] + counters['names'] + counters['partial'] + counters['model'],
+                         len(self.pairs))
+        self.assertGreater(counters['names'], 0)
+        cascade.reset()
+        self.assertEqual(cascade.info()['pairs'], 0)
+
+    def test_stage(self):
+        # A rule on the overlap features only settles pairs before any name is compared.
+        cascade = Cascade(rules=[Rule('no-coauthor', 0, {'COAUTHOR_SCORE': (0, 0)})])
+        labels = classify_pairs(self.prepared, self.pairs, cascade=cascade)
+        counters = cascade.info()
+        self.assertGreater(counters['overlap'], 0)
+        self.assertEqual(counters['names'], 0)
+        self.assertGreaterEqual(list(labels).count(0), counters['overlap'])
+
+    def test_identity_cluster(self):
+        prepared = PreparedCorpus(tethne_corpus=wos.read('./data/Hollinger_Thomas.txt'))
+        identity_cluster = IdentityCluster(corpus=prepared, cascade=Cascade())
+        identity_clusters = identity_cluster.build()
+        self.assertEqual(identity_clusters, IdentityCluster(corpus=prepared).build())
+        self.assertGreater(sum(stats['settled'] for stats in identity_cluster.block_stats.values()), 0)
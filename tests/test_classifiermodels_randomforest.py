@@ -5,6 +5,7 @@ import pandas as pd
 from tethne.readers import wos
 from authors.paperinstances import CorpusParser
 from authors.paperinstances import classify
+from authors.paperinstances import classify_pairs
 
 datapath = './data/Boyer_Barbara.txt'
 
@@ -27,3 +28,22 @@ class TestRandomForestClassifier(unittest.TestCase):
         index2 = 'MARTINDALEMQWOS:000077556600009'
         match = classify(self.df.loc[index1], self.df.loc[index2])
         self.assertEqual(match, [0])
+
+    def test_batch_classification(self):
+        pairs = [('BOYERBCWOS:000076265300004', 'BOYERBWOS:A1996UQ10700011'),
+                 ('BOYERBCWOS:000076265300004', 'MARTINDALEMQWOS:000077556600009')]
+        labels, probabilities = classify_pairs(self.df, pairs, return_proba=True)
+        self.assertEqual(list(labels), [1, 0])
+        self.assertGreater(probabilities[0], 0.5)
+        self.assertLessEqual(probabilities[1], 0.5)
+
+    def test_batch_matches_single_classification(self):
+        pairs = [(i, j) for i in range(10) for j in range(10) if i < j]
+        labels = classify_pairs(self.df, pairs, chunk_size=7)
+        for (i, j), label in zip(pairs, labels):
+            self.assertEqual(classify(self.df.iloc[i], self.df.iloc[j])[0], label)
+
+    def test_batch_invalid_pairs(self):
+        self.assertRaises(KeyError, classify_pairs, self.df, [(0, -1)])
+        self.assertRaises(KeyError, classify_pairs, self.df, [(0, len(self.df))])
+        self.assertRaises(KeyError, classify_pairs, self.df, [('BOYERBCWOS:000076265300004', 'UNKNOWN')])
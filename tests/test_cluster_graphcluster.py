@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+from scipy import sparse
+from tethne.readers import wos
+from authors.cluster import GraphCluster, IdentityCluster
+from authors.engine import average_linkage, probability_components
+from authors.paperinstances import PreparedCorpus
+
+datapath = './data/Boyer_Barbara.txt'
+
+
+class TestGraphCluster(unittest.TestCase):
+
+    def setUp(self):
+        self.prepared = PreparedCorpus(tethne_corpus=wos.read(datapath))
+
+    def test_same_as_identity_cluster(self):
+        identity_clusters = IdentityCluster(corpus=self.prepared).build()
+        self.assertEqual(GraphCluster(corpus=self.prepared).build(), identity_clusters)
+
+    def test_scores(self):
+        graph_cluster = GraphCluster(corpus=self.prepared)
+        scores = graph_cluster.score()
+        index, matrix = scores['BOYERB']
+        self.assertEqual(matrix.shape, (len(index), len(index)))
+        self.assertEqual(sparse.tril(matrix).nnz, 0)
+        self.assertTrue(((matrix.data > 0) & (matrix.data <= 1)).all())
+
+    def test_thresholds(self):
+        graph_cluster = GraphCluster(corpus=self.prepared)
+        graph_cluster.score()
+        counts = []
+        for probability in [0.1, 0.5, 0.9, 1.0]:
+            graph_cluster.cluster(probability=probability)
+            counts.append(sum(len(components) for components in graph_cluster.components.values()))
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[-1], len(self.prepared.df))
+        graph_cluster.cluster(probability=0.5, method='average')
+        self.assertEqual(sum(len(component) for components in graph_cluster.components.values()
+                             for component in components), len(self.prepared.df))
+        self.assertRaises(ValueError, graph_cluster.cluster, 0.5, 'single')
+        self.assertRaises(ValueError, GraphCluster(corpus=self.prepared).cluster)
+
+    def test_average_linkage(self):
+        # 0 and 1 are linked by a single strong pair only; 2 is close to both 3 and 4.
+        matrix = sparse.csr_matrix(np.array([[0, 0.9, 0.0, 0.0, 0.0],
+                                             [0, 0, 0.6, 0.0, 0.0],
+                                             [0, 0, 0, 0.9, 0.9],
+                                             [0, 0, 0, 0, 0.8],
+                                             [0, 0, 0, 0, 0]]))
+        self.assertEqual([list(group) for group in probability_components(matrix, 0.5)], [[0, 1, 2, 3, 4]])
+        self.assertEqual([list(group) for group in average_linkage(matrix, 0.5)], [[0, 1], [2, 3, 4]])
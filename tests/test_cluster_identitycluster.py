@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from tethne.readers import wos
+from authors.cluster import IdentityCluster, disambiguate
+from authors.engine import UnionFind, split_block
+from authors.paperinstances import PreparedCorpus
+
+datapath = './data/Boyer_Barbara.txt'
+
+
+class TestIdentityCluster(unittest.TestCase):
+
+    def setUp(self):
+        self.prepared = PreparedCorpus(tethne_corpus=wos.read(datapath))
+        self.members = set([u'HENRYJJWOS:000077556600009',
+                            u'HENRYJQWOS:000076265300004',
+                            u'HENRYJQWOS:000086633600013',
+                            u'HENRYJQWOS:A1995TA77100017',
+                            u'HENRYJQWOS:A1996VQ71700035',
+                            u'HENRYJQWOS:A1996VT14600003'])
+
+    def test_identity_clusters(self):
+        identity_clusters = IdentityCluster(corpus=self.prepared).build()
+        self.assertEqual(len(identity_clusters), 16)
+        self.assertSetEqual(identity_clusters['HENRYJJ'], self.members)
+        self.assertEqual(len(identity_clusters['BOYERB']), 30)
+
+    def test_parallel_build(self):
+        serial = IdentityCluster(corpus=self.prepared)
+        parallel = IdentityCluster(corpus=self.prepared)
+        self.assertEqual(parallel.build(n_jobs=2), serial.build())
+        self.assertEqual(parallel.components, serial.components)
+
+    def test_block_stats(self):
+        identity_cluster = IdentityCluster(corpus=self.prepared)
+        identity_cluster.build()
+        stats = identity_cluster.block_stats['BOYERB']
+        self.assertEqual(stats['pairs'], stats['size'] * (stats['size'] - 1) // 2)
+        self.assertEqual(stats['compared'] + stats['avoided'], stats['pairs'])
+        self.assertGreater(stats['avoided'], 0)
+
+    def test_update(self):
+        df = self.prepared.df
+        new = df.WOSID.isin(df.WOSID.unique()[::3])
+        full = IdentityCluster(corpus=PreparedCorpus(df=pd.concat([df[~new], df[new]])))
+        full.build()
+        identity_cluster = IdentityCluster(corpus=PreparedCorpus(df=df[~new]))
+        self.assertRaises(ValueError, identity_cluster.update, PreparedCorpus(df=df[new]))
+        identity_cluster.build()
+        self.assertEqual(identity_cluster.update(PreparedCorpus(df=df[new]), n_jobs=2), full.identity_clusters)
+        compared = sum(stats['compared'] for stats in identity_cluster.block_stats.values())
+        self.assertLess(compared, sum(stats['compared'] for stats in full.block_stats.values()))
+        # Instances already clustered are ignored.
+        self.assertEqual(identity_cluster.update(PreparedCorpus(df=df[new])), full.identity_clusters)
+
+    def test_save_load(self):
+        identity_cluster = IdentityCluster(corpus=self.prepared)
+        identity_cluster.build()
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            identity_cluster.save(path)
+            loaded = IdentityCluster.load(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(loaded.identity_clusters, identity_cluster.identity_clusters)
+        self.assertEqual(loaded.components, identity_cluster.components)
+        self.assertTrue(loaded.prepared.df.equals(self.prepared.df))
+
+    def test_disambiguate(self):
+        self.assertEqual(disambiguate(self.prepared, 'Henry', 'JQ'), [self.members])
+        identity_cluster = IdentityCluster(corpus=self.prepared)
+        identity_cluster.build()
+        largest = max(identity_cluster.components['BOYERB'], key=len)
+        self.assertEqual(disambiguate(self.prepared, 'Boyer', 'BC')[0], largest)
+        self.assertEqual(disambiguate(self.prepared, 'Wayne', 'Bruce'), [])
+
+    def test_split_block(self):
+        positions = self.prepared.positions([u'BOYERB', u'BOYERBC'])
+        sub_blocks = split_block(self.prepared.df, positions, max_size=10, keys=('coauthor',))
+        self.assertGreater(len(sub_blocks), 1)
+        self.assertEqual(sorted(p for sub_block in sub_blocks for p in sub_block), sorted(positions))
+        self.assertEqual(split_block(self.prepared.df, positions, max_size=100), [positions])
+        self.assertRaises(ValueError, split_block, self.prepared.df, positions, 10, ('surname',))
+
+    def test_max_block_size(self):
+        identity_cluster = IdentityCluster(corpus=self.prepared, max_block_size=10)
+        identity_cluster.build()
+        stats = identity_cluster.block_stats['BOYERB']
+        self.assertGreater(stats['sub_blocks'], 1)
+        self.assertEqual(stats['compared'] + stats['avoided'], stats['pairs'])
+        self.assertEqual(sum(len(component) for component in identity_cluster.components['BOYERB']), stats['size'])
+        self.assertRaises(ValueError, IdentityCluster, self.prepared, 70, None, 10, ('surname',))
+
+    def test_pair_budget(self):
+        identity_cluster = IdentityCluster(corpus=self.prepared, max_pairs=5)
+        identity_cluster.build()
+        stats = identity_cluster.block_stats['BOYERB']
+        self.assertTrue(stats['truncated'])
+        self.assertEqual(stats['compared'], 5)
+
+    def test_union_find(self):
+        forest = UnionFind(5)
+        self.assertTrue(forest.union(0, 3))
+        self.assertTrue(forest.union(3, 4))
+        self.assertFalse(forest.union(0, 4))
+        self.assertTrue(forest.same(0, 4))
+        self.assertFalse(forest.same(1, 2))
+        self.assertEqual(forest.components(), [[0, 3, 4], [1], [2]])
@@ -5,6 +5,7 @@ import unittest
 
 from tethne.readers import wos
 from authors.cluster import InitialCluster
+from authors.paperinstances import PreparedCorpus
 datapath = './data/Albertini_David.txt'
 
 
@@ -31,5 +32,13 @@ class TestInitialCluster(unittest.TestCase):
             if x != self.label and x in initial_clusters:
                 self.assertTrue(False, "Members cannot be Cluster Labels")
 
+    def test_prepared_corpus(self):
+        prepared = PreparedCorpus(tethne_corpus=self.corpus)
+        initial_clusters = InitialCluster(corpus=prepared).build()
+        self.assertSetEqual(initial_clusters[self.label], set(self.members))
+        self.assertIn(70, prepared.initial_clusters)
 
-
+        # Reusing the prepared corpus with another threshold does not touch the cached clusters.
+        strict_clusters = InitialCluster(corpus=prepared, threshold=95).build()
+        self.assertGreaterEqual(len(strict_clusters), len(initial_clusters))
+        self.assertEqual(InitialCluster(corpus=prepared).build(), initial_clusters)
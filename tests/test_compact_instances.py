@@ -0,0 +1,39 @@
+import sys
+import unittest
+
+from tethne.readers import wos
+from authors.compact import CompactInstances, ListColumn
+from authors.paperinstances import CorpusParser
+
+sys.path.append('./')
+datapath = './data/Boyer_Barbara.txt'
+
+
+class TestCompactInstances(unittest.TestCase):
+
+    def setUp(self):
+        self.df = CorpusParser(tethne_corpus=wos.read(datapath)).parse()
+
+    def test_round_trip(self):
+        compact = CompactInstances(self.df)
+        self.assertEqual(len(compact), len(self.df))
+        df = compact.to_frame()
+        self.assertTrue(df.equals(self.df))
+        self.assertEqual(list(df.index), list(self.df.index))
+        for column in ['INSTITUTE', 'EMAILADDRESS']:
+            for value1, value2 in zip(df[column].values, self.df[column].values):
+                self.assertEqual(type(value1), type(value2))
+
+    def test_primary_keys(self):
+        compact = CompactInstances(self.df)
+        positions = compact.positions(['BOYERBCWOS:000076265300004', self.df.index[3]])
+        self.assertEqual(list(compact.keys(positions)), ['BOYERBCWOS:000076265300004', self.df.index[3]])
+        self.assertTrue(compact.to_frame(positions).equals(self.df.iloc[positions]))
+        self.assertRaises(KeyError, compact.positions, ['UNKNOWN'])
+
+    def test_list_column(self):
+        column = ListColumn.from_values([[u'A', u'B'], u'A', [], ['A']])
+        self.assertEqual(column.to_list(), [[u'A', u'B'], u'A', [], ['A']])
+        self.assertEqual(type(column[3][0]), str)
+        self.assertEqual(list(column.offsets), [0, 2, 3, 3, 4])
+        self.assertRaises(ValueError, ListColumn.from_values, [[[u'A']]])
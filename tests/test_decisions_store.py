@@ -0,0 +1,72 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from tethne.readers import wos
+from authors.cascade import Cascade
+from authors.cluster import IdentityCluster
+from authors.decisions import DecisionStore, model_version
+from authors.paperinstances import PreparedCorpus, classify_pairs
+
+datapath = './data/Boyer_Barbara.txt'
+
+
+class TestDecisionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'decisions.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_put(self):
+        decisions = DecisionStore(self.path, model='a')
+        decisions.put([(u'X1', u'Y1'), (u'Y2', u'X2')], [1, 0], [0.9, 0.2])
+        found = decisions.get([(u'Y1', u'X1'), (u'X2', u'Y2'), (u'X1', u'Z1')])
+        self.assertEqual(found, {(u'Y1', u'X1'): (1, 0.9), (u'X2', u'Y2'): (0, 0.2)})
+        self.assertEqual((decisions.hits, decisions.misses, decisions.writes), (2, 1, 2))
+        self.assertEqual(DecisionStore(self.path, model='b').get([(u'X1', u'Y1')]), {})
+        self.assertEqual(len(pickle.loads(pickle.dumps(decisions))), 2)
+
+    def test_model_version(self):
+        self.assertEqual(DecisionStore(self.path).model, model_version())
+
+    def test_classify_pairs(self):
+        prepared = PreparedCorpus(tethne_corpus=wos.read(datapath))
+        pairs = [(i, j) for i in range(10) for j in range(10) if i < j]
+        decisions = DecisionStore(self.path)
+        labels, probabilities = classify_pairs(prepared, pairs, return_proba=True, decisions=decisions)
+        self.assertEqual(decisions.writes, len(pairs))
+        again = classify_pairs(prepared, pairs, return_proba=True, decisions=decisions)
+        self.assertEqual(decisions.hits, len(pairs))
+        self.assertEqual(decisions.writes, len(pairs))
+        self.assertEqual(list(again[0]), list(labels))
+        self.assertEqual(list(again[1]), list(probabilities))
+        self.assertEqual(list(labels), list(classify_pairs(prepared, pairs)))
+
+    def test_cascade_not_stored(self):
+        prepared = PreparedCorpus(tethne_corpus=wos.read('./data/Hollinger_Thomas.txt'))
+        pairs = [(i, j) for i in range(20) for j in range(20) if i < j]
+        cascade = Cascade()
+        decisions = DecisionStore(self.path)
+        classify_pairs(prepared, pairs, cascade=cascade, decisions=decisions)
+        settled = cascade.info()['pairs'] - cascade.info()['model']
+        self.assertGreater(settled, 0)
+        self.assertEqual(decisions.writes, len(pairs) - settled)
+        labels, probabilities = classify_pairs(prepared, pairs, return_proba=True, decisions=decisions)
+        expected = classify_pairs(prepared, pairs, return_proba=True)
+        self.assertEqual(list(labels), list(expected[0]))
+        self.assertEqual(list(probabilities), list(expected[1]))
+
+    def test_identity_cluster(self):
+        corpus = wos.read(datapath)
+        identity_clusters = IdentityCluster(corpus=corpus).build()
+        decisions = DecisionStore(self.path)
+        self.assertEqual(IdentityCluster(corpus=corpus, decisions=decisions).build(), identity_clusters)
+        writes = decisions.writes
+        self.assertEqual(IdentityCluster(corpus=corpus, decisions=decisions).build(), identity_clusters)
+        self.assertEqual(decisions.writes, writes)
+        self.assertEqual(decisions.hits, writes)
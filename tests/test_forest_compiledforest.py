@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tethne.readers import wos
+from authors.forest import CompiledForest
+from authors.models import default_classifier_path, load_classifier
+from authors.paperinstances import Compare, CorpusParser, features
+
+datapath = './data/Boyer_Barbara.txt'
+modelpath = '../classificationmodels/random_forest.npz'
+
+
+class TestCompiledForest(unittest.TestCase):
+
+    def setUp(self):
+        df = CorpusParser(tethne_corpus=wos.read(datapath)).parse()
+        pairs = [(i, j) for i in range(len(df)) for j in range(i + 1, len(df))]
+        self.scores = Compare.score_batch(df, pairs)[features].values
+        self.clf = load_classifier(default_classifier_path)
+        self.forest = CompiledForest.from_sklearn(self.clf)
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_parity_with_sklearn(self):
+        random_scores = np.random.RandomState(0).rand(5000, len(features))
+        random_scores[::2] = np.round(random_scores[::2], 1)
+        for X in (self.scores, random_scores):
+            self.assertTrue((self.forest.predict_proba(X) == self.clf.predict_proba(X)).all())
+            self.assertTrue((self.forest.predict(X) == self.clf.predict(X)).all())
+
+    def test_memory_mapped_model(self):
+        path = os.path.join(self.tempdir, 'random_forest.npz')
+        self.forest.save(path)
+        forest = CompiledForest.load(path)
+        self.assertTrue((forest.predict_proba(self.scores) == self.clf.predict_proba(self.scores)).all())
+
+    def test_bundled_model(self):
+        forest = CompiledForest.load(modelpath)
+        self.assertTrue((forest.predict(self.scores) == self.clf.predict(self.scores)).all())
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+from authors.ingest import ingest, input_files, parse_file
+
+datapaths = ['./data/Albertini_David.txt', './data/Anderson_Everett.txt']
+
+
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.frames = [parse_file(path) for path in datapaths]
+
+    def test_merge(self):
+        df = ingest(datapaths)
+        merged = pd.concat(self.frames)
+        # Both exports share 33 instances, kept once where they first appear.
+        self.assertEqual(len(merged) - len(df), 33)
+        self.assertFalse(df.index.duplicated().any())
+        self.assertEqual(list(df.index), list(merged.index[~merged.index.duplicated()]))
+        self.assertEqual(list(df.columns), list(self.frames[0].columns))
+
+    def test_same_file_twice(self):
+        self.assertEqual(input_files([datapaths[0], datapaths[0]]), datapaths[:1])
+        self.assertEqual(len(ingest(datapaths[:1] * 2)), len(self.frames[0]))
+
+    def test_parallel(self):
+        df = ingest(datapaths)
+        self.assertTrue(ingest(datapaths, n_jobs=2).equals(df))
+
+    def test_directory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            for path in datapaths:
+                shutil.copy(path, directory)
+            self.assertEqual(input_files(directory), [os.path.join(directory, os.path.basename(path))
+                                                      for path in datapaths])
+            self.assertTrue(ingest(directory).equals(ingest(datapaths)))
+        finally:
+            shutil.rmtree(directory)
+        self.assertRaises(ValueError, ingest, directory)
@@ -0,0 +1,42 @@
+import random
+import unittest
+
+from authors.institutes import InstituteSimilarity
+from utilities import cosine_similarity, sentence_to_vector
+
+
+class TestInstituteSimilarity(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        words = ['UNIV', 'DEPT', 'CARNEGIE', 'INST', 'WASHINGTON', 'EMBRYOL', 'BIOL', 'ARIZONA', 'STATE', 'SCH']
+        self.institutes = [None, '']
+        for _ in range(60):
+            self.institutes.append(' '.join(rng.choice(words) for _ in range(rng.randint(1, 6))))
+        self.pairs = [(i, j) for i in range(len(self.institutes)) for j in range(len(self.institutes))]
+
+    def expected(self, i, j):
+        if self.institutes[i] is None or self.institutes[j] is None:
+            return 0
+        return cosine_similarity(sentence_to_vector(self.institutes[i]), sentence_to_vector(self.institutes[j]))
+
+    def test_exact_scores(self):
+        similarity = InstituteSimilarity(self.institutes)
+        scores = similarity.scores([i for i, _ in self.pairs], [j for _, j in self.pairs])
+        for score, (i, j) in zip(scores, self.pairs):
+            self.assertEqual(score, self.expected(i, j))
+
+    def test_normalized_scores(self):
+        similarity = InstituteSimilarity(self.institutes, exact=False)
+        scores = similarity.scores([i for i, _ in self.pairs], [j for _, j in self.pairs])
+        matrix = similarity.matrix().toarray()
+        for score, (i, j) in zip(scores, self.pairs):
+            self.assertAlmostEqual(score, self.expected(i, j))
+            self.assertAlmostEqual(matrix[i, j], self.expected(i, j))
+
+    def test_idf(self):
+        similarity = InstituteSimilarity(['UNIV DEPT BIOL', 'UNIV DEPT ARIZONA', 'UNIV SCH'], idf=True)
+        raw = InstituteSimilarity(['UNIV DEPT BIOL', 'UNIV DEPT ARIZONA', 'UNIV SCH'])
+        # UNIV appears in every institute and weighs less than with raw counts.
+        self.assertLess(similarity.scores([0], [2])[0], raw.scores([0], [2])[0])
+        self.assertAlmostEqual(similarity.scores([0], [0])[0], 1.0)
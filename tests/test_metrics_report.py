@@ -0,0 +1,58 @@
+import unittest
+import json
+
+from tethne.readers import wos
+from authors.cluster import IdentityCluster
+from authors.metrics import Metrics, bucket, get_metrics, set_metrics
+
+datapath = './data/Boyer_Barbara.txt'
+
+
+class TestMetricsReport(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.metrics = set_metrics(Metrics(hooks=[self.events.append]))
+
+    def tearDown(self):
+        set_metrics(None)
+
+    def test_bucket(self):
+        self.assertEqual([bucket(value) for value in [0, 1, 2, 3, 4, 7, 8, 100]], [0, 1, 2, 2, 4, 4, 8, 64])
+
+    def test_pipeline(self):
+        identity_cluster = IdentityCluster(corpus=wos.read(datapath))
+        identity_cluster.build()
+        report = self.metrics.report()
+        for name in ['parse', 'initial_cluster', 'identity_cluster', 'features', 'predict']:
+            self.assertIn(name, report['stages'])
+            self.assertGreater(report['stages'][name]['calls'], 0)
+        counters = report['counters']
+        self.assertEqual(counters['instances'], len(identity_cluster.prepared.df))
+        self.assertEqual(sum(report['histograms']['block_size'].values()), counters['blocks'])
+        self.assertEqual(counters['pairs_compared'], counters['pairs_predicted'])
+        self.assertEqual(counters['pairs_compared'] + counters['pairs_avoided'],
+                         sum(stats['pairs'] for stats in identity_cluster.block_stats.values()))
+        # Counters are also kept by every enclosing stage.
+        self.assertEqual(report['stages']['identity_cluster']['counters']['classifier_calls'],
+                         counters['classifier_calls'])
+        self.assertGreaterEqual(report['stages']['identity_cluster']['seconds'],
+                                report['stages']['predict']['seconds'])
+        self.assertEqual(json.loads(self.metrics.to_json())['counters'], counters)
+        self.assertEqual(len(self.events), sum(stage['calls'] for stage in report['stages'].values()))
+        self.assertEqual(self.events[-1]['stage'], 'identity_cluster')
+
+    def test_failing_hook(self):
+        def hook(event):
+            raise RuntimeError(event['stage'])
+        self.metrics.add_hook(hook)
+        with self.metrics.stage('parse'):
+            self.metrics.count('instances', 3)
+        self.assertEqual(self.metrics.report()['stages']['parse']['counters'], {'instances': 3})
+        self.assertEqual(len(self.events), 1)
+
+    def test_inactive(self):
+        set_metrics(None)
+        self.assertIsNone(get_metrics())
+        IdentityCluster(corpus=wos.read(datapath)).build()
+        self.assertEqual(self.metrics.report()['stages'], {})
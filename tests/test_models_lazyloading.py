@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import authors.models as models
+from authors.forest import CompiledForest
+
+rootdir = os.path.abspath('..')
+
+
+class TestLazyLoading(unittest.TestCase):
+
+    def tearDown(self):
+        models.set_classifier_path(None)
+
+    def test_nothing_loaded_at_import(self):
+        snippet = ('import sys, authors.cluster, authors.models; '
+                   'print(authors.models._classifier is None and "sklearn" not in sys.modules)')
+        env = dict(os.environ, PYTHONPATH=rootdir, PYTHONWARNINGS='ignore')
+        output = subprocess.check_output([sys.executable, '-c', snippet], cwd=rootdir, env=env)
+        self.assertEqual(output.split()[-1], 'True')
+
+    def test_cached_classifier(self):
+        clf = models.get_classifier()
+        self.assertIs(models.get_classifier(), clf)
+
+    def test_configurable_path(self):
+        path = os.path.join(rootdir, 'classificationmodels', 'random_forest.npz')
+        models.set_classifier_path(path)
+        self.assertEqual(models.get_classifier_path(), path)
+        self.assertIsInstance(models.get_classifier(), CompiledForest)
@@ -4,6 +4,7 @@ import unittest
 import pandas as pd
 from tethne.readers import wos
 from authors.paperinstances import CorpusParser
+from authors.paperinstances import Compare, FeatureStore, features
 
 sys.path.append('./')
 datapath = './data/Albertini_David.txt'
@@ -34,3 +35,22 @@ class TestParser(unittest.TestCase):
         except KeyError:
             self.assertTrue(False)
 
+    def test_feature_store(self):
+        df = CorpusParser(tethne_corpus=self.corpus2).parse()
+        pairs = [(i, j) for i in range(len(df)) for j in range(len(df)) if i != j]
+        store = FeatureStore(df)
+        self.assertEqual(len(store), len(df))
+        self.assertEqual(store.coauthors.values(0), frozenset(df['CO-AUTHORS'].iloc[0]))
+        expected = Compare.score_records(Compare.create_batch_record(df, pairs))[features].values
+        scores = store.scores([i for i, _ in pairs], [j for _, j in pairs])
+        self.assertTrue((scores == expected).all())
+
+    def test_parse_iter(self):
+        df = CorpusParser(tethne_corpus=self.corpus2).parse()
+        parser = CorpusParser(tethne_corpus=self.corpus2)
+        chunks = list(parser.parse_iter(chunk_size=50))
+        self.assertTrue(all(len(chunk) <= 50 for chunk in chunks))
+        self.assertEqual(len(chunks), (len(df) + 49) // 50)
+        self.assertEqual(parser.records, [])
+        self.assertTrue(pd.concat(chunks).equals(df))
+        self.assertRaises(ValueError, lambda: list(parser.parse_iter(chunk_size=0)))
@@ -0,0 +1,153 @@
+import json
+import threading
+import unittest
+import urllib2
+
+import numpy as np
+from tethne.readers import wos
+from authors.cluster import IdentityCluster
+from authors.paperinstances import PreparedCorpus, classify_pairs
+from authors.service import Batcher, Service, make_server
+
+datapath = './data/Boyer_Barbara.txt'
+
+
+def request(url, body=None, method=None):
+    """Returns the status and the decoded JSON body of a request."""
+    if isinstance(body, dict):
+        body = json.dumps(body)
+    http_request = urllib2.Request(url, body)
+    if method is not None:
+        http_request.get_method = lambda: method
+    try:
+        response = urllib2.urlopen(http_request)
+    except urllib2.HTTPError as error:
+        response = error
+    return response.getcode(), json.loads(response.read())
+
+
+class TestBatcher(unittest.TestCase):
+
+    def test_coalesce(self):
+        calls = []
+
+        def double(key, items):
+            calls.append((key, len(items)))
+            return items * 2, items + 1
+
+        batcher = Batcher(double, max_wait=0.2)
+        results = {}
+
+        def submit(i):
+            results[i] = batcher.submit(i % 2, np.arange(i + 1))
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+        for i in range(6):
+            self.assertEqual(list(results[i][0]), list(np.arange(i + 1) * 2))
+            self.assertEqual(list(results[i][1]), list(np.arange(i + 1) + 1))
+        self.assertEqual(batcher.requests, 6)
+        self.assertLess(len(calls), 6)
+        self.assertEqual(sum(size for _, size in calls), 21)
+
+
+class TestService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = make_server(port=0, service=Service(processes=1))
+        cls.url = 'http://127.0.0.1:%s' % cls.server.server_address[1]
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        with open(datapath) as f:
+            cls.text = f.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server.service.close()
+
+    def test_health(self):
+        status, body = request(self.url + '/health')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['status'], 'ok')
+        self.assertEqual(request(self.url + '/nowhere')[0], 404)
+
+    def test_classify(self):
+        status, corpus = request(self.url + '/corpora', self.text)
+        self.assertEqual(status, 200)
+        prepared = PreparedCorpus(tethne_corpus=wos.read(datapath))
+        self.assertEqual(corpus['index'], list(prepared.df.index))
+        pairs = [(corpus['index'][i], corpus['index'][j]) for i in range(8) for j in range(8) if i < j]
+        status, body = request(self.url + '/classify', {'corpus': corpus['corpus'], 'pairs': pairs})
+        self.assertEqual(status, 200)
+        labels, probabilities = classify_pairs(prepared, pairs, return_proba=True)
+        self.assertEqual(body['labels'], list(labels))
+        self.assertTrue(np.allclose(body['probabilities'], probabilities))
+        self.assertEqual(request(self.url + '/classify', {'corpus': 'x', 'pairs': pairs})[0], 404)
+        self.assertEqual(request(self.url + '/classify', {'corpus': corpus['corpus'], 'pairs': [['x', 'y']]})[0], 400)
+        self.assertEqual(request(self.url + '/classify', 'not json')[0], 400)
+        self.assertEqual(request(self.url + '/classify', {'corpus': corpus['corpus'], 'pairs': [[0, -1]]})[0], 400)
+
+    def test_unexpected_error(self):
+        service = self.server.service
+
+        def info():
+            raise RuntimeError('broken')
+
+        service.info = info
+        try:
+            status, body = request(self.url + '/health')
+        finally:
+            del service.info
+        self.assertEqual(status, 500)
+        self.assertEqual(body['error'], 'RuntimeError: broken')
+
+    def test_delete(self):
+        corpus = request(self.url + '/corpora', self.text)[1]
+        job = request(self.url + '/cluster', {'corpus': corpus['corpus']})[1]['job']
+        self.assertEqual(request(self.url + '/jobs/' + job, method='DELETE'), (200, {'deleted': job}))
+        self.assertEqual(request(self.url + '/jobs/' + job)[0], 404)
+        self.assertEqual(request(self.url + '/corpora/' + corpus['corpus'], method='DELETE')[0], 200)
+        self.assertEqual(request(self.url + '/corpora/' + corpus['corpus'], method='DELETE')[0], 404)
+        self.assertEqual(request(self.url + '/classify', {'corpus': corpus['corpus'], 'pairs': []})[0], 404)
+
+    def test_cluster(self):
+        corpus = request(self.url + '/corpora', self.text)[1]
+        status, body = request(self.url + '/cluster', {'corpus': corpus['corpus']})
+        self.assertEqual(status, 202)
+        job = self.server.service.job(body['job'], timeout=120)
+        self.assertEqual(job['status'], 'done')
+        status, body = request(self.url + '/jobs/' + body['job'])
+        self.assertEqual(status, 200)
+        identity_clusters = IdentityCluster(corpus=wos.read(datapath)).build()
+        self.assertEqual(dict((label, set(indices)) for label, indices in body['clusters'].items()),
+                         identity_clusters)
+        self.assertEqual(request(self.url + '/jobs/x')[0], 404)
+
+
+class TestServiceLimits(unittest.TestCase):
+
+    def test_limits(self):
+        service = Service(processes=1, max_corpora=1, max_jobs=1)
+        try:
+            with open(datapath) as f:
+                boyer = service.add_corpus(f.read())['corpus']
+            with open('./data/Hollinger_Thomas.txt') as f:
+                hollinger = service.add_corpus(f.read())['corpus']
+            self.assertEqual(list(service.corpora), [hollinger])
+            self.assertRaises(KeyError, service.corpus, boyer)
+            first = service.cluster(hollinger)
+            self.assertEqual(service.job(first, timeout=120)['status'], 'done')
+            second = service.cluster(hollinger)
+            self.assertEqual(list(service.jobs), [second])
+            info = service.info()
+            self.assertEqual((info['corpora'], info['max_corpora'], info['jobs'], info['max_jobs']), (1, 1, 1, 1))
+        finally:
+            service.close()
@@ -0,0 +1,38 @@
+import unittest
+
+from fuzzywuzzy import fuzz
+from authors.similarity import NameSimilarityCache
+
+
+class TestNameSimilarityCache(unittest.TestCase):
+
+    def setUp(self):
+        self.names = [u'BARBARA C', u'BARBARA', u'B', u'BC', u'DAVID F', u'DAVID']
+
+    def test_same_scores_as_fuzz(self):
+        cache = NameSimilarityCache()
+        for _ in range(2):
+            for a in self.names:
+                for b in self.names:
+                    self.assertEqual(cache.ratio(a, b), max(fuzz.ratio(a, b)/100.0, fuzz.ratio(b, a)/100.0))
+                    self.assertEqual(cache.partial_ratio(a, b), fuzz.partial_ratio(a, b)/100.0)
+
+    def test_counters(self):
+        cache = NameSimilarityCache()
+        cache.ratio(u'BARBARA C', u'BARBARA')
+        cache.ratio(u'BARBARA', u'BARBARA C')
+        cache.partial_ratio(u'BARBARA', u'BARBARA C')
+        info = cache.info()
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['misses'], 2)
+        self.assertEqual(info['size'], 2)
+
+    def test_bounded_size(self):
+        cache = NameSimilarityCache(maxsize=3)
+        for name in self.names:
+            cache.ratio(name, u'BARBARA')
+        self.assertEqual(cache.info()['size'], 3)
+        cache.ratio(self.names[-1], u'BARBARA')
+        self.assertEqual(cache.hits, 1)
+        cache.ratio(self.names[0], u'BARBARA')
+        self.assertEqual(cache.hits, 1)
@@ -0,0 +1,40 @@
+from __future__ import division
+import unittest
+
+from authors.vocabulary import InternedSets, Vocabulary
+
+
+class TestInternedSets(unittest.TestCase):
+
+    def setUp(self):
+        self.sets = [frozenset([u'A', u'B']), None, frozenset([u'B', u'C', u'D']), frozenset([u'E']),
+                     frozenset([u'B', u'A'])]
+
+    def test_vocabulary(self):
+        vocabulary = Vocabulary()
+        self.assertEqual(vocabulary.intern(u'A'), 0)
+        self.assertEqual(vocabulary.intern(u'B'), 1)
+        self.assertEqual(vocabulary.intern(u'A'), 0)
+        self.assertEqual(len(vocabulary), 2)
+        self.assertEqual(vocabulary.values[1], u'B')
+
+    def test_values(self):
+        sets = InternedSets.from_sets(self.sets)
+        self.assertEqual(len(sets), len(self.sets))
+        for i, values in enumerate(self.sets):
+            self.assertEqual(sets.values(i), values)
+
+    def test_jaccard(self):
+        sets = InternedSets.from_sets(self.sets)
+        left = [i for i in range(len(self.sets)) for _ in range(len(self.sets))]
+        right = [j for _ in range(len(self.sets)) for j in range(len(self.sets))]
+        scores = sets.jaccard(left, right)
+        for score, i, j in zip(scores, left, right):
+            set1, set2 = self.sets[i], self.sets[j]
+            expected = 0 if set1 is None or set2 is None else len(set1 & set2)/len(set1 | set2)
+            self.assertEqual(score, expected)
+
+    def test_empty(self):
+        sets = InternedSets.from_sets([None, None])
+        self.assertEqual(list(sets.jaccard([0], [1])), [0])
+        self.assertEqual(len(sets.jaccard([], [])), 0)